@@ -0,0 +1,119 @@
+"""initial schema
+
+Revision ID: 264e7e5729e5
+Revises:
+Create Date: 2026-10-18 19:40:00.000000
+
+Tables as created by `Base.metadata.create_all` before migrations were
+introduced. Databases that already have them should be stamped instead:
+`alembic stamp 264e7e5729e5`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '264e7e5729e5'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.String(length=10), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=True),
+        sa.Column('department', sa.String(), nullable=False),
+        sa.Column('joining_date', sa.String(), nullable=True),
+        sa.Column('current_project', sa.String(), nullable=True),
+        sa.Column('group_members', sa.String(), nullable=True),
+        sa.Column('skills', sa.String(), nullable=True),
+        sa.Column('experience', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+
+    op.create_table(
+        'security_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('is_used', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key'),
+    )
+    op.create_index('ix_security_keys_id', 'security_keys', ['id'])
+
+    op.create_table(
+        'shoutouts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_shoutouts_id', 'shoutouts', ['id'])
+
+    op.create_table(
+        'shoutout_tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shoutout_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_shoutout_tags_id', 'shoutout_tags', ['id'])
+
+    op.create_table(
+        'shoutout_reactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shoutout_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('emoji', sa.String(length=10), nullable=False),
+        sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_shoutout_reactions_id', 'shoutout_reactions', ['id'])
+
+    op.create_table(
+        'shoutout_comments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shoutout_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_shoutout_comments_id', 'shoutout_comments', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_shoutout_comments_id', table_name='shoutout_comments')
+    op.drop_table('shoutout_comments')
+    op.drop_index('ix_shoutout_reactions_id', table_name='shoutout_reactions')
+    op.drop_table('shoutout_reactions')
+    op.drop_index('ix_shoutout_tags_id', table_name='shoutout_tags')
+    op.drop_table('shoutout_tags')
+    op.drop_index('ix_shoutouts_id', table_name='shoutouts')
+    op.drop_table('shoutouts')
+    op.drop_index('ix_security_keys_id', table_name='security_keys')
+    op.drop_table('security_keys')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,59 @@
+"""shoutout feed read model and thumbnails
+
+Revision ID: 58c3f0d85be1
+Revises: 264e7e5729e5
+Create Date: 2026-10-18 19:41:00.000000
+
+The app's startup `create_all` may already have created `shoutout_feed`,
+so creation is skipped when the table exists. Feed rows for existing
+shout-outs are filled in by the app on startup (`feed.rebuild`).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '58c3f0d85be1'
+down_revision: Union[str, Sequence[str], None] = '264e7e5729e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if 'thumbnail_url' not in {c['name'] for c in inspector.get_columns('shoutouts')}:
+        op.add_column('shoutouts', sa.Column('thumbnail_url', sa.String(length=500), nullable=True))
+
+    if not inspector.has_table('shoutout_feed'):
+        op.create_table(
+            'shoutout_feed',
+            sa.Column('shoutout_id', sa.Integer(), nullable=False),
+            sa.Column('author_id', sa.Integer(), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('image_url', sa.String(length=500), nullable=True),
+            sa.Column('thumbnail_url', sa.String(length=500), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('tagged_user_ids', sa.JSON(), nullable=False),
+            sa.Column('tagged_user_names', sa.JSON(), nullable=False),
+            sa.Column('reactions', sa.JSON(), nullable=False),
+            sa.Column('comments_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+            sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id']),
+            sa.PrimaryKeyConstraint('shoutout_id'),
+        )
+        op.create_index('ix_shoutout_feed_created_at_id', 'shoutout_feed', ['created_at', 'shoutout_id'])
+    elif 'thumbnail_url' not in {c['name'] for c in inspector.get_columns('shoutout_feed')}:
+        op.add_column('shoutout_feed', sa.Column('thumbnail_url', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_shoutout_feed_created_at_id', table_name='shoutout_feed')
+    op.drop_table('shoutout_feed')
+    with op.batch_alter_table('shoutouts') as batch_op:
+        batch_op.drop_column('thumbnail_url')
@@ -0,0 +1,50 @@
+"""composite indexes for the shout-out hot paths
+
+Revision ID: 970fc58b1fd0
+Revises: 58c3f0d85be1
+Create Date: 2026-10-18 19:42:00.000000
+
+Covers the feed, comment listing and per-user metrics queries; see
+`app/query_plans.py` for the plan check that guards them.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '970fc58b1fd0'
+down_revision: Union[str, Sequence[str], None] = '58c3f0d85be1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_shoutouts_created_at_id', 'shoutouts', ['created_at', 'id']),
+    ('ix_shoutouts_author_id_created_at', 'shoutouts', ['author_id', 'created_at']),
+    ('ix_shoutout_tags_shoutout_id_user_id', 'shoutout_tags', ['shoutout_id', 'user_id']),
+    ('ix_shoutout_tags_user_id_shoutout_id', 'shoutout_tags', ['user_id', 'shoutout_id']),
+    ('ix_shoutout_reactions_shoutout_id_emoji', 'shoutout_reactions', ['shoutout_id', 'emoji']),
+    ('ix_shoutout_comments_shoutout_id_created_at', 'shoutout_comments', ['shoutout_id', 'created_at']),
+    ('ix_shoutout_comments_user_id_created_at', 'shoutout_comments', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    missing = [
+        (name, table, columns) for name, table, columns in INDEXES
+        if name not in {ix['name'] for ix in inspector.get_indexes(table)}
+    ]
+    # build without blocking writes on Postgres (CONCURRENTLY cannot run in a transaction)
+    with op.get_context().autocommit_block():
+        for name, table, columns in missing:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,42 @@
+"""per-user activity counters
+
+Revision ID: a41d2b7c9e03
+Revises: 970fc58b1fd0
+Create Date: 2026-10-18 19:55:00.000000
+
+Counters are filled on the next app start (`stats.backfill_if_empty`) or
+explicitly with `python -m app.stats`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d2b7c9e03'
+down_revision: Union[str, Sequence[str], None] = '970fc58b1fd0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('user_stats'):
+        return
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('shoutouts_given', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('shoutouts_received', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('comments_made', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('reactions_received', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
@@ -0,0 +1,50 @@
+"""users.is_active and indexes for the admin user listings
+
+Revision ID: b5d1e8f27c64
+Revises: f3c8d6e2a417
+Create Date: 2026-10-18 22:10:00.000000
+
+`is_active` is what the suspend endpoint sets (it was never persisted
+before). The indexes back the keyset pages in `app/directory.py`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1e8f27c64'
+down_revision: Union[str, Sequence[str], None] = 'f3c8d6e2a417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if 'is_active' not in {col['name'] for col in inspector.get_columns('users')}:
+        op.add_column('users', sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+
+    existing = {ix['name'] for ix in inspector.get_indexes('users')}
+    # build without blocking writes on Postgres (CONCURRENTLY cannot run in a transaction)
+    with op.get_context().autocommit_block():
+        if 'ix_users_role_department_id' not in existing:
+            op.create_index(
+                'ix_users_role_department_id', 'users', ['role', 'department', 'id'],
+                postgresql_concurrently=True,
+            )
+        if 'ix_users_name_lower_id' not in existing:
+            op.create_index(
+                'ix_users_name_lower_id', 'users', [sa.text("lower(coalesce(name, ''))"), 'id'],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_name_lower_id', table_name='users')
+    op.drop_index('ix_users_role_department_id', table_name='users')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('is_active')
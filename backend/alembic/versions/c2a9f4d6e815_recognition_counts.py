@@ -0,0 +1,42 @@
+"""time-bucketed recognition counters for the leaderboards
+
+Revision ID: c2a9f4d6e815
+Revises: b5d1e8f27c64
+Create Date: 2026-10-18 22:40:00.000000
+
+Counters are filled on the next app start (`leaderboard.backfill_if_empty`)
+or explicitly with `python -m app.leaderboard`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a9f4d6e815'
+down_revision: Union[str, Sequence[str], None] = 'b5d1e8f27c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('recognition_counts'):
+        return
+    op.create_table(
+        'recognition_counts',
+        sa.Column('period', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.Date(), nullable=False),
+        sa.Column('department', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('period', 'bucket_start', 'department', 'user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('recognition_counts')
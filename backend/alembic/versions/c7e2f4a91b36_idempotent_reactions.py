@@ -0,0 +1,66 @@
+"""idempotent reactions and per-emoji counters
+
+Revision ID: c7e2f4a91b36
+Revises: a41d2b7c9e03
+Create Date: 2026-10-18 20:10:00.000000
+
+Duplicate (shoutout_id, user_id, emoji) rows are deleted, keeping the
+oldest, before the unique index is built. Feed rows and per-user counters
+still hold the old inflated totals; refresh them afterwards with
+`python -m app.feed` and `python -m app.stats`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2f4a91b36'
+down_revision: Union[str, Sequence[str], None] = 'a41d2b7c9e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    reaction_indexes = {ix['name'] for ix in inspector.get_indexes('shoutout_reactions')}
+
+    if 'uq_shoutout_reactions_shoutout_user_emoji' not in reaction_indexes:
+        op.execute(
+            "DELETE FROM shoutout_reactions WHERE id NOT IN ("
+            "SELECT MIN(id) FROM shoutout_reactions GROUP BY shoutout_id, user_id, emoji)"
+        )
+        op.create_index(
+            'uq_shoutout_reactions_shoutout_user_emoji', 'shoutout_reactions',
+            ['shoutout_id', 'user_id', 'emoji'], unique=True,
+        )
+    if 'ix_shoutout_reactions_shoutout_id_emoji' in reaction_indexes:
+        op.drop_index('ix_shoutout_reactions_shoutout_id_emoji', table_name='shoutout_reactions')
+
+    if not inspector.has_table('shoutout_reaction_counts'):
+        op.create_table(
+            'shoutout_reaction_counts',
+            sa.Column('shoutout_id', sa.Integer(), nullable=False),
+            sa.Column('emoji', sa.String(length=10), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+            sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id']),
+            sa.PrimaryKeyConstraint('shoutout_id', 'emoji'),
+        )
+    op.execute(
+        "INSERT INTO shoutout_reaction_counts (shoutout_id, emoji, count) "
+        "SELECT shoutout_id, emoji, COUNT(*) FROM shoutout_reactions "
+        "WHERE NOT EXISTS (SELECT 1 FROM shoutout_reaction_counts) "
+        "GROUP BY shoutout_id, emoji"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('shoutout_reaction_counts')
+    op.create_index(
+        'ix_shoutout_reactions_shoutout_id_emoji', 'shoutout_reactions', ['shoutout_id', 'emoji'],
+    )
+    op.drop_index('uq_shoutout_reactions_shoutout_user_emoji', table_name='shoutout_reactions')
@@ -0,0 +1,77 @@
+"""daily analytics rollups and reaction timestamps
+
+Revision ID: d8e3b1c5a972
+Revises: c2a9f4d6e815
+Create Date: 2026-10-18 23:15:00.000000
+
+Rollups are filled by the first `analytics.run_rollup` (background loop on
+app start, or `python -m app.analytics`). Existing reactions keep a NULL
+`created_at` and are counted on their shout-out's day.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e3b1c5a972'
+down_revision: Union[str, Sequence[str], None] = 'c2a9f4d6e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if 'created_at' not in {col['name'] for col in inspector.get_columns('shoutout_reactions')}:
+        op.add_column('shoutout_reactions', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    if not inspector.has_table('daily_department_stats'):
+        op.create_table(
+            'daily_department_stats',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('department', sa.String(), nullable=False),
+            sa.Column('posts', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('tags', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('comments', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('reactions', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('active_users', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('day', 'department'),
+        )
+    if not inspector.has_table('daily_reaction_counts'):
+        op.create_table(
+            'daily_reaction_counts',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('department', sa.String(), nullable=False),
+            sa.Column('emoji', sa.String(length=10), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('day', 'department', 'emoji'),
+        )
+    if not inspector.has_table('daily_active_users'):
+        op.create_table(
+            'daily_active_users',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('department', sa.String(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'department', 'user_id'),
+        )
+    if not inspector.has_table('rollup_watermarks'):
+        op.create_table(
+            'rollup_watermarks',
+            sa.Column('source', sa.String(length=50), nullable=False),
+            sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('source'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rollup_watermarks')
+    op.drop_table('daily_active_users')
+    op.drop_table('daily_reaction_counts')
+    op.drop_table('daily_department_stats')
+    with op.batch_alter_table('shoutout_reactions') as batch_op:
+        batch_op.drop_column('created_at')
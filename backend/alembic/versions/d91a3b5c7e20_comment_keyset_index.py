@@ -0,0 +1,45 @@
+"""index comments for keyset pagination on id
+
+Revision ID: d91a3b5c7e20
+Revises: c7e2f4a91b36
+Create Date: 2026-10-18 20:25:00.000000
+
+Comment pages are now ordered by id, so (shoutout_id, id) replaces the
+(shoutout_id, created_at) index.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a3b5c7e20'
+down_revision: Union[str, Sequence[str], None] = 'c7e2f4a91b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('shoutout_comments')}
+    with op.get_context().autocommit_block():
+        if 'ix_shoutout_comments_shoutout_id_id' not in existing:
+            op.create_index(
+                'ix_shoutout_comments_shoutout_id_id', 'shoutout_comments', ['shoutout_id', 'id'],
+                postgresql_concurrently=True,
+            )
+        if 'ix_shoutout_comments_shoutout_id_created_at' in existing:
+            op.drop_index(
+                'ix_shoutout_comments_shoutout_id_created_at', table_name='shoutout_comments',
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_shoutout_comments_shoutout_id_created_at', 'shoutout_comments', ['shoutout_id', 'created_at'],
+    )
+    op.drop_index('ix_shoutout_comments_shoutout_id_id', table_name='shoutout_comments')
@@ -0,0 +1,81 @@
+"""full-text search indexes for shout-outs and comments
+
+Revision ID: e4b7c2d19f58
+Revises: d91a3b5c7e20
+Create Date: 2026-10-18 20:40:00.000000
+
+Postgres: GIN expression indexes on to_tsvector('english', ...), built
+concurrently. SQLite: FTS5 external-content tables plus the triggers that
+keep them in sync, filled from the existing rows. See `app/search.py`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c2d19f58'
+down_revision: Union[str, Sequence[str], None] = 'd91a3b5c7e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PG_INDEXES = [
+    ('ix_shoutouts_message_fts', 'shoutouts', 'message'),
+    ('ix_shoutout_comments_content_fts', 'shoutout_comments', 'content'),
+]
+SQLITE_FTS = [
+    ('shoutouts_fts', 'shoutouts', 'message'),
+    ('shoutout_comments_fts', 'shoutout_comments', 'content'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, col in PG_INDEXES:
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} "
+                    f"USING gin (to_tsvector('english', {col}))"
+                )
+        return
+
+    if bind.dialect.name != 'sqlite':
+        return
+    for fts, table, col in SQLITE_FTS:
+        if sa.inspect(bind).has_table(fts):
+            continue
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"{col}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); "
+            f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for name, _, _ in PG_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+    elif bind.dialect.name == 'sqlite':
+        for fts, _, _ in SQLITE_FTS:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
@@ -0,0 +1,44 @@
+"""persisted token denylist
+
+Revision ID: e6f2a7b3d481
+Revises: d8e3b1c5a972
+Create Date: 2026-10-18 23:50:00.000000
+
+Backs the in-memory denylist in `app/revocation.py`; rows are pruned once
+the tokens they cover have expired.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f2a7b3d481'
+down_revision: Union[str, Sequence[str], None] = 'd8e3b1c5a972'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('revoked_tokens'):
+        return
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('key', sa.String(length=80), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        sa.Column('reason', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
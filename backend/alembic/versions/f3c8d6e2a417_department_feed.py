@@ -0,0 +1,67 @@
+"""department column on shout-outs and department feed memberships
+
+Revision ID: f3c8d6e2a417
+Revises: e4b7c2d19f58
+Create Date: 2026-10-18 20:55:00.000000
+
+Backfills `shoutouts.department` from the author and fills
+`shoutout_departments` with the author's and tagged users' departments.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8d6e2a417'
+down_revision: Union[str, Sequence[str], None] = 'e4b7c2d19f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if 'department' not in {col['name'] for col in inspector.get_columns('shoutouts')}:
+        op.add_column('shoutouts', sa.Column('department', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE shoutouts SET department = "
+        "(SELECT users.department FROM users WHERE users.id = shoutouts.author_id) "
+        "WHERE department IS NULL"
+    )
+
+    if not inspector.has_table('shoutout_departments'):
+        op.create_table(
+            'shoutout_departments',
+            sa.Column('shoutout_id', sa.Integer(), nullable=False),
+            sa.Column('department', sa.String(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['shoutout_id'], ['shoutouts.id']),
+            sa.PrimaryKeyConstraint('shoutout_id', 'department'),
+        )
+        op.create_index(
+            'ix_shoutout_departments_department_created_at_id', 'shoutout_departments',
+            ['department', 'created_at', 'shoutout_id'],
+        )
+    op.execute(
+        "INSERT INTO shoutout_departments (shoutout_id, department, created_at) "
+        "SELECT id, department, created_at FROM ("
+        "  SELECT s.id, s.department, s.created_at FROM shoutouts s"
+        "  UNION"
+        "  SELECT s.id, u.department, s.created_at FROM shoutouts s"
+        "  JOIN shoutout_tags t ON t.shoutout_id = s.id JOIN users u ON u.id = t.user_id"
+        ") AS m "
+        "WHERE department IS NOT NULL AND created_at IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM shoutout_departments)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_shoutout_departments_department_created_at_id', table_name='shoutout_departments')
+    op.drop_table('shoutout_departments')
+    # plain DROP COLUMN (SQLite >= 3.35): a batch rebuild would drop the FTS triggers on shoutouts
+    op.drop_column('shoutouts', 'department')
@@ -0,0 +1,191 @@
+"""monthly partitions for shout-outs and the archive manifest
+
+Revision ID: f7a3c9e1b254
+Revises: e6f2a7b3d481
+Create Date: 2026-10-19 00:30:00.000000
+
+`shoutouts.created_at` becomes NOT NULL (missing values are taken from the
+feed row). The `shoutout_archives` table is created for `app/archive.py`.
+
+Postgres: `shoutouts`, `shoutout_feed` and `shoutout_departments` are
+rebuilt as tables range-partitioned by month on `created_at`. Each one
+gets a partition for every month from its oldest row to three months
+ahead, plus a `_default` partition; `archive.ensure_partitions` adds later
+months. The primary keys gain `created_at`, because a key on a partitioned
+table must include the partition key. For the same reason `shoutouts.id`
+can no longer be referenced, so the foreign keys to it are dropped. The
+app checks that a shout-out exists before writing rows that refer to it.
+
+The rebuild copies every row under an exclusive lock on the three tables,
+so run it in a maintenance window. The downgrade makes them plain tables
+again, but it does not bring back months that were already archived.
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a3c9e1b254'
+down_revision: Union[str, Sequence[str], None] = 'e6f2a7b3d481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3  # the app's ARCHIVE_PARTITIONS_AHEAD default
+
+# table -> (primary key, [(index, definition)], [(foreign key, column, target)])
+TABLES = {
+    'shoutouts': (
+        ['id'],
+        [
+            ('ix_shoutouts_id', '(id)'),
+            ('ix_shoutouts_created_at_id', '(created_at, id)'),
+            ('ix_shoutouts_author_id_created_at', '(author_id, created_at)'),
+            ('ix_shoutouts_message_fts', "USING gin (to_tsvector('english', message))"),
+        ],
+        [('shoutouts_author_id_fkey', 'author_id', 'users(id)')],
+    ),
+    'shoutout_feed': (
+        ['shoutout_id'],
+        [('ix_shoutout_feed_created_at_id', '(created_at, shoutout_id)')],
+        [('shoutout_feed_author_id_fkey', 'author_id', 'users(id)')],
+    ),
+    'shoutout_departments': (
+        ['shoutout_id', 'department'],
+        [('ix_shoutout_departments_department_created_at_id', '(department, created_at, shoutout_id)')],
+        [],
+    ),
+}
+# tables whose shoutout_id referenced shoutouts.id before partitioning
+REFERENCING = [
+    'shoutout_tags', 'shoutout_reactions', 'shoutout_reaction_counts', 'shoutout_comments',
+    'shoutout_feed', 'shoutout_departments',
+]
+SQLITE_FTS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS shoutouts_fts_ai AFTER INSERT ON shoutouts BEGIN "
+    "INSERT INTO shoutouts_fts(rowid, message) VALUES (new.id, new.message); END",
+    "CREATE TRIGGER IF NOT EXISTS shoutouts_fts_ad AFTER DELETE ON shoutouts BEGIN "
+    "INSERT INTO shoutouts_fts(shoutouts_fts, rowid, message) VALUES ('delete', old.id, old.message); END",
+    "CREATE TRIGGER IF NOT EXISTS shoutouts_fts_au AFTER UPDATE OF message ON shoutouts BEGIN "
+    "INSERT INTO shoutouts_fts(shoutouts_fts, rowid, message) VALUES ('delete', old.id, old.message); "
+    "INSERT INTO shoutouts_fts(rowid, message) VALUES (new.id, new.message); END",
+]
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.month - 1 + n
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+
+def _months(first: date, last: date):
+    """(start, end) of every month from the one containing `first` through `last`'s."""
+    month = first.replace(day=1)
+    while month <= last:
+        yield month, _add_months(month, 1)
+        month = _add_months(month, 1)
+
+
+def _is_partitioned(bind, table: str) -> bool:
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"
+    ), {'name': table}).first() is not None
+
+
+def _rebuild(bind, table: str, partitioned: bool) -> None:
+    """Recreate `table` with the same columns and rows, partitioned by month or plain."""
+    pk, indexes, fks = TABLES[table]
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': table}).scalar() \
+        if table == 'shoutouts' else None
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")  # or dropping the old table drops it
+
+    suffix = " PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(f"CREATE TABLE {table}_rebuilt (LIKE {table} INCLUDING DEFAULTS){suffix}")
+    if partitioned:
+        today = datetime.utcnow().date()
+        oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {table}")).scalar()
+        for start, end in _months(oldest.date() if oldest else today, _add_months(today.replace(day=1), PARTITIONS_AHEAD)):
+            op.execute(
+                f"CREATE TABLE {table}_p{start:%Y_%m} PARTITION OF {table}_rebuilt "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table}_rebuilt DEFAULT")
+    op.execute(f"INSERT INTO {table}_rebuilt SELECT * FROM {table}")
+    op.execute(f"DROP TABLE {table} CASCADE")  # with the foreign keys that reference it
+    op.execute(f"ALTER TABLE {table}_rebuilt RENAME TO {table}")
+
+    key = pk + ['created_at'] if partitioned else pk
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({', '.join(key)})")
+    for name, definition in indexes:
+        op.execute(f"CREATE INDEX {name} ON {table} {definition}")
+    for name, column, target in fks:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {target}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('shoutout_archives'):
+        op.create_table(
+            'shoutout_archives',
+            sa.Column('month', sa.Date(), nullable=False),
+            sa.Column('path', sa.String(length=500), nullable=False),
+            sa.Column('format', sa.String(length=10), nullable=False),
+            sa.Column('min_id', sa.Integer(), nullable=False),
+            sa.Column('max_id', sa.Integer(), nullable=False),
+            sa.Column('shoutouts', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('comments', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('reactions', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('month'),
+        )
+
+    now = "(now() AT TIME ZONE 'utc')" if bind.dialect.name == 'postgresql' else 'CURRENT_TIMESTAMP'
+    op.execute(
+        "UPDATE shoutouts SET created_at = COALESCE("
+        f"(SELECT f.created_at FROM shoutout_feed f WHERE f.shoutout_id = shoutouts.id), {now}) "
+        "WHERE created_at IS NULL"
+    )
+
+    if bind.dialect.name == 'postgresql':
+        if _is_partitioned(bind, 'shoutouts'):
+            return
+        op.execute("ALTER TABLE shoutouts ALTER COLUMN created_at SET NOT NULL")
+        for table in TABLES:
+            _rebuild(bind, table, partitioned=True)
+        return
+
+    if next(col for col in inspector.get_columns('shoutouts') if col['name'] == 'created_at')['nullable']:
+        with op.batch_alter_table('shoutouts') as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        if inspector.has_table('shoutouts_fts'):
+            for stmt in SQLITE_FTS_TRIGGERS:  # dropped with the table the batch copied
+                op.execute(stmt)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        if _is_partitioned(bind, 'shoutouts'):
+            for table in TABLES:
+                _rebuild(bind, table, partitioned=False)
+            for table in REFERENCING:
+                op.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {table}_shoutout_id_fkey "
+                    "FOREIGN KEY (shoutout_id) REFERENCES shoutouts(id)"
+                )
+        op.execute("ALTER TABLE shoutouts ALTER COLUMN created_at DROP NOT NULL")
+    else:
+        with op.batch_alter_table('shoutouts') as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+        if sa.inspect(bind).has_table('shoutouts_fts'):
+            for stmt in SQLITE_FTS_TRIGGERS:
+                op.execute(stmt)
+    op.drop_table('shoutout_archives')
@@ -0,0 +1,401 @@
+"""
+Admin engagement analytics served from daily rollups.
+
+`run_rollup` folds new rows from the raw tables into per-day, per-department
+aggregates:
+
+- `daily_department_stats`: posts, tags, comments, reactions, active users
+- `daily_reaction_counts`: reactions by emoji
+- `daily_active_users`: who was active, so `active_users` stays a distinct count
+
+Every source table has a `rollup_watermarks` row holding the highest id
+already folded in, so a run only reads `id > watermark` (a primary key range)
+and does a fixed number of GROUP BY queries and upserts. Rows younger than
+ANALYTICS_ROLLUP_LAG_SECONDS are left for the next run, so rows from
+transactions still open at the watermark are not skipped. Aggregates and
+watermarks commit together; the watermark rows are locked (FOR UPDATE on
+Postgres), so concurrent runs in several workers do not double count.
+
+Activity counts under the acting user's department: posts and tags under
+the author's when posting, comments and reactions under the commenter's or
+reactor's at rollup time. Days are UTC. A reaction withdrawn after it was
+rolled up stays counted.
+
+The endpoints read only the rollup tables: a date range is one primary
+key range scan however much raw activity it covers.
+
+Run `python -m app.analytics` to roll up now (e.g. from cron when the
+background loop is off).
+"""
+import asyncio
+import csv
+import io
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import http_cache, schemas
+from .config import settings
+from .database import AsyncSessionLocal, ReadSessionLocal, insert_for
+from .models import (
+    User, ShoutOut, ShoutOutTag, ShoutOutReaction, ShoutOutComment,
+    DailyDepartmentStats, DailyReactionCount, DailyActiveUser, RollupWatermark,
+)
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("shoutouts", "shoutout_tags", "shoutout_comments", "shoutout_reactions")
+METRICS = ("posts", "tags", "comments", "reactions", "active_users")
+WRITE_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+Key = Tuple[date, str]  # (day, department)
+
+
+def _day(value) -> date:
+    """func.date() gives a date on Postgres and an ISO string on SQLite."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+# ---------------------------
+# Rollup
+# ---------------------------
+@dataclass
+class RollupResult:
+    rows: Dict[str, int] = field(default_factory=dict)  # source -> rows folded in
+    days: int = 0  # (day, department) pairs touched
+
+
+async def _watermarks(db: AsyncSession) -> Dict[str, int]:
+    """Current watermarks, locked until commit; creates missing rows at 0."""
+    await db.execute(
+        insert_for(db, RollupWatermark)
+        .values([{"source": source, "last_id": 0} for source in SOURCES])
+        .on_conflict_do_nothing(index_elements=["source"])
+    )
+    res = await db.execute(select(RollupWatermark.source, RollupWatermark.last_id).with_for_update())
+    return dict(res.all())
+
+
+async def _upper_bound(db: AsyncSession, id_column, created_at, after: int, cutoff: datetime, *joins) -> int:
+    """Highest new id whose row is at least the lag old (`after` if none)."""
+    query = select(func.max(id_column)).where(id_column > after, or_(created_at.is_(None), created_at <= cutoff))
+    for target, on in joins:
+        query = query.join(target, on)
+    return (await db.execute(query)).scalar() or after
+
+
+async def _grouped(db: AsyncSession, query) -> List[tuple]:
+    return [(_day(row[0]), *row[1:]) for row in (await db.execute(query)).all()]
+
+
+async def _upsert(db: AsyncSession, model, keys: List[str], rows: List[dict], add=(), replace=()) -> None:
+    """Insert `rows`; on conflict add the `add` columns, overwrite the `replace` ones, or keep the row."""
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        stmt = insert_for(db, model).values(rows[start:start + WRITE_BATCH_SIZE])
+        set_ = {name: getattr(model, name) + getattr(stmt.excluded, name) for name in add}
+        set_.update({name: getattr(stmt.excluded, name) for name in replace})
+        if set_:
+            stmt = stmt.on_conflict_do_update(index_elements=keys, set_=set_)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+        await db.execute(stmt)
+
+
+async def run_rollup(db: AsyncSession, now: Optional[datetime] = None) -> RollupResult:
+    """Fold every source row past its watermark (and older than the lag) into the rollups, then commit."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+    marks = await _watermarks(db)
+    result = RollupResult()
+
+    post_day = func.date(ShoutOut.created_at)
+    comment_day = func.date(ShoutOutComment.created_at)
+    reaction_day = func.date(func.coalesce(ShoutOutReaction.created_at, ShoutOut.created_at))
+    author = (ShoutOut, ShoutOut.id == ShoutOutTag.shoutout_id)
+    commenter = (User, User.id == ShoutOutComment.user_id)
+    reactor = (User, User.id == ShoutOutReaction.user_id)
+    reacted_post = (ShoutOut, ShoutOut.id == ShoutOutReaction.shoutout_id)
+
+    bounds = {
+        "shoutouts": await _upper_bound(db, ShoutOut.id, ShoutOut.created_at, marks["shoutouts"], cutoff),
+        "shoutout_tags": await _upper_bound(
+            db, ShoutOutTag.id, ShoutOut.created_at, marks["shoutout_tags"], cutoff, author
+        ),
+        "shoutout_comments": await _upper_bound(
+            db, ShoutOutComment.id, ShoutOutComment.created_at, marks["shoutout_comments"], cutoff
+        ),
+        "shoutout_reactions": await _upper_bound(
+            db, ShoutOutReaction.id, ShoutOutReaction.created_at, marks["shoutout_reactions"], cutoff
+        ),
+    }
+    in_range = {
+        "shoutouts": and_(ShoutOut.id > marks["shoutouts"], ShoutOut.id <= bounds["shoutouts"]),
+        "shoutout_tags": and_(ShoutOutTag.id > marks["shoutout_tags"], ShoutOutTag.id <= bounds["shoutout_tags"]),
+        "shoutout_comments": and_(
+            ShoutOutComment.id > marks["shoutout_comments"], ShoutOutComment.id <= bounds["shoutout_comments"]
+        ),
+        "shoutout_reactions": and_(
+            ShoutOutReaction.id > marks["shoutout_reactions"], ShoutOutReaction.id <= bounds["shoutout_reactions"]
+        ),
+    }
+
+    counts: Dict[Key, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRICS[:-1], 0))
+    emojis: Dict[Tuple[date, str, str], int] = {}
+    active: Set[Tuple[date, str, int]] = set()
+
+    if bounds["shoutouts"] > marks["shoutouts"]:
+        base = select(post_day, ShoutOut.department).where(in_range["shoutouts"], ShoutOut.department.is_not(None))
+        for day, dept, n in await _grouped(db, base.add_columns(func.count()).group_by(post_day, ShoutOut.department)):
+            counts[(day, dept)]["posts"] += n
+            result.rows["shoutouts"] = result.rows.get("shoutouts", 0) + n
+        for day, dept, uid in await _grouped(db, base.add_columns(ShoutOut.author_id).distinct()):
+            active.add((day, dept, uid))
+
+    if bounds["shoutout_tags"] > marks["shoutout_tags"]:
+        query = (
+            select(post_day, ShoutOut.department, func.count())
+            .select_from(ShoutOutTag).join(*author)
+            .where(in_range["shoutout_tags"], ShoutOut.department.is_not(None))
+            .group_by(post_day, ShoutOut.department)
+        )
+        for day, dept, n in await _grouped(db, query):
+            counts[(day, dept)]["tags"] += n
+            result.rows["shoutout_tags"] = result.rows.get("shoutout_tags", 0) + n
+
+    if bounds["shoutout_comments"] > marks["shoutout_comments"]:
+        base = select(comment_day, User.department).select_from(ShoutOutComment).join(*commenter).where(
+            in_range["shoutout_comments"], ShoutOutComment.created_at.is_not(None)
+        )
+        for day, dept, n in await _grouped(db, base.add_columns(func.count()).group_by(comment_day, User.department)):
+            counts[(day, dept)]["comments"] += n
+            result.rows["shoutout_comments"] = result.rows.get("shoutout_comments", 0) + n
+        for day, dept, uid in await _grouped(db, base.add_columns(ShoutOutComment.user_id).distinct()):
+            active.add((day, dept, uid))
+
+    if bounds["shoutout_reactions"] > marks["shoutout_reactions"]:
+        base = (
+            select(reaction_day, User.department)
+            .select_from(ShoutOutReaction).join(*reactor).join(*reacted_post)
+            .where(in_range["shoutout_reactions"])
+        )
+        query = base.add_columns(ShoutOutReaction.emoji, func.count()).group_by(
+            reaction_day, User.department, ShoutOutReaction.emoji
+        )
+        for day, dept, emoji, n in await _grouped(db, query):
+            counts[(day, dept)]["reactions"] += n
+            emojis[(day, dept, emoji)] = n
+            result.rows["shoutout_reactions"] = result.rows.get("shoutout_reactions", 0) + n
+        for day, dept, uid in await _grouped(db, base.add_columns(ShoutOutReaction.user_id).distinct()):
+            active.add((day, dept, uid))
+
+    # sorted rows keep concurrent upserts from deadlocking on Postgres
+    await _upsert(
+        db, DailyDepartmentStats, ["day", "department"],
+        [{"day": day, "department": dept, **values} for (day, dept), values in sorted(counts.items())],
+        add=METRICS[:-1],
+    )
+    await _upsert(
+        db, DailyReactionCount, ["day", "department", "emoji"],
+        [{"day": day, "department": dept, "emoji": emoji, "count": n} for (day, dept, emoji), n in sorted(emojis.items())],
+        add=("count",),
+    )
+    await _upsert(
+        db, DailyActiveUser, ["day", "department", "user_id"],
+        [{"day": day, "department": dept, "user_id": uid} for day, dept, uid in sorted(active)],
+    )
+    # recount distinct active users for the days this run touched
+    touched_days = sorted({day for day, _ in counts})
+    if touched_days:
+        res = await db.execute(
+            select(DailyActiveUser.day, DailyActiveUser.department, func.count())
+            .where(DailyActiveUser.day.in_(touched_days))
+            .group_by(DailyActiveUser.day, DailyActiveUser.department)
+        )
+        await _upsert(
+            db, DailyDepartmentStats, ["day", "department"],
+            [{"day": _day(day), "department": dept, "active_users": n} for day, dept, n in sorted(res.all())],
+            replace=("active_users",),
+        )
+
+    for source in SOURCES:
+        await db.execute(
+            RollupWatermark.__table__.update()
+            .where(RollupWatermark.source == source)
+            .values(last_id=bounds[source], updated_at=now)
+        )
+    await db.commit()
+    result.days = len(counts)
+    if counts:
+        await http_cache.bump("analytics")
+    return result
+
+
+_roller: Optional[asyncio.Task] = None
+
+
+async def _rollup_forever() -> None:
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await run_rollup(db)
+        except Exception:
+            logger.exception("Analytics rollup failed; retrying next interval")
+        await asyncio.sleep(settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+
+
+async def start() -> None:
+    """Roll up now and then every ANALYTICS_ROLLUP_INTERVAL_SECONDS, in the background (if enabled)."""
+    global _roller
+    if settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS > 0:
+        _roller = asyncio.create_task(_rollup_forever())
+
+
+async def stop() -> None:
+    global _roller
+    if _roller is not None:
+        _roller.cancel()
+        _roller = None
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+def _range_filter(model, start: date, end: date, department: Optional[str]):
+    clauses = [model.day >= start, model.day <= end]
+    if department is not None:
+        clauses.append(model.department == department)
+    return clauses
+
+
+async def last_rollup(db: AsyncSession) -> Optional[datetime]:
+    res = await db.execute(select(func.min(RollupWatermark.updated_at)))
+    return res.scalar()
+
+
+async def daily_series(db: AsyncSession, start: date, end: date, department: Optional[str]) -> schemas.AnalyticsSeries:
+    """
+    One point per day from `start` to `end` (inclusive), zeros on quiet days.
+    Without `department`, departments are summed (a user is active in one
+    department per day, so active users add up too).
+    """
+    days: Dict[date, schemas.AnalyticsDay] = {}
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        days[day] = schemas.AnalyticsDay(day=day.isoformat())
+
+    res = await db.execute(
+        select(DailyDepartmentStats.day, *(func.sum(getattr(DailyDepartmentStats, name)) for name in METRICS))
+        .where(*_range_filter(DailyDepartmentStats, start, end, department))
+        .group_by(DailyDepartmentStats.day)
+    )
+    for day, *values in res.all():
+        point = days[_day(day)]
+        for name, value in zip(METRICS, values):
+            setattr(point, name, int(value or 0))
+
+    res = await db.execute(
+        select(DailyReactionCount.day, DailyReactionCount.emoji, func.sum(DailyReactionCount.count))
+        .where(*_range_filter(DailyReactionCount, start, end, department))
+        .group_by(DailyReactionCount.day, DailyReactionCount.emoji)
+    )
+    for day, emoji, count in res.all():
+        days[_day(day)].reactions_by_emoji[emoji] = int(count)
+
+    return schemas.AnalyticsSeries(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        department=department,
+        rolled_up_at=_isoformat(await last_rollup(db)),
+        days=list(days.values()),
+    )
+
+
+async def summary(db: AsyncSession, start: date, end: date, department: Optional[str]) -> schemas.AnalyticsSummary:
+    """Totals over the range; `active_users` counts each user once for the whole range."""
+    res = await db.execute(
+        select(*(func.coalesce(func.sum(getattr(DailyDepartmentStats, name)), 0) for name in METRICS[:-1]))
+        .where(*_range_filter(DailyDepartmentStats, start, end, department))
+    )
+    totals = dict(zip(METRICS[:-1], (int(v) for v in res.one())))
+    res = await db.execute(
+        select(func.count(func.distinct(DailyActiveUser.user_id)))
+        .where(*_range_filter(DailyActiveUser, start, end, department))
+    )
+    totals["active_users"] = res.scalar_one()
+    res = await db.execute(
+        select(DailyReactionCount.emoji, func.sum(DailyReactionCount.count))
+        .where(*_range_filter(DailyReactionCount, start, end, department))
+        .group_by(DailyReactionCount.emoji)
+    )
+    return schemas.AnalyticsSummary(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        department=department,
+        rolled_up_at=_isoformat(await last_rollup(db)),
+        reactions_by_emoji={emoji: int(count) for emoji, count in res.all()},
+        **totals,
+    )
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+# ---------------------------
+# Export
+# ---------------------------
+EXPORT_COLUMNS = ("day", "department", *METRICS, "reactions_by_emoji")
+
+
+def _csv_chunk(rows) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+async def export_csv(start: date, end: date, department: Optional[str]) -> AsyncIterator[str]:
+    """
+    One CSV row per day and department, oldest first, with reactions by
+    emoji as `emoji=count;...`. Runs in its own read sessions because it
+    outlives the request handler.
+    """
+    yield _csv_chunk([EXPORT_COLUMNS])
+    stats_query = (
+        select(DailyDepartmentStats)
+        .where(*_range_filter(DailyDepartmentStats, start, end, department))
+        .order_by(DailyDepartmentStats.day, DailyDepartmentStats.department)
+    )
+    async with ReadSessionLocal() as db, ReadSessionLocal() as lookup:
+        result = await db.stream_scalars(stats_query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            first, last = partition[0].day, partition[-1].day
+            res = await lookup.execute(
+                select(DailyReactionCount.day, DailyReactionCount.department, DailyReactionCount.emoji, DailyReactionCount.count)
+                .where(*_range_filter(DailyReactionCount, first, last, department))
+                .order_by(DailyReactionCount.emoji)
+            )
+            emojis: Dict[Key, List[str]] = defaultdict(list)
+            for day, dept, emoji, count in res.all():
+                emojis[(_day(day), dept)].append(f"{emoji}={count}")
+            yield _csv_chunk(
+                [
+                    row.day.isoformat(), row.department, *(getattr(row, name) for name in METRICS),
+                    ";".join(emojis.get((row.day, row.department), ())),
+                ]
+                for row in partition
+            )
+
+if __name__ == "__main__":
+    async def _main():
+        async with AsyncSessionLocal() as db:
+            result = await run_rollup(db)
+        folded = ", ".join(f"{source} {n}" for source, n in result.rows.items()) or "nothing new"
+        print(f"Rolled up {folded} into {result.days} department-days")
+
+    asyncio.run(_main())
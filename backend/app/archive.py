@@ -0,0 +1,529 @@
+"""
+Monthly partitions and archival of old shout-outs.
+
+Postgres: `shoutouts`, `shoutout_feed` and `shoutout_departments` are
+range-partitioned by month on `created_at` (migration f7a3c9e1b254).
+`ensure_partitions` creates the next ARCHIVE_PARTITIONS_AHEAD months on
+startup and on each archive run. A row outside every month goes to the
+table's `_default` partition. Tags, reactions, reaction counts and
+comments are not partitioned: they carry their own timestamps, not the
+post's, so they are archived and deleted along with their shout-out
+through their shoutout_id indexes.
+
+`POST /admin/archive` (superadmin) moves every month older than
+ARCHIVE_AFTER_MONTHS out of the database. It runs in the server so the
+run can invalidate the caches that still hold the deleted rows: the
+response cache versions and this worker's department feed and comment
+pages (other workers' expire with their TTLs, as after any write). The
+`python -m app.archive` command does the same from its own process, so it
+only runs with the shared response cache backend (RESPONSE_CACHE_BACKEND
+= "redis"), whose bump reaches the workers. Each shout-out becomes one record holding its tags,
+reactions and comments. A month's records are written to
+ARCHIVE_DIR/shoutouts-YYYY-MM.ndjson.gz (or .parquet, which needs
+pyarrow). Then, in one transaction, the rows are deleted (on Postgres the
+month's partitions are dropped) and the file is recorded in
+`shoutout_archives`. Rows that reach an archived month later are merged
+into its file on the next run. Run one archiver at a time.
+
+Reads: the feed, search and metrics only see the database. Explicit
+lookups (`find`, `fetch_comments`) fall back to the files for ids at or
+below the newest archived id. Each worker caches the manifest for
+ARCHIVE_MANIFEST_TTL_SECONDS.
+
+Counters maintained on write keep the archived activity: user_stats, the
+leaderboards and the analytics rollups. The rollup runs before each
+archive. Their rebuild commands only see rows still in the database.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import analytics, comments, feed, http_cache
+from .cache import TTLCache
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import (
+    User, ShoutOut, ShoutOutTag, ShoutOutReaction, ShoutOutReactionCount, ShoutOutComment, ShoutOutFeedItem,
+    ShoutOutDepartment, ShoutOutArchive,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("shoutouts", "shoutout_feed", "shoutout_departments")
+DEPENDENT_MODELS = (ShoutOutTag, ShoutOutReaction, ShoutOutReactionCount, ShoutOutComment)
+FORMATS = {"ndjson": ".ndjson.gz", "parquet": ".parquet"}
+EXPORT_BATCH_SIZE = 1000
+DEFAULT_ARCHIVE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "archive"))
+
+# the manifest as (month, path, format, min_id, max_id) tuples, newest first
+_manifest = TTLCache("archive_manifest", maxsize=1, ttl=settings.ARCHIVE_MANIFEST_TTL_SECONDS)
+# shoutout_id -> archived record, so paging through its comments reads the file once
+_record_cache = TTLCache("archived_shoutouts", maxsize=256, ttl=300)
+# held by an archive run in this process
+running = asyncio.Lock()
+
+
+def is_partition(name: str) -> bool:
+    """True for the child tables of PARTITIONED_TABLES (`<table>_p2025_01`, `<table>_default`)."""
+    parent, _, suffix = name.rpartition("_")
+    if suffix == "default":
+        return parent in PARTITIONED_TABLES
+    parent, _, year = parent.rpartition("_p")
+    return parent in PARTITIONED_TABLES and year.isdigit() and suffix.isdigit()
+
+
+# ---------------------------
+# Months
+# ---------------------------
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.month - 1 + n
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+
+def _bounds(month: date) -> Tuple[datetime, datetime]:
+    end = add_months(month, 1)
+    return datetime(month.year, month.month, 1), datetime(end.year, end.month, 1)
+
+
+def _partition(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+# ---------------------------
+# Partitions (Postgres)
+# ---------------------------
+async def is_partitioned(db: AsyncSession) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    res = await db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'shoutouts'"
+    ))
+    return res.first() is not None
+
+
+async def ensure_partitions(db: AsyncSession, today: Optional[date] = None) -> int:
+    """
+    Create the monthly partitions from this month through
+    ARCHIVE_PARTITIONS_AHEAD months ahead; returns how many were missing.
+    No-op unless the tables are partitioned.
+    """
+    if not await is_partitioned(db):
+        return 0
+    this_month = month_start(today or datetime.utcnow().date())
+    created = 0
+    for n in range(settings.ARCHIVE_PARTITIONS_AHEAD + 1):
+        month = add_months(this_month, n)
+        start, end = _bounds(month)
+        for table in PARTITIONED_TABLES:
+            name = _partition(table, month)
+            if (await db.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar() is not None:
+                continue
+            try:
+                async with db.begin_nested():
+                    await db.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+                    ))
+                created += 1
+            except Exception:
+                # the default partition already holds rows of that month; they stay there
+                logger.exception("Could not create partition %s", name)
+    await db.commit()
+    return created
+
+
+# ---------------------------
+# Files
+# ---------------------------
+def archive_dir() -> str:
+    return settings.ARCHIVE_DIR or DEFAULT_ARCHIVE_DIR
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _parse_times(record: dict) -> dict:
+    record["created_at"] = datetime.fromisoformat(record["created_at"])
+    for key in ("reactions", "comments"):
+        for item in record[key]:
+            if item["created_at"] is not None:
+                item["created_at"] = datetime.fromisoformat(item["created_at"])
+    return record
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    ts = pa.timestamp("us")
+    return pa.schema([
+        ("id", pa.int64()),
+        ("author_id", pa.int64()),
+        ("message", pa.string()),
+        ("image_url", pa.string()),
+        ("thumbnail_url", pa.string()),
+        ("created_at", ts),
+        ("department", pa.string()),
+        ("tagged_users", pa.list_(pa.int64())),
+        ("tagged_user_names", pa.list_(pa.string())),
+        ("reaction_counts", pa.list_(pa.struct([("emoji", pa.string()), ("count", pa.int64())]))),
+        ("reactions", pa.list_(pa.struct([("user_id", pa.int64()), ("emoji", pa.string()), ("created_at", ts)]))),
+        ("comments", pa.list_(pa.struct([
+            ("id", pa.int64()), ("user_id", pa.int64()), ("user_name", pa.string()),
+            ("content", pa.string()), ("created_at", ts),
+        ]))),
+        ("departments", pa.list_(pa.string())),
+    ])
+
+
+class ArchiveWriter:
+    """Append records to a new archive file in `fmt`."""
+
+    def __init__(self, path: str, fmt: str):
+        self.fmt = fmt
+        if fmt == "ndjson":
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            import pyarrow.parquet as pq
+
+            self._schema = _parquet_schema()
+            self._file = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, records: List[dict]) -> None:
+        if not records:
+            return
+        if self.fmt == "ndjson":
+            # "id" first and no spaces: `_find_in_file` matches the line prefix
+            self._file.writelines(
+                json.dumps(record, default=_json_default, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for record in records
+            )
+        else:
+            import pyarrow as pa
+
+            self._file.write_table(pa.Table.from_pylist(records, schema=self._schema))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def iter_file(path: str, fmt: str) -> Iterator[dict]:
+    """Every record of an archive file, in file order."""
+    if fmt == "ndjson":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield _parse_times(json.loads(line))
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=EXPORT_BATCH_SIZE):
+            yield from batch.to_pylist()
+
+
+def _find_in_file(path: str, fmt: str, shoutout_id: int) -> Optional[dict]:
+    if fmt == "ndjson":
+        prefix = f'{{"id":{shoutout_id},'
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(prefix):
+                    return _parse_times(json.loads(line))
+        return None
+    import pyarrow.parquet as pq
+
+    rows = pq.read_table(path, filters=[("id", "=", shoutout_id)]).to_pylist()
+    return rows[0] if rows else None
+
+
+# ---------------------------
+# Export
+# ---------------------------
+async def _records(db: AsyncSession, posts: List[tuple]) -> List[dict]:
+    """One archive record per (id, author_id, message, image_url, thumbnail_url, created_at, department) row."""
+    ids = [post[0] for post in posts]
+    records = {
+        sid: {
+            "id": sid, "author_id": author_id, "message": message, "image_url": image_url,
+            "thumbnail_url": thumbnail_url, "created_at": created_at, "department": department,
+            "tagged_users": [], "tagged_user_names": [], "reaction_counts": [], "reactions": [],
+            "comments": [], "departments": [],
+        }
+        for sid, author_id, message, image_url, thumbnail_url, created_at, department in posts
+    }
+
+    res = await db.execute(
+        select(ShoutOutTag.shoutout_id, ShoutOutTag.user_id, User.name)
+        .outerjoin(User, User.id == ShoutOutTag.user_id)
+        .where(ShoutOutTag.shoutout_id.in_(ids))
+        .order_by(ShoutOutTag.id)
+    )
+    for sid, user_id, name in res.all():
+        records[sid]["tagged_users"].append(user_id)
+        records[sid]["tagged_user_names"].append(name or str(user_id))
+    # names as shown when posted, where the feed row still has them
+    res = await db.execute(
+        select(ShoutOutFeedItem.shoutout_id, ShoutOutFeedItem.tagged_user_names)
+        .where(ShoutOutFeedItem.shoutout_id.in_(ids))
+    )
+    for sid, names in res.all():
+        if names and len(names) == len(records[sid]["tagged_users"]):
+            records[sid]["tagged_user_names"] = list(names)
+
+    res = await db.execute(
+        select(ShoutOutReactionCount.shoutout_id, ShoutOutReactionCount.emoji, ShoutOutReactionCount.count)
+        .where(ShoutOutReactionCount.shoutout_id.in_(ids), ShoutOutReactionCount.count > 0)
+        .order_by(ShoutOutReactionCount.shoutout_id, ShoutOutReactionCount.emoji)
+    )
+    for sid, emoji, count in res.all():
+        records[sid]["reaction_counts"].append({"emoji": emoji, "count": count})
+
+    res = await db.execute(
+        select(ShoutOutReaction.shoutout_id, ShoutOutReaction.user_id, ShoutOutReaction.emoji, ShoutOutReaction.created_at)
+        .where(ShoutOutReaction.shoutout_id.in_(ids))
+        .order_by(ShoutOutReaction.id)
+    )
+    for sid, user_id, emoji, created_at in res.all():
+        records[sid]["reactions"].append({"user_id": user_id, "emoji": emoji, "created_at": created_at})
+
+    res = await db.execute(
+        select(
+            ShoutOutComment.shoutout_id, ShoutOutComment.id, ShoutOutComment.user_id, User.name,
+            ShoutOutComment.content, ShoutOutComment.created_at,
+        )
+        .outerjoin(User, User.id == ShoutOutComment.user_id)
+        .where(ShoutOutComment.shoutout_id.in_(ids))
+        .order_by(ShoutOutComment.id)
+    )
+    for sid, comment_id, user_id, name, content, created_at in res.all():
+        records[sid]["comments"].append({
+            "id": comment_id, "user_id": user_id, "user_name": name, "content": content, "created_at": created_at,
+        })
+
+    res = await db.execute(
+        select(ShoutOutDepartment.shoutout_id, ShoutOutDepartment.department)
+        .where(ShoutOutDepartment.shoutout_id.in_(ids))
+        .order_by(ShoutOutDepartment.department)
+    )
+    for sid, department in res.all():
+        records[sid]["departments"].append(department)
+    return [records[sid] for sid in ids]
+
+
+@dataclass
+class MonthResult:
+    month: date
+    shoutouts: int
+    comments: int
+    reactions: int
+    path: str
+
+
+async def archive_month(db: AsyncSession, month: date, fmt: str) -> Optional[MonthResult]:
+    """
+    Write the month's shout-outs to its archive file (merged with an
+    existing one), then delete them and record the file, and commit.
+    Returns None if the month has no rows.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown ARCHIVE_FORMAT: {fmt}")
+    start, end = _bounds(month)
+    in_month = (ShoutOut.created_at >= start, ShoutOut.created_at < end)
+    if db.bind.dialect.name == "postgresql":
+        # react / unreact lock the feed row and comments update it: hold them off until the rows are gone
+        await db.execute(
+            select(ShoutOutFeedItem.shoutout_id)
+            .where(ShoutOutFeedItem.created_at >= start, ShoutOutFeedItem.created_at < end)
+            .with_for_update()
+        )
+    ids = list((await db.execute(select(ShoutOut.id).where(*in_month).order_by(ShoutOut.id))).scalars())
+    if not ids:
+        await db.rollback()
+        return None
+
+    previous = await db.get(ShoutOutArchive, month)
+    name = f"shoutouts-{month:%Y-%m}{FORMATS[fmt]}"
+    directory = archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, name + ".tmp")
+    writer = ArchiveWriter(tmp, fmt)
+    total = MonthResult(month, 0, 0, 0, name)
+    min_id, max_id = ids[0], ids[-1]
+    try:
+        def add(records: List[dict]) -> None:
+            writer.write(records)
+            total.shoutouts += len(records)
+            total.comments += sum(len(record["comments"]) for record in records)
+            total.reactions += sum(len(record["reactions"]) for record in records)
+
+        if previous is not None:
+            # a record of a still-present id comes from an earlier run that did not commit
+            fresh = set(ids)
+            for record in iter_file(os.path.join(directory, previous.path), previous.format):
+                if record["id"] not in fresh:
+                    add([record])
+            min_id, max_id = min(min_id, previous.min_id), max(max_id, previous.max_id)
+        columns = (
+            ShoutOut.id, ShoutOut.author_id, ShoutOut.message, ShoutOut.image_url, ShoutOut.thumbnail_url,
+            ShoutOut.created_at, ShoutOut.department,
+        )
+        for i in range(0, len(ids), EXPORT_BATCH_SIZE):
+            batch = ids[i:i + EXPORT_BATCH_SIZE]
+            posts = (await db.execute(select(*columns).where(ShoutOut.id.in_(batch)).order_by(ShoutOut.id))).all()
+            add(await _records(db, [tuple(post) for post in posts]))
+    finally:
+        writer.close()
+    os.replace(tmp, os.path.join(directory, name))
+
+    month_ids = select(ShoutOut.id).where(*in_month).scalar_subquery()
+    for model in DEPENDENT_MODELS:
+        await db.execute(delete(model).where(model.shoutout_id.in_(month_ids)))
+    if await is_partitioned(db):
+        for table in PARTITIONED_TABLES:
+            await db.execute(text(f"DROP TABLE IF EXISTS {_partition(table, month)}"))
+    # plain tables, and rows of the month that are in the default partition
+    await db.execute(delete(ShoutOutDepartment).where(ShoutOutDepartment.shoutout_id.in_(month_ids)))
+    await db.execute(delete(ShoutOutFeedItem).where(ShoutOutFeedItem.shoutout_id.in_(month_ids)))
+    await db.execute(delete(ShoutOut).where(*in_month))
+
+    stale = previous.path if previous is not None and previous.path != name else None  # ARCHIVE_FORMAT changed
+    if previous is None:
+        previous = ShoutOutArchive(month=month)
+        db.add(previous)
+    previous.path, previous.format = name, fmt
+    previous.min_id, previous.max_id = min_id, max_id
+    previous.shoutouts, previous.comments, previous.reactions = total.shoutouts, total.comments, total.reactions
+    previous.archived_at = datetime.utcnow()
+    await db.commit()
+    if stale:
+        os.remove(os.path.join(directory, stale))
+    return total
+
+
+async def archive(db: AsyncSession, today: Optional[date] = None, fmt: Optional[str] = None) -> List[MonthResult]:
+    """Archive every month that ended more than ARCHIVE_AFTER_MONTHS ago, oldest first."""
+    today = today or datetime.utcnow().date()
+    cutoff = add_months(month_start(today), -settings.ARCHIVE_AFTER_MONTHS)
+    cutoff_at = datetime(cutoff.year, cutoff.month, 1)
+    await ensure_partitions(db, today)
+    await analytics.run_rollup(db)  # the rollups must have every row before it is deleted
+
+    done: List[MonthResult] = []
+    query = select(func.min(ShoutOut.created_at)).where(ShoutOut.created_at < cutoff_at)
+    while True:
+        oldest = (await db.execute(query)).scalar()
+        if oldest is None:
+            break
+        month = month_start(oldest.date())
+        result = await archive_month(db, month, fmt or settings.ARCHIVE_FORMAT)
+        if result is not None:
+            done.append(result)
+        query = query.where(ShoutOut.created_at >= _bounds(month)[1])
+    if done:
+        _manifest.clear()
+        feed.department_cache.clear()
+        comments.first_page_cache.clear()
+        await http_cache.bump("feed")
+    return done
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+async def _entries(db: AsyncSession) -> List[tuple]:
+    entries = _manifest.get("entries")
+    if entries is None:
+        res = await db.execute(
+            select(ShoutOutArchive.month, ShoutOutArchive.path, ShoutOutArchive.format,
+                   ShoutOutArchive.min_id, ShoutOutArchive.max_id)
+            .order_by(ShoutOutArchive.month.desc())
+        )
+        entries = [tuple(row) for row in res.all()]
+        _manifest.set("entries", entries)
+    return entries
+
+
+async def find(db: AsyncSession, shoutout_id: int) -> Optional[dict]:
+    """The archived record of a shout-out, or None if it was never archived."""
+    record = _record_cache.get(shoutout_id)
+    if record is not None:
+        return record
+    for _, path, fmt, min_id, max_id in await _entries(db):
+        if min_id <= shoutout_id <= max_id:
+            record = await run_in_threadpool(_find_in_file, os.path.join(archive_dir(), path), fmt, shoutout_id)
+            if record is not None:
+                _record_cache.set(shoutout_id, record)
+                return record
+    return None
+
+
+def to_row(record: dict) -> dict:
+    """An archived record as a `ShoutOutDetail` dict for `fastjson`."""
+    return {
+        "id": record["id"],
+        "author_id": record["author_id"],
+        "message": record["message"],
+        "image_url": record["image_url"],
+        "thumbnail_url": record["thumbnail_url"],
+        "created_at": record["created_at"],
+        "tagged_users": record["tagged_users"],
+        "tagged_user_names": record["tagged_user_names"],
+        "reactions": {item["emoji"]: item["count"] for item in record["reaction_counts"]},
+        "comments_count": len(record["comments"]),
+        "archived": True,
+    }
+
+
+async def fetch_comments(
+    db: AsyncSession, shoutout_id: int, after_id: Optional[int], limit: int
+) -> Optional[Tuple[List[dict], Optional[int]]]:
+    """Like `comments.fetch_page` for an archived shout-out; None if it is not archived."""
+    entries = await _entries(db)
+    if not entries or shoutout_id > max(entry[4] for entry in entries):
+        return None  # newer than anything archived: skip the file lookup
+    record = await find(db, shoutout_id)
+    if record is None:
+        return None
+    rows = [
+        {
+            "id": c["id"], "content": c["content"], "created_at": c["created_at"],
+            "user_id": c["user_id"], "user_name": c["user_name"],
+        }
+        for c in record["comments"]
+        if after_id is None or c["id"] > after_id
+    ]
+    page = rows[:limit]
+    return page, page[-1]["id"] if len(rows) > limit else None
+
+
+if __name__ == "__main__":
+    if settings.RESPONSE_CACHE_BACKEND != "redis":
+        raise SystemExit(
+            "python -m app.archive needs RESPONSE_CACHE_BACKEND=redis: with a per-process cache the running "
+            "workers keep serving archived rows. Use POST /admin/archive instead."
+        )
+
+    async def _main():
+        async with AsyncSessionLocal() as db:
+            months = await archive(db)
+        for result in months:
+            print(
+                f"Archived {result.month:%Y-%m}: {result.shoutouts} shout-outs, {result.comments} comments, "
+                f"{result.reactions} reactions -> {result.path}"
+            )
+        if not months:
+            print("Nothing to archive")
+
+    asyncio.run(_main())
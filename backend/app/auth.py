@@ -1,16 +1,21 @@
+import time
+import uuid
 from typing import Optional
 from datetime import datetime, timedelta
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import make_transient_to_detached
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 
+from . import revocation
 from .database import get_db
 from .models import User
 from .config import settings
+from .cache import TTLCache
+from .hashing import PasswordHasher, pwd_context, verify_password, get_password_hash
 
 # ---------------------------
 # OAuth2 scheme
@@ -20,21 +25,13 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 # ---------------------------
 # Password hashing
 # ---------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Verify a plain password against the hashed password.
-    Truncate to 72 characters due to bcrypt limit.
-    """
-    return pwd_context.verify(plain_password[:72], hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """
-    Hash a password with bcrypt.
-    Truncate to 72 characters due to bcrypt limit.
-    """
-    return pwd_context.hash(password[:72])
+# verify_password / get_password_hash (re-exported above) block for ~250 ms;
+# async request handlers should go through password_hasher instead.
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    pool=settings.PASSWORD_HASH_POOL,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY or None,
+)
 
 # ---------------------------
 # Authenticate user
@@ -46,30 +43,94 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> Opti
     """
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalars().first()
-    if not user or not verify_password(password, user.password):
+    if not user or not await password_hasher.verify(password, user.password):
         return None
     return user
 
 # ---------------------------
 # Token creation
 # ---------------------------
+# Every token gets a `jti`, an `iat` and a `type`; tokens from one login
+# share the refresh-token family `fam` (see revocation.py).
+def _encode(data: dict, expires_delta: timedelta, token_type: str) -> str:
+    to_encode = data.copy()
+    now = datetime.utcnow()
+    to_encode.update({"exp": now + expires_delta, "iat": now, "jti": uuid.uuid4().hex, "type": token_type})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def new_token_family() -> str:
+    return uuid.uuid4().hex
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token.
     """
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return _encode(data, expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES), "access")
 
 def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
-    Create a JWT refresh token.
+    Create a JWT refresh token, in `data["fam"]`'s family or a new one.
     """
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    data = {**data, "fam": data.get("fam") or new_token_family()}
+    return _encode(data, expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS), "refresh")
+
+# ---------------------------
+# Principal cache
+# ---------------------------
+# Detached snapshots of recently authenticated users, keyed by user id.
+# Call `invalidate_user` whenever a user row is changed or deleted.
+principal_cache = TTLCache(
+    "principal",
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _snapshot(user: User) -> User:
+    """Copy a loaded user into a detached instance that no session owns."""
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def invalidate_user(user_id: int) -> None:
+    principal_cache.pop(user_id)
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token from an `Authorization: Bearer <token>` header value, if any."""
+    scheme, _, token = (authorization or "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Claims of a correctly signed, unexpired token, or None. Does not check revocation."""
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+
+def token_still_valid(payload: dict) -> bool:
+    """For connections that outlive a request: the decoded token has neither expired nor been revoked."""
+    return payload.get("exp", 0) > time.time() and not revocation.is_revoked(payload)
+
+
+def decode_user_id(token: str) -> Optional[int]:
+    """
+    User id from a valid, unexpired, unrevoked access token, or None.
+    Never touches the database.
+    """
+    payload = decode_token(token)
+    if payload is None or payload.get("type") == "refresh" or revocation.is_revoked(payload):
+        return None
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
 
 # ---------------------------
 # Get current user
@@ -77,22 +138,39 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
     """
     Get the current user from the JWT token.
+    Served from `principal_cache` when possible; a hit is merged into the
+    request's session without emitting SQL.
+    """
+    return await get_user_from_token(token, db)
+
+
+async def get_user_from_token(token: str, db: AsyncSession) -> User:
+    """
+    Resolve a raw access token to its user, for callers that don't get the
+    token from the Authorization header (e.g. WebSockets).
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id = int(payload.get("sub"))
-    except JWTError:
+    user_id = decode_user_id(token)
+    if user_id is None:
         raise credentials_exception
 
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        if not cached.is_active:
+            raise credentials_exception
+        return await db.merge(cached, load=False)
+
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalars().first()
     if not user:
         raise credentials_exception
+    principal_cache.set(user_id, _snapshot(user))
+    if not user.is_active:
+        raise credentials_exception
     return user
 
 # ---------------------------
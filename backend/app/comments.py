@@ -0,0 +1,92 @@
+"""
+Comment listing for a shout-out.
+
+Pages are keyset-paginated on the comment id (`after_id`), newest last,
+with the author's name joined in. The first page of each shout-out is
+kept in a small LRU cache; `invalidate` drops it when a comment is added.
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schemas
+from .cache import TTLCache
+from .config import settings
+from .models import User, ShoutOutComment
+
+COMMENTS_DEFAULT_LIMIT = 50
+COMMENTS_MAX_LIMIT = 100
+
+# shoutout_id -> first COMMENTS_MAX_LIMIT + 1 comments. Entries are dropped on
+# add_comment in this process; the TTL bounds staleness across workers and
+# replica lag.
+first_page_cache = TTLCache(
+    "comments_first_page",
+    maxsize=settings.COMMENTS_CACHE_MAX_SIZE,
+    ttl=settings.COMMENTS_CACHE_TTL_SECONDS,
+)
+
+
+def page_query(shoutout_id: int, after_id: Optional[int], limit: int):
+    """Range scan over ix_shoutout_comments_shoutout_id_id, oldest first."""
+    query = (
+        select(ShoutOutComment, User.name)
+        .join(User, User.id == ShoutOutComment.user_id)
+        .where(ShoutOutComment.shoutout_id == shoutout_id)
+    )
+    if after_id is not None:
+        query = query.where(ShoutOutComment.id > after_id)
+    return query.order_by(ShoutOutComment.id.asc()).limit(limit)
+
+
+def to_schema(comment: ShoutOutComment, user_name: Optional[str]) -> schemas.CommentOut:
+    return schemas.CommentOut(
+        id=comment.id,
+        shoutout_id=comment.shoutout_id,
+        user_id=comment.user_id,
+        user_name=user_name,
+        content=comment.content,
+        created_at=comment.created_at.isoformat() if comment.created_at else None,
+    )
+
+
+def to_row(comment: ShoutOutComment, user_name: Optional[str]) -> dict:
+    """`CommentOut` as a plain dict for `fastjson`; `created_at` stays a datetime."""
+    return {
+        "id": comment.id,
+        "content": comment.content,
+        "created_at": comment.created_at,
+        "user_id": comment.user_id,
+        "user_name": user_name,
+    }
+
+
+async def _load(db: AsyncSession, shoutout_id: int, after_id: Optional[int], limit: int) -> List[dict]:
+    res = await db.execute(page_query(shoutout_id, after_id, limit))
+    return [to_row(comment, name) for comment, name in res.all()]
+
+
+async def fetch_page(
+    db: AsyncSession, shoutout_id: int, after_id: Optional[int] = None, limit: int = COMMENTS_DEFAULT_LIMIT
+) -> Tuple[List[dict], Optional[int]]:
+    """
+    Return up to `limit` comments after `after_id` as `to_row` dicts, plus
+    the id to pass as `after_id` for the next page (None when this is the
+    last page).
+    """
+    if after_id is None:
+        rows = first_page_cache.get(shoutout_id)
+        if rows is None:
+            rows = await _load(db, shoutout_id, None, COMMENTS_MAX_LIMIT + 1)
+            first_page_cache.set(shoutout_id, rows)
+    else:
+        rows = await _load(db, shoutout_id, after_id, limit + 1)
+
+    page = rows[:limit]
+    next_after_id = page[-1]["id"] if len(rows) > limit else None
+    return page, next_after_id
+
+
+def invalidate(shoutout_id: int) -> None:
+    first_page_cache.pop(shoutout_id)
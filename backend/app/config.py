@@ -8,6 +8,92 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7  # <-- add this line
 
+    # engine / connection pool (see database.make_engine)
+    DATABASE_READ_URL: str = ""  # read replica for feed/comments/metrics; empty = primary
+    DB_ECHO: bool = False  # log every SQL statement
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; replace connections older than this
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection; 0 behind pgbouncer
+
+    # authenticated-user cache used by auth.get_current_user
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+
+    # first page of comments per shout-out (comments.first_page_cache)
+    COMMENTS_CACHE_TTL_SECONDS: int = 30
+    COMMENTS_CACHE_MAX_SIZE: int = 2048
+
+    # first page of each department feed (feed.department_cache)
+    DEPARTMENT_FEED_CACHE_TTL_SECONDS: int = 30
+    DEPARTMENT_FEED_CACHE_MAX_SIZE: int = 256
+
+    # bcrypt worker pool (0 workers = hash inline on the event loop)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_POOL: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 0  # 0 = same as workers
+
+    # shout-out image uploads
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    THUMBNAIL_MAX_PX: int = 320
+    UPLOAD_STORAGE: str = "local"  # "local" or "memory"
+    UPLOAD_DIR: str = ""  # defaults to <repo>/uploads
+
+    # live feed stream (/auth/shoutouts/stream)
+    REALTIME_BROKER: str = "local"  # "local" (single worker) or "postgres" (LISTEN/NOTIFY)
+    REALTIME_QUEUE_SIZE: int = 100  # per connection; overflow sends a resync event
+    REALTIME_KEEPALIVE_SECONDS: int = 15
+
+    # ETag / response cache for the hot GET endpoints (http_cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: str = "local"  # "local" (single worker), "redis" (shared) or "memory"
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    RESPONSE_CACHE_MAX_VERSIONS: int = 16384  # per-resource version counters kept by the local backend
+    RESPONSE_CACHE_MAX_BODY_BYTES: int = 256 * 1024
+
+    # token-bucket rate limits (ratelimit.py); "N/second|minute|hour|day"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "local"  # "local" (per worker) or "redis" (shared)
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # local backend only
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # only behind a proxy that sets X-Forwarded-For
+    RATE_LIMIT_LOGIN: str = "30/minute"  # per IP
+    RATE_LIMIT_REGISTER: str = "20/minute"  # per IP
+    RATE_LIMIT_SHOUTOUT: str = "30/minute"  # per user
+    RATE_LIMIT_REACTION: str = "120/minute"  # per user
+    RATE_LIMIT_COMMENT: str = "60/minute"  # per user
+
+    # request / DB metrics (metrics.py), served at GET /metrics
+    METRICS_TOKEN: str = ""  # when set, scrapes must send "Authorization: Bearer <token>"
+    SLOW_REQUEST_SECONDS: float = 1.0  # log requests slower than this with their SQL
+    SLOW_REQUEST_MAX_QUERIES: int = 50  # statements kept per request for the slow log
+
+    # recognition leaderboards (leaderboard.py)
+    LEADERBOARD_SIZE: int = 10  # top-K kept in memory per department and period
+    LEADERBOARD_REFRESH_SECONDS: int = 60  # reload from recognition_counts; picks up other workers' writes
+
+    # admin analytics rollups (analytics.py)
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = 300  # background rollup in each worker; 0 = only `python -m app.analytics`
+    ANALYTICS_ROLLUP_LAG_SECONDS: int = 60  # leave rows this fresh for the next run (open transactions)
+    ANALYTICS_MAX_RANGE_DAYS: int = 366  # per JSON request; the CSV export has no limit
+
+    # token revocation denylist (revocation.py)
+    TOKEN_DENYLIST_SYNC_SECONDS: int = 5  # pick up other workers' revocations this often
+    TOKEN_DENYLIST_PRUNE_SECONDS: int = 600  # drop expired entries (memory and table)
+    TOKEN_DENYLIST_BLOOM_CAPACITY: int = 100000  # grows when exceeded
+    TOKEN_DENYLIST_BLOOM_ERROR_RATE: float = 0.01
+
+    # monthly partitions and cold-month archival of shout-outs (archive.py)
+    ARCHIVE_AFTER_MONTHS: int = 12  # `python -m app.archive` moves months older than this out of the database
+    ARCHIVE_DIR: str = ""  # defaults to <repo>/archive
+    ARCHIVE_FORMAT: str = "ndjson"  # "ndjson" (gzip) or "parquet" (needs pyarrow)
+    ARCHIVE_PARTITIONS_AHEAD: int = 3  # Postgres: monthly partitions created ahead of time
+    ARCHIVE_MANIFEST_TTL_SECONDS: int = 60  # how long a worker trusts its copy of shoutout_archives
+
     class Config:
         env_file = ".env"
 
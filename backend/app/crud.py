@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from typing import List
+
+from sqlalchemy import insert, select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
@@ -43,5 +45,19 @@ async def create_user(
     return new_user
 
 
+async def create_users(db: AsyncSession, users: List[dict]) -> int:
+    """
+    Insert many users (dicts of User columns, `password` already hashed)
+    with multi-row INSERTs and commit. Returns the number inserted.
+    """
+    if not users:
+        return 0
+    # RETURNING (unordered) makes SQLAlchemy batch rows into multi-row VALUES
+    res = await db.execute(insert(User).returning(User.id), users)
+    count = len(res.all())
+    await db.commit()
+    return count
+
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -1,32 +1,101 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
 
 load_dotenv()  # must be before reading os.getenv
 
+from .config import settings  # noqa: E402
+from . import metrics  # noqa: E402
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL is not set in .env")
 
-# Create engine
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def make_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """
+    Build an instrumented engine from the DB_* settings (see metrics.py).
+    Pool sizing is skipped for in-memory SQLite (single static
+    connection); the asyncpg statement cache is only passed to asyncpg.
+    """
+    parsed = make_url(url)
+    kwargs = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if not (parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")):
+        kwargs.update(
+            poolclass=metrics.TimedAsyncAdaptedQueuePool,
+            pool_logging_name=name,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if parsed.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    engine = create_async_engine(url, **kwargs)
+    metrics.instrument_engine(engine, name)
+    metrics.register_pool(engine, name)
+    return engine
+
+
+# Primary (all writes)
+engine = make_engine(DATABASE_URL)
 
 # Create async session
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Read replica; falls back to the primary when DATABASE_READ_URL is unset
+read_engine = make_engine(settings.DATABASE_READ_URL, "replica") if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(
+    bind=read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 # ✅ Add Base for models to inherit from
 Base = declarative_base()
 
 
+def insert_for(db: AsyncSession, model):
+    """
+    Dialect-specific INSERT for `model`, so callers can use
+    `on_conflict_do_update` / `on_conflict_do_nothing` (Postgres and SQLite).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 # Dependency for FastAPI
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
 
+async def get_read_db():
+    """
+    Session on the read replica, for read-only endpoints that tolerate
+    replication lag. Never write through it.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+async def dispose_engines() -> None:
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
 # Helper functions for login
 async def get_user_by_email(session: AsyncSession, email: str, role: str = None):
     """
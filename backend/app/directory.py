@@ -0,0 +1,163 @@
+"""
+Paginated admin listings of users.
+
+Pages are keyset-paginated on (sort key, id), so page N costs the same as
+page 1. Sorting is by id or case-insensitive name; both walk an index
+(`ix_users_role_department_id`, `ix_users_name_lower_id`). Filters are
+department, role, active status and a case-insensitive name prefix.
+`fields` narrows both the SELECT and the response to the named columns.
+
+Totals are counted exactly up to COUNT_EXACT_LIMIT rows. Past that,
+Postgres reports the planner's row estimate instead of scanning
+everything; other databases report the capped count as a lower bound.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schemas
+from .models import User
+
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+COUNT_EXACT_LIMIT = 1000
+
+FIELDS = tuple(schemas.UserListItem.model_fields)
+SORT_PATTERN = "^-?(id|name)$"
+
+NAME_KEY = func.lower(func.coalesce(User.name, ""))  # matches ix_users_name_lower_id
+
+
+@dataclass
+class UserFilters:
+    department: Optional[str] = None
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+    name_prefix: Optional[str] = None
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Comma-separated column names (default: all). Raises ValueError on unknown names."""
+    if not fields:
+        return FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(FIELDS)}")
+    return names
+
+
+# ---------------------------
+# Cursors
+# ---------------------------
+def encode_cursor(sort: str, key, user_id: int) -> str:
+    raw = json.dumps([sort, key, user_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, int]:
+    """Raises ValueError on malformed input or a cursor from another sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, user_id = json.loads(base64.urlsafe_b64decode(padded))
+        key_type = str if sort.lstrip("-") == "name" else int
+        if cursor_sort != sort or not isinstance(user_id, int) or not isinstance(key, key_type):
+            raise ValueError("Invalid cursor")
+        return key, user_id
+    except (ValueError, TypeError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def _prefix_upper_bound(prefix: str) -> str:
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def apply_filters(query, filters: UserFilters):
+    if filters.department is not None:
+        query = query.where(User.department == filters.department)
+    if filters.role is not None:
+        query = query.where(User.role == filters.role)
+    if filters.is_active is not None:
+        query = query.where(User.is_active == filters.is_active)
+    if filters.name_prefix:
+        prefix = filters.name_prefix.lower()
+        # the range keeps the predicate on the index; LIKE rechecks the exact prefix
+        query = query.where(
+            NAME_KEY >= prefix,
+            NAME_KEY < _prefix_upper_bound(prefix),
+            NAME_KEY.startswith(prefix, autoescape=True),
+        )
+    return query
+
+
+def _sort_key(sort: str):
+    return NAME_KEY if sort.lstrip("-") == "name" else User.id
+
+
+def page_query(base, sort: str, fields: Sequence[str], after: Optional[Tuple[object, int]], limit: int):
+    """`base` is a filtered select over User; returns its page, sort key labelled `sort_key`."""
+    key = _sort_key(sort)
+    descending = sort.startswith("-")
+    columns = [getattr(User, name) for name in fields if name != "id"]
+    query = base.with_only_columns(User.id, key.label("sort_key"), *columns)
+    if after is not None:
+        position = tuple_(key, User.id)
+        query = query.where(position < tuple_(*after) if descending else position > tuple_(*after))
+    if descending:
+        return query.order_by(key.desc(), User.id.desc()).limit(limit)
+    return query.order_by(key.asc(), User.id.asc()).limit(limit)
+
+
+async def fetch_page(
+    db: AsyncSession,
+    base,
+    sort: str = "id",
+    fields: Sequence[str] = FIELDS,
+    cursor: Optional[str] = None,
+    limit: int = LIST_DEFAULT_LIMIT,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of `base` as dicts of the requested `fields`, plus the cursor
+    for the next page (None on the last page). Raises ValueError for a
+    malformed cursor.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+    res = await db.execute(page_query(base, sort, fields, after, limit + 1))
+    rows = res.mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1]["sort_key"], rows[-1]["id"])
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+# ---------------------------
+# Counting
+# ---------------------------
+async def _planner_estimate(db: AsyncSession, query) -> int:
+    conn = await db.connection()
+    compiled = query.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in (compiled.positiontup or []))
+    res = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+    raw = res.scalar()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_estimate(db: AsyncSession, base) -> Tuple[int, bool]:
+    """(total, exact) for the rows of `base`."""
+    capped = base.with_only_columns(User.id).limit(COUNT_EXACT_LIMIT + 1).subquery()
+    count = (await db.execute(select(func.count()).select_from(capped))).scalar_one()
+    if count <= COUNT_EXACT_LIMIT:
+        return count, True
+    if db.bind.dialect.name == "postgresql":
+        estimate = await _planner_estimate(db, base.with_only_columns(User.id))
+        return max(estimate, count), False
+    return count, False
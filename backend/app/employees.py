@@ -0,0 +1,243 @@
+"""
+Bulk employee import and CSV export for admins.
+
+Import reads a .csv or .jsonl upload row by row and works in batches of
+IMPORT_BATCH_SIZE, so memory does not grow with the file. Per batch:
+
+1. rows are validated, and duplicates within the file are rejected;
+2. one `IN` query finds emails and usernames that are already taken;
+3. the remaining passwords are hashed concurrently on the bcrypt pool;
+4. one multi-row INSERT plus a commit (`crud.create_users`).
+
+Bad rows are skipped and reported, and the rest are imported. Each batch
+commits on its own, so re-running a file only reports the rows already
+imported as taken.
+
+Export streams employees as CSV from a server-side cursor, one partition
+of EXPORT_BATCH_SIZE rows at a time.
+"""
+import asyncio
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import auth, crud, schemas
+from .database import ReadSessionLocal
+from .models import User
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ROWS = 5000
+IMPORT_MAX_ERRORS = 100
+IMPORT_REQUIRED_COLUMNS = ("username", "name", "email", "password")
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = (
+    "id", "username", "name", "email", "department",
+    "joining_date", "current_project", "skills", "experience",
+)
+
+
+def employee_query(admin: User):
+    """Employees visible to `admin`: all for a superadmin, else their department's."""
+    query = select(User).where(User.role == "employee")
+    if admin.role != "superadmin":
+        query = query.where(User.department == admin.department)
+    return query
+
+
+# ---------------------------
+# Reading uploads
+# ---------------------------
+def iter_records(fileobj, filename: str) -> Iterator[Tuple[int, object]]:
+    """
+    Lazily yield (row number, raw record) from a binary .csv (header row)
+    or .jsonl (one object per line) upload. Unparseable JSON lines yield
+    None as the record. Raises ValueError for an unsupported file or a CSV
+    header missing required columns.
+    """
+    name = (filename or "").lower()
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if name.endswith(".csv"):
+        reader = csv.DictReader(text)
+        try:
+            header = reader.fieldnames or []
+        except UnicodeDecodeError:
+            raise ValueError("File must be UTF-8 encoded")
+        missing = [col for col in IMPORT_REQUIRED_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"CSV header is missing: {', '.join(missing)}")
+        return ((row, record) for row, record in enumerate(reader, start=2))
+    if name.endswith((".jsonl", ".ndjson")):
+        return _jsonl_records(text)
+    raise ValueError("Upload a .csv or .jsonl file")
+
+
+def _jsonl_records(text) -> Iterator[Tuple[int, object]]:
+    for row, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row, json.loads(line)
+        except json.JSONDecodeError:
+            yield row, None
+
+
+def _validate(record: object, admin: User) -> schemas.EmployeeImportRow:
+    """Raises ValueError with a message for the report."""
+    if not isinstance(record, dict):
+        raise ValueError("Row must be a JSON object")
+    cleaned = {key: (value.strip() or None) if isinstance(value, str) else value for key, value in record.items() if key}
+    try:
+        item = schemas.EmployeeImportRow(**cleaned)
+    except ValidationError as exc:
+        first = exc.errors()[0]
+        raise ValueError(f"{'.'.join(map(str, first['loc'])) or 'row'}: {first['msg']}")
+
+    if admin.role != "superadmin":
+        if item.department not in (None, admin.department):
+            raise ValueError(f"department must be {admin.department}")
+        item.department = admin.department
+    elif not item.department:
+        raise ValueError("department is required")
+    return item
+
+
+# ---------------------------
+# Import
+# ---------------------------
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    errors: List[schemas.EmployeeImportError] = field(default_factory=list)
+    failed: int = 0
+
+    def fail(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(schemas.EmployeeImportError(row=row, error=error))
+
+    def to_schema(self) -> schemas.EmployeeImportResult:
+        return schemas.EmployeeImportResult(
+            rows=self.rows, created=self.created, skipped=self.failed, errors=self.errors
+        )
+
+
+async def _import_batch(db: AsyncSession, batch: List[Tuple[int, schemas.EmployeeImportRow]], report: ImportReport) -> None:
+    emails = [item.email for _, item in batch]
+    usernames = [item.username for _, item in batch]
+    res = await db.execute(
+        select(User.email, User.username).where(or_(User.email.in_(emails), User.username.in_(usernames)))
+    )
+    taken = res.all()
+    taken_emails = {email for email, _ in taken}
+    taken_usernames = {username for _, username in taken}
+
+    fresh = []
+    for row, item in batch:
+        if item.email in taken_emails:
+            report.fail(row, "Email already registered")
+        elif item.username in taken_usernames:
+            report.fail(row, "Username already taken")
+        else:
+            fresh.append((row, item))
+    if not fresh:
+        return
+
+    hashes = await asyncio.gather(*(auth.password_hasher.hash(item.password) for _, item in fresh))
+    users = [
+        {
+            "username": item.username,
+            "email": item.email,
+            "password": hashed,
+            "role": "employee",
+            "name": item.name,
+            "department": item.department,
+            "joining_date": item.joining_date,
+            "current_project": item.current_project,
+            "skills": item.skills,
+            "experience": item.experience,
+        }
+        for (_, item), hashed in zip(fresh, hashes)
+    ]
+    try:
+        await crud.create_users(db, users)
+    except IntegrityError:
+        # someone registered one of these between the check and the insert
+        await db.rollback()
+        for row, _ in fresh:
+            report.fail(row, "Conflicts with a user created during the import; re-run to import this row")
+        return
+    report.created += len(fresh)
+
+
+async def import_employees(db: AsyncSession, records: Iterator[Tuple[int, object]], admin: User) -> ImportReport:
+    """
+    Validate and insert employees batch by batch. Regular admins can only
+    import into their own department (the default for blank rows).
+    """
+    report = ImportReport()
+    seen_emails, seen_usernames = set(), set()
+    batch: List[Tuple[int, schemas.EmployeeImportRow]] = []
+    row = 0
+    try:
+        for row, record in records:
+            if report.rows >= IMPORT_MAX_ROWS:
+                report.fail(row, f"Stopped: at most {IMPORT_MAX_ROWS} rows per upload")
+                break
+            report.rows += 1
+            try:
+                item = _validate(record, admin)
+            except ValueError as exc:
+                report.fail(row, str(exc))
+                continue
+            if item.email in seen_emails:
+                report.fail(row, "Duplicate email in file")
+                continue
+            if item.username in seen_usernames:
+                report.fail(row, "Duplicate username in file")
+                continue
+            seen_emails.add(item.email)
+            seen_usernames.add(item.username)
+
+            batch.append((row, item))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await _import_batch(db, batch, report)
+                batch = []
+    except UnicodeDecodeError:
+        report.fail(row + 1, "Stopped: file must be UTF-8 encoded")
+    except csv.Error as exc:
+        report.fail(row + 1, f"Stopped: {exc}")
+    if batch:
+        await _import_batch(db, batch, report)
+    return report
+
+
+# ---------------------------
+# Export
+# ---------------------------
+def _csv_chunk(rows) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+async def export_csv(admin: User) -> AsyncIterator[str]:
+    """
+    CSV of the employees `admin` can see, ordered by id. Runs in its own
+    read session because it outlives the request handler.
+    """
+    yield _csv_chunk([EXPORT_COLUMNS])
+    columns = [getattr(User, name) for name in EXPORT_COLUMNS]
+    query = employee_query(admin).with_only_columns(*columns).order_by(User.id)
+    async with ReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield _csv_chunk(partition)
@@ -0,0 +1,60 @@
+"""
+Fast JSON responses for the large list endpoints.
+
+With a `response_model`, FastAPI validates whatever the endpoint returns
+against it and then serializes the result. For a list endpoint that has
+already built one pydantic model per row (and an `.isoformat()` string per
+timestamp), every row goes through pydantic twice before it is sent.
+
+Endpoints that opt in build plain dicts with exactly the fields of their
+`response_model` and return `respond(rows, response)`. The rows are
+encoded to bytes in one pass, by orjson when it is installed (datetimes
+natively, in the same format as `.isoformat()`), else by the stdlib
+encoder. The response is returned as is, so FastAPI skips validation. The
+`response_model` is kept on the route for the OpenAPI schema, which makes
+it the endpoint's job to return matching dicts.
+
+`benchmarks/serialization.py` compares the two paths.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives identical output, slower
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode dicts, lists, scalars and naive datetimes to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def respond(content: Any, response: Response) -> FastJSONResponse:
+    """
+    Encode `content` and return it with the headers the endpoint set on its
+    injected `response` (FastAPI drops them when a Response is returned).
+    """
+    fast = FastJSONResponse(content, status_code=response.status_code or 200)
+    for name, value in response.raw_headers:
+        if name != b"content-length":
+            fast.raw_headers.append((name, value))
+    return fast
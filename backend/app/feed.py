@@ -0,0 +1,305 @@
+"""
+Shout-out feed read model.
+
+Every shout-out has one `ShoutOutFeedItem` row holding its tags, reaction
+counts (copied from `shoutout_reaction_counts`) and comment count. The
+write endpoints keep that row current, so a feed page is one range scan
+over (created_at, shoutout_id).
+
+Department feeds walk `shoutout_departments` instead (author or tagged user
+in the department). Their first pages are cached per department and
+dropped by `invalidate_departments` after any write touching them.
+"""
+import asyncio
+import base64
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, update, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schemas
+from .cache import TTLCache
+from .config import settings
+from .models import (
+    User, ShoutOut, ShoutOutTag, ShoutOutReactionCount, ShoutOutComment, ShoutOutFeedItem, ShoutOutDepartment,
+)
+
+FEED_DEFAULT_LIMIT = 100
+FEED_MAX_LIMIT = 100
+REBUILD_BATCH_SIZE = 500
+
+# department -> first FEED_MAX_LIMIT + 1 items of that department's feed
+department_cache = TTLCache(
+    "department_feed_first_page",
+    maxsize=settings.DEPARTMENT_FEED_CACHE_MAX_SIZE,
+    ttl=settings.DEPARTMENT_FEED_CACHE_TTL_SECONDS,
+)
+
+
+# ---------------------------
+# Cursors
+# ---------------------------
+def encode_cursor(created_at: datetime, shoutout_id: int) -> str:
+    """Opaque cursor pointing at the last item of a page."""
+    raw = f"{created_at.isoformat()}|{shoutout_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, shoutout_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(shoutout_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+def page_query(after: Optional[Tuple[datetime, int]], limit: int):
+    """Range scan over ix_shoutout_feed_created_at_id, newest first."""
+    query = select(ShoutOutFeedItem)
+    if after:
+        query = query.where(
+            tuple_(ShoutOutFeedItem.created_at, ShoutOutFeedItem.shoutout_id) < tuple_(*after)
+        )
+    return query.order_by(ShoutOutFeedItem.created_at.desc(), ShoutOutFeedItem.shoutout_id.desc()).limit(limit)
+
+
+async def fetch_page(
+    db: AsyncSession, cursor: Optional[str] = None, limit: int = FEED_DEFAULT_LIMIT
+) -> Tuple[List[ShoutOutFeedItem], Optional[str]]:
+    """
+    Return one page of the feed, newest first, plus the cursor for the next
+    page (None when this is the last page).
+    """
+    res = await db.execute(page_query(decode_cursor(cursor) if cursor else None, limit + 1))
+    items = list(res.scalars().all())
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].shoutout_id)
+    return items, next_cursor
+
+
+def department_page_query(department: str, after: Optional[Tuple[datetime, int]], limit: int):
+    """Range scan over ix_shoutout_departments_department_created_at_id, newest first."""
+    query = (
+        select(ShoutOutFeedItem)
+        .join(ShoutOutDepartment, ShoutOutDepartment.shoutout_id == ShoutOutFeedItem.shoutout_id)
+        .where(ShoutOutDepartment.department == department)
+    )
+    if after:
+        query = query.where(
+            tuple_(ShoutOutDepartment.created_at, ShoutOutDepartment.shoutout_id) < tuple_(*after)
+        )
+    return query.order_by(ShoutOutDepartment.created_at.desc(), ShoutOutDepartment.shoutout_id.desc()).limit(limit)
+
+
+async def fetch_department_page(
+    db: AsyncSession, department: str, cursor: Optional[str] = None, limit: int = FEED_DEFAULT_LIMIT
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Like `fetch_page` for one department, as `to_row` dicts; the first page
+    comes from `department_cache`.
+    """
+    if cursor:
+        res = await db.execute(department_page_query(department, decode_cursor(cursor), limit + 1))
+        rows = [to_row(item) for item in res.scalars().all()]
+    else:
+        rows = department_cache.get(department)
+        if rows is None:
+            res = await db.execute(department_page_query(department, None, FEED_MAX_LIMIT + 1))
+            rows = [to_row(item) for item in res.scalars().all()]
+            department_cache.set(department, rows)
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1]["created_at"], page[-1]["id"])
+    return page, next_cursor
+
+
+def to_schema(item: ShoutOutFeedItem) -> schemas.ShoutOutOut:
+    return schemas.ShoutOutOut(
+        id=item.shoutout_id,
+        author_id=item.author_id,
+        message=item.message,
+        image_url=item.image_url,
+        thumbnail_url=item.thumbnail_url,
+        created_at=item.created_at.isoformat() if item.created_at else None,
+        tagged_users=item.tagged_user_ids or [],
+        tagged_user_names=item.tagged_user_names or [],
+        reactions=item.reactions or {},
+        comments_count=item.comments_count or 0,
+    )
+
+
+def to_row(item: ShoutOutFeedItem) -> dict:
+    """`to_schema` as a plain dict for `fastjson`; `created_at` stays a datetime."""
+    return {
+        "id": item.shoutout_id,
+        "author_id": item.author_id,
+        "message": item.message,
+        "image_url": item.image_url,
+        "thumbnail_url": item.thumbnail_url,
+        "created_at": item.created_at,
+        "tagged_users": item.tagged_user_ids or [],
+        "tagged_user_names": item.tagged_user_names or [],
+        "reactions": item.reactions or {},
+        "comments_count": item.comments_count or 0,
+    }
+
+
+# ---------------------------
+# Writes (called inside the endpoint's transaction)
+# ---------------------------
+def add_item(db: AsyncSession, shoutout_id: int, created_at: datetime, post, names: Dict[int, str]) -> ShoutOutFeedItem:
+    """Stage the feed row for a just-inserted shout-out (`post` is a `shoutouts.NewShoutOut`)."""
+    item = ShoutOutFeedItem(
+        shoutout_id=shoutout_id,
+        author_id=post.author_id,
+        message=post.message,
+        image_url=post.image_url,
+        thumbnail_url=post.thumbnail_url,
+        created_at=created_at,
+        tagged_user_ids=list(post.tagged_user_ids),
+        tagged_user_names=[names.get(uid, str(uid)) for uid in post.tagged_user_ids],
+        reactions={},
+        comments_count=0,
+    )
+    db.add(item)
+    return item
+
+
+async def departments_of(db: AsyncSession, shoutout_id: int) -> List[str]:
+    """Departments whose feed shows the shout-out (cache invalidation, real-time channels)."""
+    res = await db.execute(
+        select(ShoutOutDepartment.department).where(ShoutOutDepartment.shoutout_id == shoutout_id)
+    )
+    return list(res.scalars().all())
+
+
+def invalidate_departments(departments: Iterable[str]) -> None:
+    """Drop cached first pages; call after the write has committed."""
+    for department in set(departments):
+        department_cache.pop(department)
+
+
+async def get_for_update(db: AsyncSession, shoutout_id: int) -> Optional[ShoutOutFeedItem]:
+    """Load the feed row, locked until commit on Postgres. None if the shout-out does not exist."""
+    return await db.get(ShoutOutFeedItem, shoutout_id, with_for_update=True)
+
+
+def set_reaction_count(item: ShoutOutFeedItem, emoji: str, count: int) -> None:
+    """Copy an emoji total from `shoutout_reaction_counts` onto the feed row."""
+    reactions = dict(item.reactions or {})
+    if count > 0:
+        reactions[emoji] = count
+    else:
+        reactions.pop(emoji, None)
+    item.reactions = reactions  # reassign so the JSON change is tracked
+
+
+async def add_comment(db: AsyncSession, shoutout_id: int) -> Optional[Tuple[int, int]]:
+    """
+    Increment the comment counter. Returns (author_id, new comments_count),
+    or None if the shout-out does not exist.
+    """
+    res = await db.execute(
+        update(ShoutOutFeedItem)
+        .where(ShoutOutFeedItem.shoutout_id == shoutout_id)
+        .values(comments_count=ShoutOutFeedItem.comments_count + 1)
+        .returning(ShoutOutFeedItem.author_id, ShoutOutFeedItem.comments_count)
+    )
+    row = res.first()
+    return tuple(row) if row else None
+
+
+# ---------------------------
+# Backfill / reconcile
+# ---------------------------
+async def rebuild(db: AsyncSession, missing_only: bool = True) -> int:
+    """
+    Recompute feed rows from the raw shout-out tables.
+    With `missing_only` only shout-outs that have no feed row yet are built
+    (cheap, run on startup); otherwise every row is recomputed.
+    Returns the number of rows written.
+    """
+    query = select(ShoutOut).order_by(ShoutOut.id)
+    if missing_only:
+        query = query.outerjoin(ShoutOutFeedItem, ShoutOutFeedItem.shoutout_id == ShoutOut.id).where(
+            ShoutOutFeedItem.shoutout_id.is_(None)
+        )
+
+    written = 0
+    last_id = 0
+    while True:
+        res = await db.execute(query.where(ShoutOut.id > last_id).limit(REBUILD_BATCH_SIZE))
+        shoutouts = res.scalars().all()
+        if not shoutouts:
+            break
+        ids = [s.id for s in shoutouts]
+        last_id = ids[-1]
+
+        tags = {sid: [] for sid in ids}
+        names = {sid: [] for sid in ids}
+        res_tags = await db.execute(
+            select(ShoutOutTag.shoutout_id, ShoutOutTag.user_id, User.name)
+            .join(User, User.id == ShoutOutTag.user_id)
+            .where(ShoutOutTag.shoutout_id.in_(ids))
+            .order_by(ShoutOutTag.id)
+        )
+        for sid, uid, name in res_tags.all():
+            tags[sid].append(uid)
+            names[sid].append(name or str(uid))
+
+        reactions = {sid: {} for sid in ids}
+        res_rx = await db.execute(
+            select(ShoutOutReactionCount.shoutout_id, ShoutOutReactionCount.emoji, ShoutOutReactionCount.count)
+            .where(ShoutOutReactionCount.shoutout_id.in_(ids))
+        )
+        for sid, emoji, cnt in res_rx.all():
+            reactions[sid][emoji] = cnt
+
+        comments = {sid: 0 for sid in ids}
+        res_cc = await db.execute(
+            select(ShoutOutComment.shoutout_id, func.count(ShoutOutComment.id))
+            .where(ShoutOutComment.shoutout_id.in_(ids))
+            .group_by(ShoutOutComment.shoutout_id)
+        )
+        for sid, cnt in res_cc.all():
+            comments[sid] = int(cnt)
+
+        for s in shoutouts:
+            await db.merge(
+                ShoutOutFeedItem(
+                    shoutout_id=s.id,
+                    author_id=s.author_id,
+                    message=s.message,
+                    image_url=s.image_url,
+                    thumbnail_url=s.thumbnail_url,
+                    created_at=s.created_at or datetime.utcnow(),
+                    tagged_user_ids=tags[s.id],
+                    tagged_user_names=names[s.id],
+                    reactions=reactions[s.id],
+                    comments_count=comments[s.id],
+                )
+            )
+        await db.commit()
+        written += len(shoutouts)
+    return written
+
+
+if __name__ == "__main__":
+    from .database import AsyncSessionLocal
+
+    async def _main():
+        async with AsyncSessionLocal() as db:
+            count = await rebuild(db, missing_only=False)
+        print(f"Rebuilt {count} feed rows")
+
+    asyncio.run(_main())
@@ -0,0 +1,116 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is deliberately slow (~250 ms per call). `PasswordHasher` runs it in
+a bounded thread or process pool so a burst of logins cannot stall every
+other request handled by the same worker.
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from . import metrics
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a plain password against the hashed password.
+    Truncate to 72 characters due to bcrypt limit.
+    """
+    return pwd_context.verify(plain_password[:72], hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    """
+    Hash a password with bcrypt.
+    Truncate to 72 characters due to bcrypt limit.
+    """
+    return pwd_context.hash(password[:72])
+
+
+class PasswordHasher:
+    """
+    Async front for `get_password_hash` / `verify_password`.
+
+    `workers=0` runs bcrypt inline on the event loop (the old behaviour,
+    kept for benchmarking). `pool` is "thread" or "process"; bcrypt releases
+    the GIL, so threads are usually enough. At most `max_concurrency` calls
+    run at once; the rest wait and are counted as queued.
+    """
+
+    def __init__(self, workers: int = 4, pool: str = "thread", max_concurrency: Optional[int] = None):
+        if pool not in ("thread", "process"):
+            raise ValueError("pool must be 'thread' or 'process'")
+        self.workers = workers
+        self.pool = pool
+        self.max_concurrency = max_concurrency or max(workers, 1)
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, op: str, fn, *args):
+        if self.workers <= 0:
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(op, time.perf_counter() - start)
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        async with self._semaphore:
+            self.queued -= 1
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            finally:
+                self.in_flight -= 1
+                self._record(op, time.perf_counter() - start)
+
+    def _record(self, op: str, seconds: float) -> None:
+        self.completed += 1
+        self.total_seconds += seconds
+        metrics.PASSWORD_HASH_SECONDS.observe(seconds, op=op)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "pool": self.pool if self.workers > 0 else "inline",
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "avg_ms": round(1000 * self.total_seconds / self.completed, 2) if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,373 @@
+"""
+Conditional GET and response caching for the hot read endpoints.
+
+Every cached endpoint declares the resources its response depends on
+(`@cached("comments:{shoutout_id}")`). Each resource has a version counter
+that write endpoints `bump` after they commit. The ETag is a hash of the
+route, the query string, the caller (for per-user responses) and those
+versions, so it changes exactly when the underlying data may have.
+
+`ResponseCacheMiddleware` runs before the endpoint and only decodes the
+JWT, so for a cached route it never opens a database session when:
+
+- `If-None-Match` still matches: the client gets a bodyless 304;
+- a response for the current ETag is stored: it is replayed as is.
+
+Otherwise the endpoint runs and a 200 is stored under its ETag. Versions
+are read before the endpoint runs, so a write racing with the request can
+only make a stored body newer than its ETag, never older.
+
+Backends: `LocalBackend` keeps versions and bodies in this process (one
+worker). With several workers use the shared backend (`redis`) so a bump
+in one worker reaches all of them. Caching fails open: a backend error
+skips the cache and never fails a request or a write.
+
+The token is verified and checked against the in-memory revocation
+denylist (`revocation.py`), not looked up. A revoked token (logout, or a
+user who was deleted or suspended) skips the cache and is rejected by the
+endpoint; a revocation made in another worker takes effect here within
+TOKEN_DENYLIST_SYNC_SECONDS.
+"""
+import hashlib
+import json
+import logging
+import random
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.routing import compile_path
+
+from . import auth
+from .cache import TTLCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = b"private, no-cache"
+VARY = b"Authorization"
+VERSION_TTL_SECONDS = 24 * 3600  # LocalBackend; reads don't extend it
+
+_counters = {"not_modified": 0, "hits": 0, "misses": 0, "stored": 0, "errors": 0}
+
+
+# ---------------------------
+# Endpoint policy
+# ---------------------------
+class CachePolicy:
+    def __init__(self, resources: Tuple[str, ...], vary_user: bool):
+        self.resources = resources
+        self.vary_user = vary_user
+
+    def resource_keys(self, path_params: Dict[str, Any], user_id: int) -> List[str]:
+        return [template.format(**path_params, user_id=user_id) for template in self.resources]
+
+
+def cached(*resources: str, vary_user: bool = False) -> Callable:
+    """
+    Mark an endpoint as cacheable; place it below the route decorator.
+    `resources` are version keys, formatted with the path parameters and
+    `user_id`. With `vary_user` every caller gets a separate cache entry.
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.__cache_policy__ = CachePolicy(resources, vary_user)
+        return endpoint
+    return decorate
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+def _initial_version() -> int:
+    # random start so a restarted process never re-issues an ETag for older data
+    return random.getrandbits(48)
+
+
+class CacheBackend:
+    async def versions(self, keys: List[str]) -> List[int]:
+        raise NotImplementedError
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+
+class LocalBackend(CacheBackend):
+    """
+    Versions and bodies in two LRUs, both private to this process. Version
+    keys come from request paths, so they are bounded too; an evicted key
+    restarts at a new random version, which only costs a cache miss.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, max_versions: int):
+        self._versions = TTLCache("response_versions", maxsize=max_versions, ttl=VERSION_TTL_SECONDS)
+        self._bodies = TTLCache("responses", maxsize=max_entries, ttl=ttl)
+
+    def _version(self, key: str) -> int:
+        version = self._versions.get(key)
+        if version is None:
+            version = _initial_version()
+            self._versions.set(key, version)
+        return version
+
+    async def versions(self, keys: List[str]) -> List[int]:
+        return [self._version(key) for key in keys]
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._versions.set(key, self._version(key) + 1)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._bodies.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._bodies.set(key, value, ttl)
+
+
+class SharedBackend(CacheBackend):
+    """
+    Versions and bodies in a key-value store shared by every worker. The
+    client needs the redis-py asyncio subset: `get`, `mget`, `set` (with
+    `ex` / `nx`) and `incr`.
+    """
+
+    def __init__(self, client, prefix: str = "httpcache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _version_key(self, key: str) -> str:
+        return f"{self.prefix}v:{key}"
+
+    async def versions(self, keys: List[str]) -> List[int]:
+        names = [self._version_key(key) for key in keys]
+        values = await self.client.mget(names)
+        for i, value in enumerate(values):
+            if value is None:
+                # first writer wins; everyone then reads the same start value
+                await self.client.set(names[i], _initial_version(), nx=True)
+                values[i] = await self.client.get(names[i])
+        return [int(value) for value in values]
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            name = self._version_key(key)
+            await self.client.set(name, _initial_version(), nx=True)
+            await self.client.incr(name)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(f"{self.prefix}r:{key}")
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(f"{self.prefix}r:{key}", value, ex=ttl)
+
+
+class InMemoryKeyValueClient:
+    """Stand-in for a redis client (tests, local runs of the shared backend). Ignores `ex`."""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+
+    async def get(self, name: str):
+        return self.data.get(name)
+
+    async def mget(self, names: List[str]) -> list:
+        return [self.data.get(name) for name in names]
+
+    async def set(self, name: str, value, ex: Optional[int] = None, nx: bool = False) -> bool:
+        if nx and name in self.data:
+            return False
+        self.data[name] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def incr(self, name: str) -> int:
+        value = int(self.data.get(name, 0)) + 1
+        self.data[name] = str(value).encode()
+        return value
+
+
+def build_backend(kind: str) -> CacheBackend:
+    if kind == "local":
+        return LocalBackend(
+            settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS, settings.RESPONSE_CACHE_MAX_VERSIONS
+        )
+    if kind == "memory":
+        return SharedBackend(InMemoryKeyValueClient())
+    if kind == "redis":
+        import redis.asyncio as redis
+
+        return SharedBackend(redis.from_url(settings.RESPONSE_CACHE_REDIS_URL))
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND backend: {kind}")
+
+
+backend: CacheBackend = build_backend(settings.RESPONSE_CACHE_BACKEND)
+
+
+async def bump(*keys: str) -> None:
+    """
+    Invalidate every cached response that depends on `keys`. Call after
+    commit; a backend failure is logged and never fails the write.
+    """
+    try:
+        await backend.bump(keys)
+    except Exception:
+        _counters["errors"] += 1
+        logger.exception("Failed to bump response cache versions %s", keys)
+
+
+def stats() -> dict:
+    return {**_counters, "backend": type(backend).__name__}
+
+
+# ---------------------------
+# Middleware
+# ---------------------------
+def _encode_entry(status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> bytes:
+    head = json.dumps({"status": status, "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers]})
+    return head.encode() + b"\n" + body
+
+
+def _decode_entry(raw: bytes) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    head, body = raw.split(b"\n", 1)
+    meta = json.loads(head)
+    return meta["status"], [(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]], body
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _get_routes(router) -> list:
+    """
+    (path regex, convertors, route, policy) for every GET route, in the
+    router's order; `policy` is None for routes that are not `@cached`.
+    """
+    try:
+        from fastapi.routing import iter_route_contexts  # included routers are nested
+        routes = iter_route_contexts(router.routes)
+    except ImportError:
+        routes = router.routes
+    table = {}
+    for route in routes:
+        policy = getattr(getattr(route, "endpoint", None), "__cache_policy__", None)
+        if "GET" in (getattr(route, "methods", None) or ()) and route.path not in table:
+            regex, _, convertors = compile_path(route.path)
+            table[route.path] = (regex, convertors, route, policy)
+    return list(table.values())
+
+
+class ResponseCacheMiddleware:
+    """
+    Serve 304s and stored responses for `@cached` GET routes; see the
+    module docstring. A path is matched against every GET route in the
+    router's order, so one that resolves to an uncached endpoint
+    (`/shoutouts/search` before `/shoutouts/{shoutout_id}`) is not cached.
+    """
+
+    def __init__(self, app, router, max_body_bytes: int = 256 * 1024, ttl: int = 300):
+        self.app = app
+        self.router = router
+        self.max_body_bytes = max_body_bytes
+        self.ttl = ttl
+        self._routes: Optional[list] = None  # built on first use, after routers are included
+
+    def _match(self, scope) -> Tuple[Optional[CachePolicy], Dict[str, Any], str]:
+        if self._routes is None:
+            self._routes = _get_routes(self.router)
+        for regex, convertors, route, policy in self._routes:
+            match = regex.match(scope["path"])
+            if match:
+                if policy is None:  # the router sends this path to an uncached endpoint
+                    break
+                params = {key: convertors[key].convert(value) for key, value in match.groupdict().items()}
+                scope["route"] = route  # so metrics label replayed responses by route too
+                return policy, params, route.path
+        return None, {}, ""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.RESPONSE_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        policy, path_params, route_path = self._match(scope)
+        headers = Headers(scope=scope)
+        token = auth.bearer_token(headers.get("authorization")) if policy is not None else None
+        user_id = auth.decode_user_id(token) if token else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            versions = await backend.versions(policy.resource_keys(path_params, user_id))
+        except Exception:
+            _counters["errors"] += 1
+            logger.exception("Response cache unavailable; serving %s uncached", scope["path"])
+            await self.app(scope, receive, send)
+            return
+
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        fingerprint = "|".join([
+            route_path, query, str(user_id) if policy.vary_user else "", *map(str, versions),
+        ])
+        etag = '"' + hashlib.sha1(fingerprint.encode()).hexdigest()[:32] + '"'
+        cache_headers = [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL), (b"vary", VARY)]
+
+        if _etag_matches(headers.get("if-none-match", ""), etag):
+            _counters["not_modified"] += 1
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        stored = await self._load(etag)
+        if stored is not None:
+            _counters["hits"] += 1
+            status, stored_headers, body = stored
+            await send({"type": "http.response.start", "status": status, "headers": stored_headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        _counters["misses"] += 1
+        await self._call_and_store(scope, receive, send, etag, cache_headers)
+
+    async def _load(self, etag: str):
+        try:
+            raw = await backend.get(etag)
+            return _decode_entry(raw) if raw is not None else None
+        except Exception:
+            _counters["errors"] += 1
+            logger.exception("Failed to read cached response")
+            return None
+
+    async def _call_and_store(self, scope, receive, send, etag: str, cache_headers) -> None:
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        size = 0
+
+        async def capture(message) -> None:
+            nonlocal size
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    message["headers"] = [
+                        (k, v) for k, v in message.get("headers", []) if k.lower() not in (b"etag", b"cache-control", b"vary")
+                    ] + cache_headers
+                start.update(message)
+            elif message["type"] == "http.response.body" and start.get("status") == 200:
+                size += len(message.get("body", b""))
+                if size <= self.max_body_bytes:
+                    chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and size <= self.max_body_bytes:
+                    await self._store(etag, start["headers"], b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    async def _store(self, etag: str, headers, body: bytes) -> None:
+        try:
+            await backend.set(etag, _encode_entry(200, list(headers), body), self.ttl)
+            _counters["stored"] += 1
+        except Exception:
+            _counters["errors"] += 1
+            logger.exception("Failed to store cached response")
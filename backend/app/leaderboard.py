@@ -0,0 +1,297 @@
+"""
+"Most recognized" leaderboards per department and company-wide.
+
+A recognition is being tagged in a shout-out. `create_many` adds them to
+`recognition_counts` (one row per period, bucket, department and user) in
+its own transaction, so no request ever groups `shoutout_tags`.
+
+Reads never touch the database. Every worker keeps a `Board` per
+(period, department) for the current week, month and quarter: the counts
+of that bucket plus its top LEADERBOARD_SIZE users, updated incrementally
+when a transaction that recorded recognitions commits. The boards are
+loaded from the counters on startup and reloaded every
+LEADERBOARD_REFRESH_SECONDS, which picks up other workers' writes and
+rolls the buckets over.
+
+Run `python -m app.leaderboard` to rebuild the counters from the raw tables.
+"""
+import asyncio
+import bisect
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .config import settings
+from .database import AsyncSessionLocal, insert_for
+from .models import User, ShoutOut, ShoutOutTag, RecognitionCount
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("week", "month", "quarter")
+ALL_DEPARTMENTS = "*"
+PENDING_KEY = "leaderboard_pending"  # Session.info key for recognitions awaiting commit
+REBUILD_BATCH_SIZE = 1000
+
+
+# ---------------------------
+# Buckets
+# ---------------------------
+def bucket_start(period: str, day: date) -> date:
+    """First day of the week (Monday), month or quarter containing `day`."""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    if period == "quarter":
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def bucket_end(period: str, start: date) -> date:
+    """First day after the bucket starting at `start`."""
+    if period == "week":
+        return start + timedelta(days=7)
+    months = 1 if period == "month" else 3
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+# ---------------------------
+# In-memory top-K
+# ---------------------------
+class Board:
+    """
+    Counts of one bucket for one department (or ALL_DEPARTMENTS) and its
+    top `size` users, kept sorted by (-count, user_id). Counts only grow,
+    so a user outside the top can only enter by passing the last entry.
+    """
+
+    def __init__(self, start: date, size: int):
+        self.start = start
+        self.size = size
+        self.counts: Dict[int, int] = {}
+        self._top: List[Tuple[int, int]] = []
+        self._in_top: Set[int] = set()
+
+    def add(self, user_id: int, by: int = 1) -> None:
+        old = self.counts.get(user_id, 0)
+        new = self.counts[user_id] = old + by
+        entry = (-new, user_id)
+        if user_id in self._in_top:
+            del self._top[bisect.bisect_left(self._top, (-old, user_id))]
+        elif len(self._top) >= self.size:
+            if entry >= self._top[-1]:
+                return
+            self._in_top.discard(self._top.pop()[1])
+        bisect.insort(self._top, entry)
+        self._in_top.add(user_id)
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """[(user_id, count)] best first."""
+        return [(user_id, -negative) for negative, user_id in self._top[:limit]]
+
+
+@dataclass
+class Boards:
+    """Everything the endpoints read, swapped in whole on each reload."""
+    size: int
+    boards: Dict[Tuple[str, str], Board] = field(default_factory=dict)
+    users: Dict[int, Tuple[Optional[str], Optional[str]]] = field(default_factory=dict)  # id -> (name, department)
+
+    def add(self, day: date, user_id: int, name: Optional[str], department: str, by: int = 1) -> None:
+        self.users[user_id] = (name, department)
+        for period in PERIODS:
+            start = bucket_start(period, day)
+            for key in ((period, department), (period, ALL_DEPARTMENTS)):
+                board = self.boards.get(key)
+                if board is None or board.start < start:  # first recognition of a new bucket
+                    board = self.boards[key] = Board(start, self.size)
+                elif board.start > start:
+                    continue
+                board.add(user_id, by)
+
+    def get(self, period: str, department: str, today: date) -> Optional[Board]:
+        board = self.boards.get((period, department))
+        if board is None or board.start != bucket_start(period, today):
+            return None
+        return board
+
+
+state = Boards(size=settings.LEADERBOARD_SIZE)
+
+
+def top(period: str, department: Optional[str], limit: int, today: Optional[date] = None) -> schemas.LeaderboardOut:
+    """Current leaderboard for `department` (None: whole company), ranked 1, 2, 2, 4..."""
+    today = today or datetime.utcnow().date()
+    start = bucket_start(period, today)
+    board = state.get(period, department or ALL_DEPARTMENTS, today)
+    entries: List[schemas.LeaderboardEntry] = []
+    for position, (user_id, count) in enumerate(board.top(limit) if board else [], start=1):
+        rank = entries[-1].rank if entries and entries[-1].count == count else position
+        name, user_department = state.users.get(user_id, (None, None))
+        entries.append(schemas.LeaderboardEntry(
+            rank=rank, user_id=user_id, name=name, department=user_department, count=count,
+        ))
+    return schemas.LeaderboardOut(
+        period=period,
+        start=start.isoformat(),
+        end=bucket_end(period, start).isoformat(),
+        department=department,
+        entries=entries,
+    )
+
+
+# ---------------------------
+# Writes
+# ---------------------------
+Recognition = Tuple[int, Optional[str], Optional[str]]  # user id, name, department
+
+
+async def record(db: AsyncSession, recognitions: Iterable[Recognition], when: datetime) -> None:
+    """
+    Add one recognition per entry to this bucket's counters, in one upsert
+    per period; the caller commits. The in-memory boards are updated when
+    that commit succeeds. Users without a department are not ranked.
+    """
+    recognitions = [(uid, name, dept) for uid, name, dept in recognitions if dept is not None]
+    if not recognitions:
+        return
+    day = when.date()
+    counts = Counter((dept, uid) for uid, _, dept in recognitions)
+    # stable order keeps concurrent upserts from deadlocking on Postgres
+    rows = [
+        {"period": period, "bucket_start": bucket_start(period, day), "department": dept, "user_id": uid, "count": n}
+        for period in PERIODS
+        for (dept, uid), n in sorted(counts.items())
+    ]
+    stmt = insert_for(db, RecognitionCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RecognitionCount.period, RecognitionCount.bucket_start, RecognitionCount.department, RecognitionCount.user_id],
+        set_={"count": RecognitionCount.count + stmt.excluded.count},
+    )
+    await db.execute(stmt)
+    db.info.setdefault(PENDING_KEY, []).append((day, recognitions))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session) -> None:
+    for day, recognitions in session.info.pop(PENDING_KEY, ()):
+        for user_id, name, department in recognitions:
+            state.add(day, user_id, name, department)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+# ---------------------------
+# Loading / refresh
+# ---------------------------
+async def load(db: AsyncSession, today: Optional[date] = None) -> Boards:
+    """Build boards for the current buckets from `recognition_counts`, one range scan per period."""
+    today = today or datetime.utcnow().date()
+    fresh = Boards(size=settings.LEADERBOARD_SIZE)
+    for period in PERIODS:
+        res = await db.execute(
+            select(RecognitionCount.department, RecognitionCount.user_id, RecognitionCount.count, User.name)
+            .join(User, User.id == RecognitionCount.user_id)
+            .where(RecognitionCount.period == period, RecognitionCount.bucket_start == bucket_start(period, today))
+        )
+        for department, user_id, count, name in res.all():
+            for key in ((period, department), (period, ALL_DEPARTMENTS)):
+                board = fresh.boards.get(key)
+                if board is None:
+                    board = fresh.boards[key] = Board(bucket_start(period, today), fresh.size)
+                board.add(user_id, count)
+            fresh.users[user_id] = (name, department)
+    return fresh
+
+
+async def refresh() -> None:
+    global state
+    async with AsyncSessionLocal() as db:
+        state = await load(db)
+
+
+_refresher: Optional[asyncio.Task] = None
+
+
+async def _refresh_forever() -> None:
+    while True:
+        await asyncio.sleep(settings.LEADERBOARD_REFRESH_SECONDS)
+        try:
+            await refresh()
+        except Exception:
+            logger.exception("Leaderboard refresh failed; serving the previous boards")
+
+
+async def start() -> None:
+    """Load the boards, then keep reloading them in the background."""
+    global _refresher
+    await refresh()
+    _refresher = asyncio.create_task(_refresh_forever())
+
+
+async def stop() -> None:
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        _refresher = None
+
+
+# ---------------------------
+# Backfill / rebuild
+# ---------------------------
+async def rebuild(db: AsyncSession) -> int:
+    """
+    Recompute every counter from the shout-out tags (under each user's
+    current department) and overwrite `recognition_counts`. Returns the
+    number of rows written.
+    """
+    counts: Counter = Counter()
+    query = (
+        select(ShoutOut.created_at, ShoutOutTag.user_id, User.department)
+        .join(ShoutOutTag, ShoutOutTag.shoutout_id == ShoutOut.id)
+        .join(User, User.id == ShoutOutTag.user_id)
+        .where(ShoutOut.created_at.is_not(None), User.department.is_not(None))
+    )
+    result = await db.stream(query.execution_options(yield_per=REBUILD_BATCH_SIZE))
+    async for created_at, user_id, department in result:
+        day = created_at.date()
+        for period in PERIODS:
+            counts[(period, bucket_start(period, day), department, user_id)] += 1
+
+    await db.execute(delete(RecognitionCount))
+    rows = [
+        {"period": period, "bucket_start": start, "department": department, "user_id": user_id, "count": n}
+        for (period, start, department, user_id), n in sorted(counts.items())
+    ]
+    for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+        await db.execute(RecognitionCount.__table__.insert(), rows[start:start + REBUILD_BATCH_SIZE])
+    await db.commit()
+    return len(rows)
+
+
+async def backfill_if_empty(db: AsyncSession) -> None:
+    """Build counters on first start after upgrading; no-op afterwards."""
+    has_counts = (await db.execute(select(RecognitionCount.user_id).limit(1))).first()
+    has_tags = (await db.execute(select(ShoutOutTag.id).limit(1))).first()
+    if has_tags and not has_counts:
+        await rebuild(db)
+
+
+if __name__ == "__main__":
+    async def _main():
+        async with AsyncSessionLocal() as db:
+            count = await rebuild(db)
+        print(f"Rebuilt {count} leaderboard counters")
+
+    asyncio.run(_main())
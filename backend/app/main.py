@@ -1,15 +1,33 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import router  # existing API router
 from .test_db_router import router as test_db_router  # <-- import new router
 from .routers import router as auth_router  # import the router from routers.py
 from .routers import router as admin_router  # import the router from routers.py    
+from .config import settings
+from .uploads import UploadSizeLimitMiddleware, router as uploads_router
+from .http_cache import ResponseCacheMiddleware
+from .metrics import MetricsMiddleware, router as metrics_router
 
 
 app = FastAPI()
 
 
+# reject oversized uploads before they are spooled (added first so CORS wraps it)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_BYTES,
+    paths=("/auth/shoutouts", "/admin/shoutouts/bulk", "/admin/employees/import"),
+)
+
+# 304s and stored responses for @cached GET routes, before any DB work
+app.add_middleware(
+    ResponseCacheMiddleware,
+    router=app.router,
+    max_body_bytes=settings.RESPONSE_CACHE_MAX_BODY_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
 # CORS settings
 app.add_middleware(
     CORSMiddleware,
@@ -17,8 +35,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Exact", "ETag", "Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining"],
 )
 
+# request latency / SQL counts; added last so it is outermost and times everything
+app.add_middleware(MetricsMiddleware, slow_request_seconds=settings.SLOW_REQUEST_SECONDS)
+
 # include routers
 from .routers import router as auth_router  # /auth routes
 from .routers import admin_router           # /admin routes
@@ -33,13 +55,39 @@ app.include_router(router)  # existing routes
 app.include_router(test_db_router)  # new test-db route
   # admin routes with /admin prefix
 # startup event to create tables
-from .database import engine
+from .database import engine, AsyncSessionLocal, dispose_engines
 from .models import Base
+from . import analytics, archive, auth, feed, leaderboard, reactions, realtime, revocation, search, stats
 
 @app.on_event("startup")
 async def on_startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(search.create_index)
+    # build feed rows for shout-outs created before the read model existed
+    async with AsyncSessionLocal() as session:
+        await reactions.backfill_if_empty(session)
+        await feed.rebuild(session, missing_only=True)
+        await stats.backfill_if_empty(session)
+        await leaderboard.backfill_if_empty(session)
+        await archive.ensure_partitions(session)
+    await revocation.start()
+    await realtime.start()
+    await leaderboard.start()
+    await analytics.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    auth.password_hasher.shutdown()
+    await revocation.stop()
+    await realtime.stop()
+    await leaderboard.stop()
+    await analytics.stop()
+    await dispose_engines()
+
+# serve uploads (content-addressed, immutable caching, ETag/Range support)
+app.include_router(uploads_router)
 
-# serve uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Prometheus scrape endpoint
+app.include_router(metrics_router)
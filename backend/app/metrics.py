@@ -0,0 +1,351 @@
+"""
+Request, database and password-hashing metrics in Prometheus text format.
+
+- `MetricsMiddleware` times every HTTP request and records, per route
+  template, latency, the number of SQL statements it ran and their total
+  time. Requests slower than SLOW_REQUEST_SECONDS are logged with their
+  statements, which makes N-query patterns easy to spot.
+- `instrument_engine` hooks SQLAlchemy cursor events to time every
+  statement and attribute it to the current request.
+- `TimedAsyncAdaptedQueuePool` records how long a checkout waited for a
+  free connection.
+- `hashing.PasswordHasher` reports bcrypt time through
+  `PASSWORD_HASH_SECONDS`.
+
+Everything is served at GET /metrics. Values are per worker process, as
+with any Prometheus client. Only `config` is imported from the app, so
+any module can record into this one.
+"""
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SLOW_LOG_STATEMENT_CHARS = 300
+
+
+# ---------------------------
+# Metric types
+# ---------------------------
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+_registry: List["_Metric"] = []
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labels, key)} {_format(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Read from `collect` at scrape time; it returns {label values: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labels, key)} {_format(value)}" for key, value in sorted(self.collect().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def totals(self, **labels: str) -> Tuple[int, float]:
+        """(observations, sum) over every series whose labels match `labels`."""
+        count, total = 0, 0.0
+        with self._lock:
+            for key, row in self._values.items():
+                if all(key[self.labels.index(name)] == str(value) for name, value in labels.items()):
+                    count += int(sum(row[:-1]))
+                    total += row[-1]
+        return count, total
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(row)) for key, row in self._values.items())
+        lines = []
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), row):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le_label)} {_format(cumulative)}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_format(row[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {_format(cumulative)}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Total SQL execution time per HTTP request.", ("method", "route")
+)
+HTTP_SLOW_REQUESTS = Counter(
+    "http_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS.", ("method", "route")
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ("engine", "statement")
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",)
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds", "bcrypt time per call, excluding time queued for a worker.", ("op",)
+)
+
+
+# ---------------------------
+# Per-request trace
+# ---------------------------
+@dataclass
+class RequestTrace:
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: List[Tuple[str, float]] = field(default_factory=list)
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.statements) < settings.SLOW_REQUEST_MAX_QUERIES:
+            self.statements.append((statement, seconds))
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+# ---------------------------
+# Database
+# ---------------------------
+_VERB = re.compile(r"^\s*(\w+)")
+
+
+def _statement_kind(statement: str) -> str:
+    match = _VERB.match(statement)
+    verb = match.group(1).upper() if match else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Time every statement run through `engine` (an AsyncEngine) and count it against the current request."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        DB_QUERY_SECONDS.observe(elapsed, engine=name, statement=_statement_kind(statement))
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(statement, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_query_start"):
+            conn.info["metrics_query_start"].pop()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout wait, labelled by `pool_logging_name`."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, engine=self.logging_name or "default")
+
+
+_pools: Dict[str, object] = {}
+
+
+def _pool_collector(attr: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def collect() -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, engine in _pools.items():
+            method = getattr(engine.pool, attr, None)
+            if method is not None:
+                values[(name,)] = method()
+        return values
+    return collect
+
+
+def register_pool(engine, name: str) -> None:
+    """Report the engine's pool size and checked-out connections as gauges."""
+    _pools[name] = engine
+
+
+Gauge("db_pool_checked_out", "Connections currently checked out.", ("engine",), _pool_collector("checkedout"))
+Gauge("db_pool_size", "Configured pool size.", ("engine",), _pool_collector("size"))
+
+
+# ---------------------------
+# HTTP
+# ---------------------------
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Outermost middleware: time the request and log it when slow."""
+
+    def __init__(self, app, slow_request_seconds: float = 1.0):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    k.lower() == b"content-type" and v.startswith(b"text/event-stream")
+                    for k, v in message.get("headers", [])
+                )
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_trace.reset(token)
+            method, route = scope["method"], _route_name(scope)
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=str(status))
+            HTTP_REQUEST_QUERIES.observe(trace.queries, method=method, route=route)
+            HTTP_REQUEST_DB_SECONDS.observe(trace.db_seconds, method=method, route=route)
+            if elapsed >= self.slow_request_seconds and not streaming:
+                HTTP_SLOW_REQUESTS.inc(method=method, route=route)
+                self._log_slow(scope, status, elapsed, trace)
+
+    @staticmethod
+    def _log_slow(scope, status: int, elapsed: float, trace: RequestTrace) -> None:
+        lines = [
+            f"Slow request {scope['method']} {scope['path']} {status} in {elapsed * 1000:.1f} ms: "
+            f"{trace.queries} queries, {trace.db_seconds * 1000:.1f} ms in DB"
+        ]
+        for statement, seconds in trace.statements:
+            lines.append(f"  {seconds * 1000:8.1f} ms  {' '.join(statement.split())[:SLOW_LOG_STATEMENT_CHARS]}")
+        if trace.queries > len(trace.statements):
+            lines.append(f"  ... {trace.queries - len(trace.statements)} more")
+        logger.warning("\n".join(lines))
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint. Requires `Bearer METRICS_TOKEN` when that is set."""
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, JSON, Index, func, true
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -22,6 +22,28 @@ class User(Base):
     
     skills = Column(String, nullable=True)
     experience = Column(String, nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True, server_default=true())
+
+    __table_args__ = (
+        Index("ix_users_role_department_id", "role", "department", "id"),
+        # admin listings sort and prefix-filter on this expression
+        Index("ix_users_name_lower_id", func.lower(func.coalesce(name, "")), "id"),
+    )
+
+
+class RevokedToken(Base):
+    """
+    Persisted token denylist (revocation.py). `key` is "jti:<id>" for one
+    token, "fam:<id>" for a refresh-token family, or "user:<id>" for every
+    token issued to a user up to `revoked_at`. Rows are kept until
+    `expires_at`, after which the tokens they cover have expired anyway.
+    """
+    __tablename__ = "revoked_tokens"
+
+    key = Column(String(80), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, index=True)
+    reason = Column(String(20), nullable=False)
 
 
 class SecurityKey(Base):
@@ -39,7 +61,9 @@ class ShoutOut(Base):
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     message = Column(Text, nullable=False)
     image_url = Column(String(500), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    thumbnail_url = Column(String(500), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # monthly partition key on Postgres
+    department = Column(String, nullable=True)  # author's department when posted
 
     # Relationships
     author = relationship("User", backref="shoutouts")
@@ -47,6 +71,27 @@ class ShoutOut(Base):
     reactions = relationship("ShoutOutReaction", backref="shoutout")
     comments = relationship("ShoutOutComment", backref="shoutout")
 
+    __table_args__ = (
+        Index("ix_shoutouts_created_at_id", "created_at", "id"),
+        Index("ix_shoutouts_author_id_created_at", "author_id", "created_at"),
+    )
+
+
+class ShoutOutDepartment(Base):
+    """
+    One row per department a shout-out belongs to: the author's and every
+    tagged user's. Drives the department feed.
+    """
+    __tablename__ = "shoutout_departments"
+
+    shoutout_id = Column(Integer, ForeignKey("shoutouts.id"), primary_key=True)
+    department = Column(String, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_shoutout_departments_department_created_at_id", "department", "created_at", "shoutout_id"),
+    )
+
 
 class ShoutOutTag(Base):
     __tablename__ = "shoutout_tags"
@@ -58,6 +103,11 @@ class ShoutOutTag(Base):
     # Relationships
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_shoutout_tags_shoutout_id_user_id", "shoutout_id", "user_id"),
+        Index("ix_shoutout_tags_user_id_shoutout_id", "user_id", "shoutout_id"),
+    )
+
 
 class ShoutOutReaction(Base):
     __tablename__ = "shoutout_reactions"
@@ -66,10 +116,25 @@ class ShoutOutReaction(Base):
     shoutout_id = Column(Integer, ForeignKey("shoutouts.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     emoji = Column(String(10), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)  # NULL for reactions older than the column
 
     # Relationships
     user = relationship("User")
 
+    __table_args__ = (
+        # one reaction per user and emoji; also serves lookups by shoutout_id
+        Index("uq_shoutout_reactions_shoutout_user_emoji", "shoutout_id", "user_id", "emoji", unique=True),
+    )
+
+
+class ShoutOutReactionCount(Base):
+    """Reaction totals per shout-out and emoji, kept current by the react endpoints."""
+    __tablename__ = "shoutout_reaction_counts"
+
+    shoutout_id = Column(Integer, ForeignKey("shoutouts.id"), primary_key=True)
+    emoji = Column(String(10), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 
 class ShoutOutComment(Base):
     __tablename__ = "shoutout_comments"
@@ -82,3 +147,115 @@ class ShoutOutComment(Base):
 
     # Relationships
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_shoutout_comments_shoutout_id_id", "shoutout_id", "id"),
+        Index("ix_shoutout_comments_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class ShoutOutFeedItem(Base):
+    """
+    Denormalized feed row, one per shout-out.
+    Kept up to date on write so a feed page is a single range scan.
+    """
+    __tablename__ = "shoutout_feed"
+
+    shoutout_id = Column(Integer, ForeignKey("shoutouts.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    message = Column(Text, nullable=False)
+    image_url = Column(String(500), nullable=True)
+    thumbnail_url = Column(String(500), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    tagged_user_ids = Column(JSON, nullable=False, default=list)
+    tagged_user_names = Column(JSON, nullable=False, default=list)
+    reactions = Column(JSON, nullable=False, default=dict)  # {emoji: count}
+    comments_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_shoutout_feed_created_at_id", "created_at", "shoutout_id"),
+    )
+
+
+class UserStats(Base):
+    """Per-user activity counters, kept current by the write endpoints."""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shoutouts_given = Column(Integer, nullable=False, default=0)
+    shoutouts_received = Column(Integer, nullable=False, default=0)
+    comments_made = Column(Integer, nullable=False, default=0)
+    reactions_received = Column(Integer, nullable=False, default=0)
+
+
+class RecognitionCount(Base):
+    """
+    Times a user was tagged in shout-outs during one week/month/quarter,
+    under their department at the time. Kept current by `create_many`;
+    backs the leaderboards.
+    """
+    __tablename__ = "recognition_counts"
+
+    period = Column(String(8), primary_key=True)  # "week", "month" or "quarter"
+    bucket_start = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# ---------------------------
+# Analytics rollups (analytics.py); days are UTC
+# ---------------------------
+class DailyDepartmentStats(Base):
+    """Activity per day and department, attributed to the acting user's department."""
+    __tablename__ = "daily_department_stats"
+
+    day = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)
+    posts = Column(Integer, nullable=False, default=0)
+    tags = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    reactions = Column(Integer, nullable=False, default=0)
+    active_users = Column(Integer, nullable=False, default=0)
+
+
+class DailyReactionCount(Base):
+    __tablename__ = "daily_reaction_counts"
+
+    day = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)
+    emoji = Column(String(10), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DailyActiveUser(Base):
+    """Users who posted, commented or reacted on a day; `active_users` counts these."""
+    __tablename__ = "daily_active_users"
+
+    day = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+
+
+class RollupWatermark(Base):
+    """Highest source row id already folded into the rollups, per source table."""
+    __tablename__ = "rollup_watermarks"
+
+    source = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class ShoutOutArchive(Base):
+    """One month of shout-outs moved out of the database into a file (see archive.py)."""
+    __tablename__ = "shoutout_archives"
+
+    month = Column(Date, primary_key=True)  # first day of the month
+    path = Column(String(500), nullable=False)  # relative to ARCHIVE_DIR
+    format = Column(String(10), nullable=False)
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    shoutouts = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    reactions = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime, nullable=False)
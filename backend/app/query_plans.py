@@ -0,0 +1,112 @@
+"""
+EXPLAIN-based guard for the hot read paths.
+
+Each query in `HOT_QUERIES` mirrors one the API runs on every poll. The
+check asks the database for its plan and fails if any of them falls back to
+a full table scan, which means an index is missing or no longer usable.
+It runs against DATABASE_URL:
+
+    cd backend
+    python -m app.query_plans      # exit status 1 on a sequential scan
+
+On Postgres, sequential scans are disabled for the check session
+(`enable_seqscan = off`), so a seq scan that remains means the planner had
+no usable index. Small tables alone therefore do not cause false failures.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from . import comments, directory, feed, stats
+from .models import User
+from .database import Base, engine
+
+SAMPLE_USER_ID = 1
+SAMPLE_SHOUTOUT_ID = 1
+SAMPLE_DEPARTMENT = "Engineering"
+
+HOT_QUERIES: Dict[str, Callable] = {
+    "feed_first_page": lambda: feed.page_query(None, feed.FEED_DEFAULT_LIMIT + 1),
+    "feed_next_page": lambda: feed.page_query((datetime.utcnow(), 10**9), feed.FEED_DEFAULT_LIMIT + 1),
+    "department_feed_first_page": lambda: feed.department_page_query(SAMPLE_DEPARTMENT, None, feed.FEED_MAX_LIMIT + 1),
+    "department_feed_next_page": lambda: feed.department_page_query(
+        SAMPLE_DEPARTMENT, (datetime.utcnow(), 10**9), feed.FEED_DEFAULT_LIMIT + 1
+    ),
+    "list_comments": lambda: comments.page_query(SAMPLE_SHOUTOUT_ID, None, comments.COMMENTS_MAX_LIMIT + 1),
+    "list_comments_next_page": lambda: comments.page_query(SAMPLE_SHOUTOUT_ID, 10**9, comments.COMMENTS_DEFAULT_LIMIT + 1),
+    "metrics_recent_activity": lambda: stats.recent_activity_query(SAMPLE_USER_ID),
+    "admin_employees_page": lambda: directory.page_query(
+        directory.apply_filters(select(User), directory.UserFilters(role="employee", department=SAMPLE_DEPARTMENT)),
+        "id", directory.FIELDS, (10**9, 10**9), directory.LIST_DEFAULT_LIMIT + 1,
+    ),
+    "admin_users_by_name": lambda: directory.page_query(
+        directory.apply_filters(select(User), directory.UserFilters(role="employee", name_prefix="al")),
+        "name", directory.FIELDS, None, directory.LIST_DEFAULT_LIMIT + 1,
+    ),
+}
+
+
+def _compile(conn: AsyncConnection, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in (compiled.positiontup or []))
+    return str(compiled), params
+
+
+async def _sqlite_seq_scans(conn: AsyncConnection, sql: str, params: tuple) -> List[str]:
+    res = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)
+    details = [row[-1] for row in res.all()]
+    # "SCAN t" is a full scan; "SCAN t USING [COVERING] INDEX ix" walks an index in order.
+    # Scans of subqueries (anon_N) read already-limited intermediate rows and are fine.
+    return [
+        d for d in details
+        if d.startswith("SCAN ") and "USING" not in d and d.split()[1] in Base.metadata.tables
+    ]
+
+
+def _pg_seq_scans(plan: dict) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(f"Seq Scan on {plan.get('Relation Name')}")
+    for child in plan.get("Plans", []):
+        found.extend(_pg_seq_scans(child))
+    return found
+
+
+async def _pg_seq_scan_list(conn: AsyncConnection, sql: str, params: tuple) -> List[str]:
+    res = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    raw = res.scalar()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return _pg_seq_scans(plan[0]["Plan"])
+
+
+async def check_plans() -> Dict[str, List[str]]:
+    """Return {query name: [offending plan steps]} for every hot query."""
+    failures: Dict[str, List[str]] = {}
+    async with engine.connect() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, build in HOT_QUERIES.items():
+            sql, params = _compile(conn, build())
+            if is_postgres:
+                scans = await _pg_seq_scan_list(conn, sql, params)
+            else:
+                scans = await _sqlite_seq_scans(conn, sql, params)
+            if scans:
+                failures[name] = scans
+        await conn.rollback()
+    return failures
+
+
+if __name__ == "__main__":
+    engine.echo = False
+    result = asyncio.run(check_plans())
+    for query_name in HOT_QUERIES:
+        print(f"{'FAIL' if query_name in result else 'ok  '} {query_name} {'; '.join(result.get(query_name, []))}")
+    sys.exit(1 if result else 0)
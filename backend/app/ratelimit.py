@@ -0,0 +1,229 @@
+"""
+Token-bucket rate limiting for login, registration and the write endpoints.
+
+Each policy is "N per period": a bucket holds at most N tokens, refills at
+N/period tokens per second and every request takes one. Buckets are keyed
+by policy and subject: the user id from the bearer token (decoded, not
+looked up) or the client IP. Apply a policy as a route dependency:
+
+    @router.post("/login", dependencies=[Depends(ratelimit.limit("login"))])
+
+It runs before the endpoint body, so a rejected login never reaches
+bcrypt. Responses carry `X-RateLimit-Limit` / `X-RateLimit-Remaining`;
+a 429 also carries `Retry-After`.
+
+Backends: `LocalBackend` keeps one (tokens, timestamp) pair per key in this
+process and drops keys whose bucket has refilled (a full bucket is the same
+as no bucket). `RedisBackend` runs the same arithmetic in a Lua script so
+all workers share one bucket per key. Limiting fails open: a backend error
+is logged and the request goes through.
+"""
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from . import auth
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_SPEC = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$")
+
+_counters = {"allowed": 0, "limited": 0, "errors": 0}
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    capacity: int
+    period: float  # seconds to refill an empty bucket
+    per: str = "user"  # "user" (falls back to IP without a valid token) or "ip"
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(spec: str) -> Tuple[int, float]:
+    """"10/minute" -> (10, 60.0). Raises ValueError on anything else."""
+    match = _RATE_SPEC.match(spec)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '10/minute'")
+    return int(match.group(1)), float(_PERIODS[match.group(2)])
+
+
+def _policy(name: str, spec: str, per: str) -> Policy:
+    capacity, period = parse_rate(spec)
+    return Policy(name, capacity, period, per)
+
+
+POLICIES: Dict[str, Policy] = {
+    "login": _policy("login", settings.RATE_LIMIT_LOGIN, "ip"),
+    "register": _policy("register", settings.RATE_LIMIT_REGISTER, "ip"),
+    "shoutout": _policy("shoutout", settings.RATE_LIMIT_SHOUTOUT, "user"),
+    "reaction": _policy("reaction", settings.RATE_LIMIT_REACTION, "user"),
+    "comment": _policy("comment", settings.RATE_LIMIT_COMMENT, "user"),
+}
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class RateLimitBackend:
+    async def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        """Take one token if there is one. Returns (allowed, tokens left)."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LocalBackend(RateLimitBackend):
+    """
+    Buckets for this process in an OrderedDict kept in last-use order, so
+    idle keys collect at the front and are swept in O(1) per request. At
+    most `max_keys` are kept; beyond that the least recently used go first.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.evictions = 0
+        # key -> (tokens, updated_at, full_at)
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+
+    def _evict_idle(self, now: float) -> None:
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now:
+                return
+            del self._buckets[key]
+            self.evictions += 1
+
+    async def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        self._evict_idle(now)
+        bucket = self._buckets.pop(key, None)
+        tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+        return allowed, tokens
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Buckets shared by every worker, one Redis hash per key. The update is a
+    single Lua script (atomic, Redis clock); keys expire once refilled.
+    Requires the `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[self.prefix + key], args=[capacity, rate])
+        return bool(allowed), float(tokens)
+
+
+def build_backend(kind: str) -> RateLimitBackend:
+    if kind == "local":
+        return LocalBackend(settings.RATE_LIMIT_MAX_KEYS)
+    if kind == "redis":
+        return RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND backend: {kind}")
+
+
+backend: RateLimitBackend = build_backend(settings.RATE_LIMIT_BACKEND)
+
+
+def stats() -> dict:
+    return {**_counters, "backend": type(backend).__name__, **backend.stats()}
+
+
+# ---------------------------
+# Dependency
+# ---------------------------
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+def _subject(request: Request, per: str) -> str:
+    if per == "user":
+        token = auth.bearer_token(request.headers.get("authorization"))
+        user_id = auth.decode_user_id(token) if token else None
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"ip:{client_ip(request)}"
+
+
+def limit(name: str):
+    """Route dependency enforcing the named policy from `POLICIES`."""
+    policy = POLICIES[name]
+
+    async def check_rate_limit(request: Request, response: Response) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        try:
+            allowed, tokens = await backend.take(
+                f"{policy.name}:{_subject(request, policy.per)}", policy.capacity, policy.rate
+            )
+        except Exception:
+            _counters["errors"] += 1
+            logger.exception("Rate limit backend failed; allowing request")
+            return
+
+        headers = {"X-RateLimit-Limit": str(policy.capacity), "X-RateLimit-Remaining": str(int(tokens))}
+        if not allowed:
+            _counters["limited"] += 1
+            retry_after = max(1, math.ceil((1 - tokens) / policy.rate))
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={**headers, "Retry-After": str(retry_after)},
+            )
+        _counters["allowed"] += 1
+        response.headers.update(headers)
+
+    return check_rate_limit
@@ -0,0 +1,92 @@
+"""
+Idempotent reactions.
+
+A user has at most one reaction per shout-out and emoji (unique index on
+`shoutout_reactions`). Totals live in `shoutout_reaction_counts` and are
+changed in the same transaction as the reaction row, so nothing on the read
+path has to count raw reactions.
+"""
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import insert_for
+from .models import ShoutOutReaction, ShoutOutReactionCount
+
+
+async def add(db: AsyncSession, shoutout_id: int, user_id: int, emoji: str) -> Optional[int]:
+    """
+    Record a reaction. Returns the new total for the emoji, or None if the
+    user had already reacted with it (nothing changed).
+    """
+    stmt = (
+        insert_for(db, ShoutOutReaction)
+        .values(shoutout_id=shoutout_id, user_id=user_id, emoji=emoji)
+        .on_conflict_do_nothing(index_elements=["shoutout_id", "user_id", "emoji"])
+        .returning(ShoutOutReaction.id)
+    )
+    if (await db.execute(stmt)).first() is None:
+        return None
+
+    stmt = insert_for(db, ShoutOutReactionCount).values(shoutout_id=shoutout_id, emoji=emoji, count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["shoutout_id", "emoji"],
+        set_={"count": ShoutOutReactionCount.count + 1},
+    ).returning(ShoutOutReactionCount.count)
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def remove(db: AsyncSession, shoutout_id: int, user_id: int, emoji: str) -> Optional[int]:
+    """
+    Withdraw a reaction. Returns the new total for the emoji (0 when the
+    last one is gone), or None if the user had not reacted with it.
+    """
+    res = await db.execute(
+        delete(ShoutOutReaction)
+        .where(
+            ShoutOutReaction.shoutout_id == shoutout_id,
+            ShoutOutReaction.user_id == user_id,
+            ShoutOutReaction.emoji == emoji,
+        )
+        .returning(ShoutOutReaction.id)
+    )
+    if res.first() is None:
+        return None
+
+    key = (ShoutOutReactionCount.shoutout_id == shoutout_id, ShoutOutReactionCount.emoji == emoji)
+    res = await db.execute(
+        update(ShoutOutReactionCount)
+        .where(*key)
+        .values(count=ShoutOutReactionCount.count - 1)
+        .returning(ShoutOutReactionCount.count)
+    )
+    count = max(res.scalar_one_or_none() or 0, 0)
+    if count == 0:
+        await db.execute(delete(ShoutOutReactionCount).where(*key))
+    return count
+
+
+# ---------------------------
+# Backfill / reconcile
+# ---------------------------
+async def rebuild_counts(db: AsyncSession) -> int:
+    """Recompute every total from the raw reaction rows. Returns the number of counters."""
+    await db.execute(delete(ShoutOutReactionCount))
+    res = await db.execute(
+        select(ShoutOutReaction.shoutout_id, ShoutOutReaction.emoji, func.count(ShoutOutReaction.id))
+        .group_by(ShoutOutReaction.shoutout_id, ShoutOutReaction.emoji)
+    )
+    rows = [{"shoutout_id": sid, "emoji": emoji, "count": int(cnt)} for sid, emoji, cnt in res.all()]
+    if rows:
+        await db.execute(insert_for(db, ShoutOutReactionCount), rows)
+    await db.commit()
+    return len(rows)
+
+
+async def backfill_if_empty(db: AsyncSession) -> None:
+    """Build totals on first start after upgrading; no-op afterwards."""
+    has_counts = (await db.execute(select(ShoutOutReactionCount.shoutout_id).limit(1))).first()
+    has_reactions = (await db.execute(select(ShoutOutReaction.id).limit(1))).first()
+    if has_reactions and not has_counts:
+        await rebuild_counts(db)
@@ -0,0 +1,219 @@
+"""
+Real-time shout-out events for open dashboards.
+
+The write endpoints publish small deltas (new shout-out, reaction, comment)
+after they commit. Clients on /auth/shoutouts/stream get them pushed and
+don't need to poll the feed.
+
+- `Hub` fans events out to the connections in this process. Channels are
+  per department (`dept:<name>`); a connection follows one department or
+  all of them. An event goes to every department whose feed shows the
+  shout-out (see `shoutout_departments`), and reaches each connection once.
+- Each connection has a bounded queue. A connection that can't keep up
+  has its backlog dropped and gets a single `resync` event, which tells
+  the client to refetch the feed. Publishers never wait for slow clients.
+- A `Broker` carries events between processes. `LocalBroker` delivers
+  straight to this process's hub (one worker, tests). `PostgresBroker`
+  uses LISTEN/NOTIFY so every uvicorn worker sees every event.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+ALL_DEPARTMENTS = "*"
+RESYNC = {"type": "resync"}
+PG_NOTIFY_CHANNEL = "shoutout_events"
+PG_NOTIFY_MAX_BYTES = 7900  # NOTIFY payloads must stay under 8000 bytes
+
+
+def channel_for(department: Optional[str]) -> str:
+    return f"dept:{department or ''}"
+
+
+# ---------------------------
+# Per-connection queue
+# ---------------------------
+class Subscription:
+    """Bounded event queue for one connection."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.payload: Optional[dict] = None  # the subscriber's decoded access token, re-checked while streaming
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, event: dict) -> None:
+        """Queue an event without waiting; on overflow replace the backlog with `resync`."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+# ---------------------------
+# Fan-out hub
+# ---------------------------
+class Hub:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._channels: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, department: Optional[str] = None) -> Subscription:
+        """Follow one department, or every department when `department` is None."""
+        channel = ALL_DEPARTMENTS if department is None else channel_for(department)
+        sub = Subscription(channel, self.queue_size)
+        self._channels.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._channels.get(sub.channel)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._channels[sub.channel]
+        self.dropped += sub.dropped
+
+    def dispatch(self, channels: List[str], event: dict) -> None:
+        """Hand an event once to every local subscriber of any of `channels` or of all departments."""
+        self.published += 1
+        subs = set()
+        for key in (*channels, ALL_DEPARTMENTS):
+            subs.update(self._channels.get(key, ()))
+        for sub in subs:
+            sub.offer(event)
+            self.delivered += 1
+
+    def stats(self) -> dict:
+        subs = [sub for group in self._channels.values() for sub in group]
+        return {
+            "connections": len(subs),
+            "channels": len(self._channels),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped + sum(sub.dropped for sub in subs),
+            "broker": type(broker).__name__,
+        }
+
+
+# ---------------------------
+# Brokers
+# ---------------------------
+Deliver = Callable[[List[str], dict], None]
+
+
+class Broker:
+    """Carries events to the hub of every worker process."""
+
+    async def start(self, deliver: Deliver) -> None:
+        raise NotImplementedError
+
+    async def publish(self, channels: List[str], event: dict) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        pass
+
+
+class LocalBroker(Broker):
+    """In-process stand-in: events only reach this worker's subscribers."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, channels: List[str], event: dict) -> None:
+        if self._deliver is not None:
+            self._deliver(channels, event)
+
+
+class PostgresBroker(Broker):
+    """
+    Shares events between workers through Postgres LISTEN/NOTIFY, on one
+    dedicated asyncpg connection per process. Requires asyncpg.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self._conn = None
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        import asyncpg
+
+        self._deliver = deliver
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(PG_NOTIFY_CHANNEL, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        message = json.loads(payload)
+        self._deliver(message["channels"], message["event"])
+
+    async def publish(self, channels: List[str], event: dict) -> None:
+        payload = json.dumps({"channels": channels, "event": event}, default=str)
+        if len(payload.encode()) > PG_NOTIFY_MAX_BYTES:
+            payload = json.dumps({"channels": channels, "event": RESYNC})
+        await self._conn.execute("SELECT pg_notify($1, $2)", PG_NOTIFY_CHANNEL, payload)
+
+    async def stop(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+def build_broker(kind: str) -> Broker:
+    if kind == "local":
+        return LocalBroker()
+    if kind == "postgres":
+        return PostgresBroker(settings.DATABASE_URL)
+    raise ValueError(f"Unknown REALTIME_BROKER backend: {kind}")
+
+
+hub = Hub(queue_size=settings.REALTIME_QUEUE_SIZE)
+broker: Broker = build_broker(settings.REALTIME_BROKER)
+
+
+async def start() -> None:
+    await broker.start(hub.dispatch)
+
+
+async def stop() -> None:
+    await broker.stop()
+
+
+# ---------------------------
+# Publishing (call after commit)
+# ---------------------------
+async def publish(departments: Iterable[Optional[str]], event_type: str, **data: Any) -> None:
+    """
+    Send an event to the channels of `departments`: those whose feed shows
+    the shout-out. Delivery is best effort: a broker failure is logged and
+    never fails the request that caused it.
+    """
+    event = {"type": event_type, **data}
+    channels = sorted({channel_for(department) for department in departments if department is not None})
+    try:
+        await broker.publish(channels, event)
+    except Exception:
+        logger.exception("Failed to publish %s event", event_type)
+
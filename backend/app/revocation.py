@@ -0,0 +1,274 @@
+"""
+Revocation for stateless JWTs, checked without a database read.
+
+Tokens carry a `jti`, and the ones from a login share a refresh-token
+family id (`fam`). A token is revoked when the denylist has an entry for:
+
+- `jti:<jti>`: that token (logout, a rotated refresh token)
+- `fam:<fam>`: the whole login (refresh-token reuse, logout)
+- `user:<id>`: every token issued to the user up to `revoked_at`
+  (suspension, deletion)
+
+Every worker keeps the unexpired entries in memory, behind a bloom filter
+that answers "not revoked" for almost every valid token without touching
+the dict. Entries are written to `revoked_tokens` first, so they survive
+restarts. Workers load the table on startup and pick up each other's
+revocations every TOKEN_DENYLIST_SYNC_SECONDS, which bounds how long a
+token revoked elsewhere stays usable. Entries are pruned once the tokens
+they cover have expired.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import AsyncSessionLocal, insert_for
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# re-read this much before the newest entry seen, for rows committed late
+SYNC_OVERLAP = timedelta(seconds=max(30, 2 * settings.TOKEN_DENYLIST_SYNC_SECONDS))
+
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+# ---------------------------
+# Bloom filter
+# ---------------------------
+class BloomFilter:
+    """Set membership with no false negatives; sized for `capacity` keys at `error_rate`."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# ---------------------------
+# In-memory denylist
+# ---------------------------
+@dataclass
+class Entry:
+    expires_at: datetime
+    revoked_at: datetime
+
+
+class Denylist:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.entries: Dict[str, Entry] = {}
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.synced_until: Optional[datetime] = None  # newest revoked_at loaded from the table
+        self.lookups = 0
+        self.bloom_negatives = 0
+        self.hits = 0
+
+    def add(self, key: str, expires_at: datetime, revoked_at: datetime) -> None:
+        current = self.entries.get(key)
+        if current is not None:
+            expires_at = max(expires_at, current.expires_at)
+            revoked_at = max(revoked_at, current.revoked_at)
+        self.entries[key] = Entry(expires_at, revoked_at)
+        if len(self.entries) > self.bloom.capacity:
+            self._rebuild()
+        else:
+            self.bloom.add(key)
+
+    def get(self, key: str) -> Optional[Entry]:
+        self.lookups += 1
+        if key not in self.bloom:
+            self.bloom_negatives += 1
+            return None
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def prune(self, now: datetime) -> int:
+        """Drop entries whose tokens have expired and rebuild the filter; returns how many."""
+        expired = [key for key, entry in self.entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+        self._rebuild()
+        return len(expired)
+
+    def _rebuild(self) -> None:
+        # a bloom filter can't forget keys, and a full one loses its error rate
+        self.bloom = BloomFilter(max(self.capacity, 2 * len(self.entries)), self.error_rate)
+        for key in self.entries:
+            self.bloom.add(key)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bloom_capacity": self.bloom.capacity,
+            "bloom_bytes": len(self.bloom._bits),
+            "lookups": self.lookups,
+            "bloom_negatives": self.bloom_negatives,
+            "hits": self.hits,
+        }
+
+
+denylist = Denylist(settings.TOKEN_DENYLIST_BLOOM_CAPACITY, settings.TOKEN_DENYLIST_BLOOM_ERROR_RATE)
+
+
+def is_revoked(payload: dict) -> bool:
+    """True if a decoded token's jti, family or user has been revoked. Memory only."""
+    jti, fam, sub = payload.get("jti"), payload.get("fam"), payload.get("sub")
+    if jti and denylist.get(f"jti:{jti}") is not None:
+        return True
+    if fam and denylist.get(f"fam:{fam}") is not None:
+        return True
+    if sub is not None:
+        entry = denylist.get(f"user:{sub}")
+        if entry is not None:
+            # `iat` is whole seconds: a token from the second of the revocation
+            # (a login right after an unsuspend) counts as issued after it
+            issued_at = payload.get("iat")
+            return issued_at is None or issued_at < int(_timestamp(entry.revoked_at))
+    return False
+
+
+# ---------------------------
+# Revoking (each call commits)
+# ---------------------------
+def _refresh_lifetime() -> timedelta:
+    # no token outlives a refresh token issued now
+    return timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+async def _revoke(db: AsyncSession, key: str, expires_at: datetime, reason: str) -> None:
+    now = datetime.utcnow()
+    stmt = insert_for(db, RevokedToken).values(key=key, expires_at=expires_at, revoked_at=now, reason=reason)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RevokedToken.key],
+        set_={"expires_at": stmt.excluded.expires_at, "revoked_at": stmt.excluded.revoked_at, "reason": reason},
+    )
+    await db.execute(stmt)
+    await db.commit()
+    denylist.add(key, expires_at, now)
+
+
+async def revoke_token(db: AsyncSession, payload: dict, reason: str) -> None:
+    """Revoke one decoded token until it expires."""
+    if payload.get("jti"):
+        expires_at = datetime.utcfromtimestamp(payload["exp"])
+        await _revoke(db, f"jti:{payload['jti']}", expires_at, reason)
+
+
+async def revoke_family(db: AsyncSession, fam: str, reason: str) -> None:
+    """Revoke every access and refresh token of one login."""
+    await _revoke(db, f"fam:{fam}", datetime.utcnow() + _refresh_lifetime(), reason)
+
+
+async def revoke_user(db: AsyncSession, user_id: int, reason: str) -> None:
+    """Revoke every token issued to the user so far; later logins are unaffected."""
+    await _revoke(db, f"user:{user_id}", datetime.utcnow() + _refresh_lifetime(), reason)
+
+
+async def claim_refresh(db: AsyncSession, payload: dict) -> bool:
+    """
+    Mark a refresh token as used. Returns False if it had been used (or
+    revoked) before, in any worker: the insert is the arbiter, so two
+    concurrent rotations of one token cannot both succeed.
+    """
+    now = datetime.utcnow()
+    key = f"jti:{payload['jti']}"
+    expires_at = datetime.utcfromtimestamp(payload["exp"])
+    stmt = (
+        insert_for(db, RevokedToken)
+        .values(key=key, expires_at=expires_at, revoked_at=now, reason="rotated")
+        .on_conflict_do_nothing(index_elements=[RevokedToken.key])
+        .returning(RevokedToken.key)
+    )
+    claimed = (await db.execute(stmt)).first() is not None
+    await db.commit()
+    if claimed:
+        denylist.add(key, expires_at, now)
+    return claimed
+
+
+# ---------------------------
+# Loading / sync
+# ---------------------------
+async def sync(db: AsyncSession) -> int:
+    """Load unexpired entries revoked since the last sync (all on the first); returns how many."""
+    now = datetime.utcnow()
+    query = select(RevokedToken.key, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+        RevokedToken.expires_at > now
+    )
+    if denylist.synced_until is not None:
+        query = query.where(RevokedToken.revoked_at > denylist.synced_until - SYNC_OVERLAP)
+    rows = (await db.execute(query)).all()
+    for key, expires_at, revoked_at in rows:
+        denylist.add(key, expires_at, revoked_at)
+        if denylist.synced_until is None or revoked_at > denylist.synced_until:
+            denylist.synced_until = revoked_at
+    if denylist.synced_until is None:
+        denylist.synced_until = now
+    return len(rows)
+
+
+async def prune(db: AsyncSession) -> int:
+    now = datetime.utcnow()
+    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+    await db.commit()
+    return denylist.prune(now)
+
+
+_syncer: Optional[asyncio.Task] = None
+
+
+async def _sync_forever() -> None:
+    last_prune = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.TOKEN_DENYLIST_SYNC_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await sync(db)
+                if time.monotonic() - last_prune >= settings.TOKEN_DENYLIST_PRUNE_SECONDS:
+                    await prune(db)
+                    last_prune = time.monotonic()
+        except Exception:
+            logger.exception("Token denylist sync failed; serving the previous entries")
+
+
+async def start() -> None:
+    """Load the denylist, then keep it in sync in the background."""
+    global _syncer
+    async with AsyncSessionLocal() as db:
+        await sync(db)
+    _syncer = asyncio.create_task(_sync_forever())
+
+
+async def stop() -> None:
+    global _syncer
+    if _syncer is not None:
+        _syncer.cancel()
+        _syncer = None
@@ -1,18 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Response, Request, UploadFile, File, Form, Query
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from datetime import timedelta
-from jose import jwt, JWTError
+from sqlalchemy import select
+from datetime import date, datetime, timedelta
 from passlib.context import CryptContext
 import secrets
 from typing import Optional, List
-import os
-from uuid import uuid4
+import json
 
-from .auth import get_current_admin_user, get_current_user, get_password_hash
-from . import auth, crud, schemas
-from .database import get_db
-from .models import User, SecurityKey, ShoutOut, ShoutOutTag, ShoutOutReaction, ShoutOutComment
+from .auth import get_current_admin_user, get_current_user
+from . import analytics, archive, auth, cache, comments, crud, directory, employees, fastjson, feed, http_cache, leaderboard, ratelimit, reactions, realtime, revocation, schemas, search, shoutouts, stats, uploads
+from .config import settings
+from .database import AsyncSessionLocal, get_db, get_read_db
+from .models import User, SecurityKey, ShoutOutComment, ShoutOutFeedItem, UserStats
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 admin_router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -22,43 +23,108 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 # ---------------- GET ALL EMPLOYEES ----------------
-@admin_router.get("/employees", response_model=List[schemas.UserOut])
+LIST_LIMIT = Query(directory.LIST_DEFAULT_LIMIT, ge=1, le=directory.LIST_MAX_LIMIT)
+LIST_SORT = Query("id", pattern=directory.SORT_PATTERN)
+
+
+async def _list_users(response: Response, db: AsyncSession, base, sort: str, fields: Optional[str], cursor: Optional[str], limit: int):
+    """Page through `base`, setting X-Next-Cursor, X-Total-Count and X-Total-Count-Exact."""
+    try:
+        items, next_cursor = await directory.fetch_page(db, base, sort, directory.parse_fields(fields), cursor, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    total, exact = await directory.count_estimate(db, base)
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Exact"] = "true" if exact else "false"
+    return fastjson.respond(items, response)
+
+
+@admin_router.get("/employees", response_model=List[schemas.UserListItem], response_model_exclude_unset=True)
+@http_cache.cached("users", vary_user=True)
 async def list_employees(
+    response: Response,
+    department: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    sort: str = LIST_SORT,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = LIST_LIMIT,
     current_admin: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Fetch employees based on admin's department.
-    Superadmins can see all employees.
+    Superadmins can see all employees (optionally one `department`).
     Regular admins can see only employees in their department.
+    `sort` is id or name (prefix `-` for descending); `fields` is a
+    comma-separated list of columns to return. Pass the `X-Next-Cursor`
+    response header back as `cursor` to get the next page; X-Total-Count
+    is exact when X-Total-Count-Exact is true, else an estimate.
     """
-    if current_admin.role == "superadmin":
-        # Superadmin sees all employees
-        query = select(User).where(User.role == "employee")
-    else:
-        # Department-wise scoping
-        query = select(User).where(
-            User.role == "employee",
-            User.department == current_admin.department
-        )
-
-    result = await db.execute(query)
-    employees = result.scalars().all()
-    return employees
+    filters = directory.UserFilters(department=department, is_active=is_active, name_prefix=name_prefix)
+    base = directory.apply_filters(employees.employee_query(current_admin), filters)
+    return await _list_users(response, db, base, sort, fields, cursor, limit)
+
+# ---------------- BULK IMPORT / EXPORT EMPLOYEES ----------------
+@admin_router.post("/employees/import", response_model=schemas.EmployeeImportResult)
+async def import_employees(
+    file: UploadFile = File(...),
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create employees from a .csv (header row) or .jsonl upload with
+    username, name, email, password and optional department, joining_date,
+    current_project, skills, experience. Invalid or taken rows are skipped
+    and reported; regular admins import into their own department only.
+    """
+    try:
+        records = employees.iter_records(file.file, file.filename)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    report = await employees.import_employees(db, records, current_admin)
+    if report.created:
+        await http_cache.bump("users")
+    return report.to_schema()
+
+
+@admin_router.get("/employees/export")
+async def export_employees(current_admin: User = Depends(get_current_admin_user)):
+    """Stream the employees visible to this admin as CSV."""
+    return StreamingResponse(
+        employees.export_csv(current_admin),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="employees.csv"'},
+    )
 
 # ---------------- GET ALL ADMINS ----------------
-@admin_router.get("/admins", response_model=List[schemas.UserOut])
+@admin_router.get("/admins", response_model=List[schemas.UserListItem], response_model_exclude_unset=True)
+@http_cache.cached("users", vary_user=True)
 async def list_admins(
+    response: Response,
+    role: str = Query("admin", pattern="^(admin|superadmin)$"),
+    department: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    sort: str = LIST_SORT,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = LIST_LIMIT,
     current_admin: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Superadmin can view all admins"""
+    """Superadmin can view all admins. Filtered and paginated like /admin/employees."""
     if current_admin.role != "superadmin":
         raise HTTPException(status_code=403, detail="Forbidden: Only superadmin can view admins")
     
-    result = await db.execute(select(User).where(User.role == "admin"))
-    admins = result.scalars().all()
-    return admins
+    filters = directory.UserFilters(department=department, role=role, is_active=is_active, name_prefix=name_prefix)
+    base = directory.apply_filters(select(User), filters)
+    return await _list_users(response, db, base, sort, fields, cursor, limit)
 
 # ---------------- DELETE ADMIN ----------------
 @admin_router.delete("/admins/{admin_id}")
@@ -77,6 +143,9 @@ async def delete_admin(
     
     await db.delete(admin)
     await db.commit()
+    await revocation.revoke_user(db, admin_id, reason="deleted")
+    auth.invalidate_user(admin_id)
+    await http_cache.bump("users")
     return {"msg": "Admin deleted successfully"}
 
 
@@ -96,6 +165,9 @@ async def delete_employee(
     
     await db.delete(employee)
     await db.commit()
+    await revocation.revoke_user(db, emp_id, reason="deleted")
+    auth.invalidate_user(emp_id)
+    await http_cache.bump("users")
     return {"msg": "Employee deleted successfully"}
 
 # ---------------- SUSPEND / UNSUSPEND EMPLOYEE ----------------
@@ -112,13 +184,140 @@ async def suspend_employee(
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    # Add a new column to User model called 'is_active' (Boolean, default=True)
     employee.is_active = not suspend
     db.add(employee)
     await db.commit()
     await db.refresh(employee)
+    if suspend:
+        # cut off tokens already issued; login refuses suspended accounts
+        await revocation.revoke_user(db, emp_id, reason="suspended")
+    auth.invalidate_user(emp_id)
+    await http_cache.bump("users")
     return {"msg": f"Employee {'suspended' if suspend else 'activated'} successfully"}
 
+# ---------------- BULK SHOUT-OUTS ----------------
+@admin_router.post("/shoutouts/bulk", response_model=List[schemas.ShoutOutOut])
+async def bulk_create_shoutouts(
+    file: UploadFile = File(...),
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Post many shout-outs from a .csv or .json upload (fields: message,
+    tagged_user_ids, optional author_id). All-or-nothing: one bad row
+    rejects the file. Regular admins may only post for their department.
+    """
+    raw = await file.read(settings.MAX_UPLOAD_BYTES + 1)
+    if len(raw) > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Upload too large")
+    try:
+        posts = shoutouts.parse_bulk(raw, file.filename, default_author_id=current_admin.id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    department = None if current_admin.role == "superadmin" else current_admin.department
+    items, departments = await shoutouts.create_many(db, posts, author_department=department)
+    await db.commit()
+
+    await shoutouts.announce(items, departments)
+    return [feed.to_schema(item) for item in items]
+
+# ---------------- ANALYTICS ----------------
+def _analytics_scope(admin: User, start: Optional[date], end: Optional[date], department: Optional[str], max_days: Optional[int]):
+    """Default to the last 30 days; regular admins only see their own department."""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if max_days is not None and (end - start).days + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {max_days} days")
+    if admin.role != "superadmin":
+        if department not in (None, admin.department):
+            raise HTTPException(status_code=403, detail="Forbidden: other departments' analytics")
+        department = admin.department
+    return start, end, department
+
+
+@admin_router.get("/analytics/daily", response_model=schemas.AnalyticsSeries)
+@http_cache.cached("analytics", vary_user=True)
+async def analytics_daily(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    department: Optional[str] = None,
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Per-day posts, tags, comments, reactions (by emoji) and active users from the rollups."""
+    start, end, department = _analytics_scope(current_admin, start, end, department, settings.ANALYTICS_MAX_RANGE_DAYS)
+    return await analytics.daily_series(db, start, end, department)
+
+
+@admin_router.get("/analytics/summary", response_model=schemas.AnalyticsSummary)
+@http_cache.cached("analytics", vary_user=True)
+async def analytics_summary(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    department: Optional[str] = None,
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Totals over the range, counting each active user once."""
+    start, end, department = _analytics_scope(current_admin, start, end, department, None)
+    return await analytics.summary(db, start, end, department)
+
+
+@admin_router.get("/analytics/export")
+async def analytics_export(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    department: Optional[str] = None,
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """Stream the rollups as CSV, one row per day and department."""
+    start, end, department = _analytics_scope(current_admin, start, end, department, None)
+    return StreamingResponse(
+        analytics.export_csv(start, end, department),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="analytics-{start}-{end}.csv"'},
+    )
+
+# ---------------- ARCHIVE ----------------
+@admin_router.post("/archive", response_model=List[schemas.ArchivedMonth])
+async def archive_old_months(
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Superadmin only: move every month older than ARCHIVE_AFTER_MONTHS to
+    the archive files (see archive.py). Runs in the server so it
+    invalidates the live caches. One run at a time per worker.
+    """
+    if current_admin.role != "superadmin":
+        raise HTTPException(status_code=403, detail="Forbidden: Only superadmin can archive")
+    if archive.running.locked():
+        raise HTTPException(status_code=409, detail="An archive run is already in progress")
+    async with archive.running:
+        months = await archive.archive(db)
+    return [
+        schemas.ArchivedMonth(
+            month=r.month.isoformat(), shoutouts=r.shoutouts, comments=r.comments, reactions=r.reactions, path=r.path
+        )
+        for r in months
+    ]
+
+# ---------------- RUNTIME STATS ----------------
+@admin_router.get("/stats")
+async def runtime_stats(current_admin: User = Depends(get_current_admin_user)):
+    """In-process cache and password-hashing counters for monitoring"""
+    return {
+        "caches": cache.stats(),
+        "password_hasher": auth.password_hasher.stats(),
+        "realtime": realtime.hub.stats(),
+        "http_cache": http_cache.stats(),
+        "rate_limit": ratelimit.stats(),
+        "token_denylist": revocation.denylist.stats(),
+    }
+
 # ---------------- ADMIN-ONLY ROUTE ----------------
 @router.post("/admin-only-route")
 async def admin_action(
@@ -128,7 +327,7 @@ async def admin_action(
     return {"msg": f"Hello, admin {current_admin.username}"}
 
 # ---------------- REGISTER ----------------
-@router.post("/register", response_model=schemas.UserOut)
+@router.post("/register", response_model=schemas.UserOut, dependencies=[Depends(ratelimit.limit("register"))])
 async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if email/username exists
     if await crud.get_user_by_email(db, user.email):
@@ -150,7 +349,7 @@ async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get
         await db.commit()
 
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await auth.password_hasher.hash(user.password)
     new_user = await crud.create_user(
         db,
         username=user.username,
@@ -160,10 +359,11 @@ async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get
         name=user.name,
         department=user.department
     )
+    await http_cache.bump("users")
     return new_user
 
 # ---------------- LOGIN ----------------
-@router.post("/login", response_model=schemas.Token)
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(ratelimit.limit("login"))])
 async def login_user(
     response: Response,
     user_credentials: schemas.UserLogin,
@@ -172,12 +372,20 @@ async def login_user(
     user = await auth.authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account suspended")
 
+    return _issue_tokens(response, user.id, auth.new_token_family())
+
+
+def _issue_tokens(response: Response, user_id: int, family: str) -> dict:
+    """New access + refresh token pair in `family`; the refresh token also goes in the cookie."""
+    claims = {"sub": str(user_id), "fam": family}
     access_token_expires = timedelta(minutes=auth.settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(data={"sub": str(user.id)}, expires_delta=access_token_expires)
+    access_token = auth.create_access_token(data=claims, expires_delta=access_token_expires)
 
     refresh_token_expires = timedelta(days=auth.settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    refresh_token = auth.create_refresh_token(data={"sub": str(user.id)}, expires_delta=refresh_token_expires)
+    refresh_token = auth.create_refresh_token(data=claims, expires_delta=refresh_token_expires)
 
     response.set_cookie(
         key="refresh_token",
@@ -192,49 +400,60 @@ async def login_user(
 
 # ---------------- REFRESH ----------------
 @router.post("/refresh", response_model=schemas.Token)
-async def refresh_token(request: Request, db: AsyncSession = Depends(get_db)):
+async def refresh_token(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    Rotate the refresh token: each one works once, and the response carries
+    a new pair. Presenting a used refresh token again revokes its whole
+    family (every token from that login), since one of the two holders
+    must have stolen it.
+    """
     refresh_token = request.cookies.get("refresh_token")
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Missing refresh token")
+    payload = auth.decode_token(refresh_token)
+    if payload is None or payload.get("type") != "refresh" or not payload.get("jti") or not payload.get("fam"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
     try:
-        payload = jwt.decode(refresh_token, auth.settings.SECRET_KEY, algorithms=[auth.settings.ALGORITHM])
         user_id = int(payload.get("sub"))
-    except JWTError:
+    except (TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
+    if revocation.is_revoked(payload):  # logged out, or the user was suspended or deleted
+        raise HTTPException(status_code=401, detail="Refresh token revoked; please log in again")
+    if not await revocation.claim_refresh(db, payload):
+        await revocation.revoke_family(db, payload["fam"], reason="reuse")
+        raise HTTPException(status_code=401, detail="Refresh token already used; please log in again")
+
     q = select(User).where(User.id == user_id)
     res = await db.execute(q)
     user = res.scalars().first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Account suspended")
 
-    access_token_expires = timedelta(minutes=auth.settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(data={"sub": str(user.id)}, expires_delta=access_token_expires)
-
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    return _issue_tokens(response, user.id, payload["fam"])
 
 # ---------------- LOGOUT ----------------
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """Revoke this login's tokens (refresh cookie and/or bearer token) and clear the cookie."""
+    presented = [request.cookies.get("refresh_token"), auth.bearer_token(request.headers.get("authorization"))]
+    for token in filter(None, presented):
+        payload = auth.decode_token(token)
+        if payload is None:
+            continue
+        if payload.get("fam"):
+            await revocation.revoke_family(db, payload["fam"], reason="logout")
+        else:
+            await revocation.revoke_token(db, payload, reason="logout")
     response.delete_cookie("refresh_token")
     return {"msg": "logged out"}
 
 # ---------------- CURRENT USER ----------------
 @router.get("/me", response_model=schemas.UserOut)
-async def me(token: str = Depends(auth.oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, auth.settings.SECRET_KEY, algorithms=[auth.settings.ALGORITHM])
-        user_id = int(payload.get("sub"))
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    q = select(User).where(User.id == user_id)
-    res = await db.execute(q)
-    user = res.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return user
+async def me(current_user: User = Depends(get_current_user)):
+    return current_user
 
 # ---------------- SECURITY KEY MANAGEMENT ----------------
 def generate_security_key(length=16) -> str:
@@ -272,6 +491,7 @@ async def delete_security_key(key_id: int, db: AsyncSession = Depends(get_db)):
 
 # ✅ Fetch department-wise employees (used for dropdown)
 @router.get("/department-employees")
+@http_cache.cached("users", vary_user=True)
 async def get_department_employees(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -301,141 +521,286 @@ async def update_profile(
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    auth.invalidate_user(user.id)
+    await http_cache.bump("users")
 
     return user
 
 
 # ---------------- SHOUT-OUTS ----------------
-uploads_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
-os.makedirs(uploads_dir, exist_ok=True)
 
 
-@router.post("/shoutouts", response_model=schemas.ShoutOutOut)
+@router.post("/shoutouts", response_model=schemas.ShoutOutOut, dependencies=[Depends(ratelimit.limit("shoutout"))])
 async def create_shoutout(
+    background_tasks: BackgroundTasks,
     message: str = Form(...),
     tagged_user_ids: Optional[str] = Form(None),  # comma-separated ids
     image: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    image_url = None
-    if image is not None:
-        ext = os.path.splitext(image.filename)[1]
-        filename = f"{uuid4().hex}{ext}"
-        filepath = os.path.join(uploads_dir, filename)
-        content = await image.read()
-        with open(filepath, "wb") as f:
-            f.write(content)
-        image_url = f"/uploads/{filename}"
-
-    new_shout = ShoutOut(author_id=current_user.id, message=message, image_url=image_url)
-    db.add(new_shout)
-    await db.flush()  # get id
-
-    # tags
-    user_ids: List[int] = []
-    if tagged_user_ids:
-        try:
-            user_ids = [int(x) for x in tagged_user_ids.split(",") if x.strip()]
-        except ValueError:
-            user_ids = []
-    for uid in user_ids:
-        db.add(ShoutOutTag(shoutout_id=new_shout.id, user_id=uid))
+    try:
+        user_ids = shoutouts.parse_ids(tagged_user_ids)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="tagged_user_ids must be comma-separated user ids")
 
-    await db.commit()
-    await db.refresh(new_shout)
-
-    return schemas.ShoutOutOut(
-        id=new_shout.id,
-        author_id=new_shout.author_id,
-        message=new_shout.message,
-        image_url=new_shout.image_url,
-        created_at=new_shout.created_at.isoformat() if new_shout.created_at else None,
-        tagged_users=user_ids,
-        reactions={},
+    # checked before the image is stored: a stored image is shared by content
+    # hash, so it can't be deleted if the post then fails
+    users = await shoutouts.require_users(db, [current_user.id, *user_ids])
+
+    image_url = None
+    thumbnail_url = None
+    if image is not None and image.filename:
+        stored = await uploads.save_image(image, settings.MAX_UPLOAD_BYTES)
+        image_url = stored.url
+        thumbnail_url = uploads.existing_thumbnail_url(stored)
+        if thumbnail_url is None and uploads.THUMBNAILS_ENABLED:
+            background_tasks.add_task(uploads.generate_thumbnail, stored, settings.THUMBNAIL_MAX_PX)
+
+    # tags, feed row and counters in a fixed number of statements; see shoutouts.py
+    post = shoutouts.NewShoutOut(
+        author_id=current_user.id,
+        message=message,
+        tagged_user_ids=user_ids,
+        image_url=image_url,
+        thumbnail_url=thumbnail_url,
     )
+    items, departments = await shoutouts.create_many(db, [post], users=users)
+    await db.commit()
+
+    await shoutouts.announce(items, departments)
+    return feed.to_schema(items[0])
 
 
 @router.get("/shoutouts/feed", response_model=List[schemas.ShoutOutOut])
+@http_cache.cached("feed")
 async def get_feed(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(feed.FEED_DEFAULT_LIMIT, ge=1, le=feed.FEED_MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    res = await db.execute(
-        select(ShoutOut).order_by(ShoutOut.created_at.desc()).limit(100)
-    )
-    shoutouts = res.scalars().all()
-
-    # gather tags
-    shoutout_ids = [s.id for s in shoutouts]
-    tags_map = {sid: [] for sid in shoutout_ids}
-    tag_names_map = {sid: [] for sid in shoutout_ids}
-    if shoutout_ids:
-        res_tags = await db.execute(select(ShoutOutTag, User.name).join(User, User.id == ShoutOutTag.user_id).where(ShoutOutTag.shoutout_id.in_(shoutout_ids)))
-        for t, name in res_tags.all():
-            tags_map[t.shoutout_id].append(t.user_id)
-            tag_names_map[t.shoutout_id].append(name or str(t.user_id))
-
-    # gather reactions counts as {emoji: count}
-    reactions_map = {sid: {} for sid in shoutout_ids}
-    if shoutout_ids:
-        res_rx = await db.execute(
-            select(ShoutOutReaction.shoutout_id, ShoutOutReaction.emoji, func.count(ShoutOutReaction.id))
-            .where(ShoutOutReaction.shoutout_id.in_(shoutout_ids))
-            .group_by(ShoutOutReaction.shoutout_id, ShoutOutReaction.emoji)
-        )
-        for sid, emoji, cnt in res_rx.all():
-            reactions_map[sid][emoji] = int(cnt)
-
-    # comments count per shoutout
-    comments_count = {sid: 0 for sid in shoutout_ids}
-    if shoutout_ids:
-        res_cc = await db.execute(
-            select(ShoutOutComment.shoutout_id, func.count(ShoutOutComment.id))
-            .where(ShoutOutComment.shoutout_id.in_(shoutout_ids))
-            .group_by(ShoutOutComment.shoutout_id)
+    """
+    Newest-first feed served from the `shoutout_feed` read model.
+    Pass the `X-Next-Cursor` response header back as `cursor` to get the next page.
+    """
+    try:
+        items, next_cursor = await feed.fetch_page(db, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fastjson.respond([feed.to_row(item) for item in items], response)
+
+
+@router.get("/shoutouts/feed/department", response_model=List[schemas.ShoutOutOut])
+@http_cache.cached("feed", vary_user=True)
+async def get_department_feed(
+    response: Response,
+    department: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(feed.FEED_DEFAULT_LIMIT, ge=1, le=feed.FEED_MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Newest-first shout-outs whose author or a tagged user is in `department`
+    (default: the caller's). Paginated like /shoutouts/feed.
+    """
+    try:
+        items, next_cursor = await feed.fetch_department_page(
+            db, department or current_user.department, cursor, limit
         )
-        for sid, cnt in res_cc.all():
-            comments_count[sid] = int(cnt)
-
-    out: List[schemas.ShoutOutOut] = []
-    for s in shoutouts:
-        out.append(
-            schemas.ShoutOutOut(
-                id=s.id,
-                author_id=s.author_id,
-                message=s.message,
-                image_url=s.image_url,
-                created_at=s.created_at.isoformat() if s.created_at else None,
-                tagged_users=tags_map.get(s.id, []),
-                tagged_user_names=tag_names_map.get(s.id, []),
-                reactions=reactions_map.get(s.id, {}),
-                comments_count=comments_count.get(s.id, 0),
-            )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fastjson.respond(items, response)
+
+
+# ---------------- LEADERBOARDS ----------------
+LEADERBOARD_PERIOD = Query("week", pattern="^(week|month|quarter)$")
+LEADERBOARD_LIMIT = Query(settings.LEADERBOARD_SIZE, ge=1, le=settings.LEADERBOARD_SIZE)
+
+
+@router.get("/leaderboard", response_model=schemas.LeaderboardOut)
+async def get_leaderboard(
+    period: str = LEADERBOARD_PERIOD,
+    limit: int = LEADERBOARD_LIMIT,
+    current_user: User = Depends(get_current_user),
+):
+    """Most recognized (tagged) users company-wide this week, month or quarter."""
+    return leaderboard.top(period, None, limit)
+
+
+@router.get("/leaderboard/department", response_model=schemas.LeaderboardOut)
+async def get_department_leaderboard(
+    period: str = LEADERBOARD_PERIOD,
+    department: Optional[str] = None,
+    limit: int = LEADERBOARD_LIMIT,
+    current_user: User = Depends(get_current_user),
+):
+    """Most recognized users of `department` (default: the caller's). Served from memory; see leaderboard.py."""
+    return leaderboard.top(period, department or current_user.department, limit)
+
+
+@router.get("/shoutouts/search", response_model=List[schemas.SearchHit])
+async def search_shoutouts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[str] = Query(None, pattern="^(shoutout|comment)$"),
+    author_id: Optional[int] = None,
+    tagged_user_id: Optional[int] = None,
+    department: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(search.SEARCH_DEFAULT_LIMIT, ge=1, le=search.SEARCH_MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Full-text search over shout-out messages and comments, best match first.
+    `kind` limits results to one source. Pass the `X-Next-Cursor` response
+    header back as `cursor` to get the next page.
+    """
+    filters = search.SearchFilters(
+        author_id=author_id, tagged_user_id=tagged_user_id, department=department, since=since, until=until
+    )
+    try:
+        hits, next_cursor = await search.search(
+            db, q, filters, kinds=(kind,) if kind else search.KINDS, cursor=cursor, limit=limit
         )
-    return out
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return hits
+
+
+# ---------------- LIVE FEED STREAM ----------------
+STREAM_SCOPE = Query("all", pattern="^(all|department)$")
+
 
+async def _subscribe(token: str, scope: str) -> realtime.Subscription:
+    """Authenticate a stream client, then register it with the hub.
+    The session is closed before streaming so a connection doesn't hold one."""
+    async with AsyncSessionLocal() as db:
+        user = await auth.get_user_from_token(token, db)
+    sub = realtime.hub.subscribe(user.department if scope == "department" else None)
+    sub.payload = auth.decode_token(token)
+    return sub
 
-@router.post("/shoutouts/{shoutout_id}/react")
+
+@router.websocket("/shoutouts/stream")
+async def shoutout_stream_ws(websocket: WebSocket, token: str = Query(...), scope: str = STREAM_SCOPE):
+    """
+    Push feed deltas (`shoutout.created`, `reaction.added`, `reaction.removed`,
+    `comment.added`) as JSON messages. Browsers can't set headers on a WebSocket, so the
+    access token goes in `?token=`. `scope=department` limits events to the
+    user's department. A `resync` event means events were dropped: refetch the feed.
+    """
+    try:
+        sub = await _subscribe(token, scope)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    try:
+        await websocket.accept()
+        while True:
+            event = await sub.get(timeout=settings.REALTIME_KEEPALIVE_SECONDS)
+            if not auth.token_still_valid(sub.payload):  # expired, or revoked (logout, suspension, deletion)
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                break
+            await websocket.send_json(event if event is not None else {"type": "ping"})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        realtime.hub.unsubscribe(sub)
+
+
+@router.get("/shoutouts/stream")
+async def shoutout_stream_sse(request: Request, token: str = Query(...), scope: str = STREAM_SCOPE):
+    """Same events as the WebSocket, as Server-Sent Events (for EventSource clients)."""
+    sub = await _subscribe(token, scope)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                event = await sub.get(timeout=settings.REALTIME_KEEPALIVE_SECONDS)
+                if not auth.token_still_valid(sub.payload):  # expired or revoked: end the stream
+                    break
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            realtime.hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/shoutouts/{shoutout_id}/react", dependencies=[Depends(ratelimit.limit("reaction"))])
 async def react_shoutout(
     shoutout_id: int,
     body: schemas.ReactionIn,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    # upsert-like: allow multiple by same user/emoji? Simplest: add multiple, frontend can prevent dupes
-    db.add(
-        ShoutOutReaction(
-            shoutout_id=shoutout_id,
-            user_id=current_user.id,
-            emoji=body.emoji,
-        )
-    )
+    """Idempotent: reacting twice with the same emoji changes nothing."""
+    item = await feed.get_for_update(db, shoutout_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Shout-out not found")
+
+    count = await reactions.add(db, shoutout_id, current_user.id, body.emoji)
+    if count is None:
+        return {"msg": "already reacted", "count": (item.reactions or {}).get(body.emoji, 0)}
+
+    feed.set_reaction_count(item, body.emoji, count)
+    await stats.increment(db, "reactions_received", [item.author_id])
+    feed_departments = await feed.departments_of(db, shoutout_id)
     await db.commit()
-    return {"msg": "reacted"}
+    feed.invalidate_departments(feed_departments)
+    await http_cache.bump("feed", f"metrics:{item.author_id}")
+    await realtime.publish(feed_departments, "reaction.added", shoutout_id=shoutout_id, emoji=body.emoji, count=count)
+    return {"msg": "reacted", "count": count}
 
 
-@router.post("/shoutouts/{shoutout_id}/comments", response_model=schemas.CommentOut)
+@router.delete("/shoutouts/{shoutout_id}/react", dependencies=[Depends(ratelimit.limit("reaction"))])
+async def unreact_shoutout(
+    shoutout_id: int,
+    emoji: str = Query(..., max_length=10),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Withdraw the current user's `emoji` reaction; a no-op if there is none."""
+    item = await feed.get_for_update(db, shoutout_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Shout-out not found")
+
+    count = await reactions.remove(db, shoutout_id, current_user.id, emoji)
+    if count is None:
+        return {"msg": "not reacted", "count": (item.reactions or {}).get(emoji, 0)}
+
+    feed.set_reaction_count(item, emoji, count)
+    await stats.increment(db, "reactions_received", [item.author_id], by=-1)
+    feed_departments = await feed.departments_of(db, shoutout_id)
+    await db.commit()
+    feed.invalidate_departments(feed_departments)
+    await http_cache.bump("feed", f"metrics:{item.author_id}")
+    await realtime.publish(feed_departments, "reaction.removed", shoutout_id=shoutout_id, emoji=emoji, count=count)
+    return {"msg": "unreacted", "count": count}
+
+
+@router.post("/shoutouts/{shoutout_id}/comments", response_model=schemas.CommentOut, dependencies=[Depends(ratelimit.limit("comment"))])
 async def add_comment(
     shoutout_id: int,
     body: schemas.CommentCreate,
@@ -444,98 +809,90 @@ async def add_comment(
 ):
     c = ShoutOutComment(shoutout_id=shoutout_id, user_id=current_user.id, content=body.content)
     db.add(c)
+    counted = await feed.add_comment(db, shoutout_id)
+    if counted is None:  # no foreign key catches this on partitioned Postgres
+        raise HTTPException(status_code=404, detail="Shout-out not found")
+    await stats.increment(db, "comments_made", [current_user.id])
+    feed_departments = await feed.departments_of(db, shoutout_id)
     await db.commit()
     await db.refresh(c)
-    return schemas.CommentOut(
-        id=c.id,
-        shoutout_id=c.shoutout_id,
-        user_id=c.user_id,
-        content=c.content,
-        created_at=c.created_at.isoformat() if c.created_at else None,
+    comments.invalidate(shoutout_id)
+    feed.invalidate_departments(feed_departments)
+    await http_cache.bump("feed", f"comments:{shoutout_id}", f"metrics:{current_user.id}")
+    out = comments.to_schema(c, current_user.name)
+    await realtime.publish(
+        feed_departments, "comment.added",
+        shoutout_id=shoutout_id, comments_count=counted[1], comment=out.model_dump(),
     )
+    return out
 
 
 @router.get("/shoutouts/{shoutout_id}/comments", response_model=List[schemas.CommentOut])
+@http_cache.cached("comments:{shoutout_id}")
 async def list_comments(
     shoutout_id: int,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(comments.COMMENTS_DEFAULT_LIMIT, ge=1, le=comments.COMMENTS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    res = await db.execute(
-        select(ShoutOutComment)
-        .where(ShoutOutComment.shoutout_id == shoutout_id)
-        .order_by(ShoutOutComment.created_at.asc())
-    )
-    out: List[schemas.CommentOut] = []
-    for c in res.scalars().all():
-        out.append(
-            schemas.CommentOut(
-                id=c.id,
-                shoutout_id=c.shoutout_id,
-                user_id=c.user_id,
-                content=c.content,
-                created_at=c.created_at.isoformat() if c.created_at else None,
-            )
-        )
-    return out
+    """
+    Comments oldest first, with author names. Pass the `X-Next-Cursor`
+    response header back as `after_id` to get the next page.
+    """
+    page, next_after_id = await comments.fetch_page(db, shoutout_id, after_id, limit)
+    if not page:
+        archived = await archive.fetch_comments(db, shoutout_id, after_id, limit)
+        if archived is not None:
+            page, next_after_id = archived
+    if next_after_id is not None:
+        response.headers["X-Next-Cursor"] = str(next_after_id)
+    return fastjson.respond(page, response)
+
+
+@router.get("/shoutouts/{shoutout_id:int}", response_model=schemas.ShoutOutDetail)
+@http_cache.cached("feed", "comments:{shoutout_id}")  # the id key keeps one entry per shout-out
+async def get_shoutout(
+    shoutout_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """One shout-out, from the archive (`archived: true`) if it has been moved out of the database."""
+    item = await db.get(ShoutOutFeedItem, shoutout_id)
+    if item is not None:
+        return fastjson.respond({**feed.to_row(item), "archived": False}, response)
+    record = await archive.find(db, shoutout_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Shout-out not found")
+    return fastjson.respond(archive.to_row(record), response)
 
 
 @router.get("/metrics/me")
+@http_cache.cached("metrics:{user_id}", vary_user=True)
 async def my_metrics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    # counts
-    given = await db.execute(select(func.count(ShoutOut.id)).where(ShoutOut.author_id == current_user.id))
-    received = await db.execute(
-        select(func.count(ShoutOutTag.id)).where(ShoutOutTag.user_id == current_user.id)
-    )
-    comments = await db.execute(
-        select(func.count(ShoutOutComment.id)).where(ShoutOutComment.user_id == current_user.id)
-    )
-
-    # recent activity (last 10)
-    recent: List[dict] = []
-    res_recent_given = await db.execute(
-        select(ShoutOut).where(ShoutOut.author_id == current_user.id).order_by(ShoutOut.created_at.desc()).limit(5)
-    )
-    for s in res_recent_given.scalars().all():
-        recent.append({
-            "type": "given",
-            "message": s.message,
-            "created_at": s.created_at.isoformat() if s.created_at else None,
-        })
-
-    res_recent_received = await db.execute(
-        select(ShoutOut, ShoutOutTag).join(ShoutOutTag, ShoutOutTag.shoutout_id == ShoutOut.id)
-        .where(ShoutOutTag.user_id == current_user.id)
-        .order_by(ShoutOut.created_at.desc()).limit(5)
-    )
-    for s, _ in res_recent_received.all():
-        recent.append({
-            "type": "received",
-            "message": s.message,
-            "created_at": s.created_at.isoformat() if s.created_at else None,
-        })
-
-    res_recent_comments = await db.execute(
-        select(ShoutOutComment).where(ShoutOutComment.user_id == current_user.id)
-        .order_by(ShoutOutComment.created_at.desc()).limit(5)
-    )
-    for c in res_recent_comments.scalars().all():
-        recent.append({
-            "type": "comment",
-            "message": c.content,
-            "created_at": c.created_at.isoformat() if c.created_at else None,
-        })
-
-    # sort and cap
-    recent.sort(key=lambda r: r.get("created_at") or "", reverse=True)
-    recent = recent[:10]
+    # counters are maintained on write; see stats.py
+    counters = await db.get(UserStats, current_user.id)
+
+    # recent activity (last 10), one UNION ALL query
+    res_recent = await db.execute(stats.recent_activity_query(current_user.id))
+    recent: List[dict] = [
+        {
+            "type": kind,
+            "message": message,
+            "created_at": created_at.isoformat() if created_at else None,
+        }
+        for kind, message, created_at in res_recent.all()
+    ]
 
     return {
-        "shoutouts_given": int(given.scalar() or 0),
-        "shoutouts_received": int(received.scalar() or 0),
-        "comments_made": int(comments.scalar() or 0),
+        "shoutouts_given": counters.shoutouts_given if counters else 0,
+        "shoutouts_received": counters.shoutouts_received if counters else 0,
+        "comments_made": counters.comments_made if counters else 0,
+        "reactions_received": counters.reactions_received if counters else 0,
         "recent": recent,
     }
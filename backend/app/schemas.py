@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Optional
 
 # ----- Login Request -----
 class UserLogin(BaseModel):
@@ -35,6 +35,20 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class UserListItem(BaseModel):
+    """A `UserOut` row of an admin listing; only the requested `fields` are set."""
+    id: Optional[int] = None
+    username: Optional[str] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+    department: Optional[str] = None
+    is_active: Optional[bool] = None
+    joining_date: Optional[str] = None
+    current_project: Optional[str] = None
+    group_members: Optional[str] = None
+
+
 
 # ----- Token Schemas -----
 class Token(BaseModel):
@@ -59,6 +73,7 @@ class ShoutOutOut(BaseModel):
     author_id: int
     message: str
     image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
     created_at: Optional[str] = None
     tagged_users: List[int] = []
     tagged_user_names: List[str] = []
@@ -69,6 +84,10 @@ class ShoutOutOut(BaseModel):
         from_attributes = True
 
 
+class ShoutOutDetail(ShoutOutOut):
+    archived: bool = False  # served from the archive (see archive.py)
+
+
 class ShoutOutCommentOut(BaseModel):
     id: int
     content: str
@@ -83,11 +102,67 @@ class MetricsOut(BaseModel):
     shoutouts_given: int
     shoutouts_received: int
     comments_made: int
+    reactions_received: int = 0
     recent: List[dict]
 
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    name: Optional[str] = None
+    department: Optional[str] = None
+    count: int
+
+
+class LeaderboardOut(BaseModel):
+    period: str
+    start: str
+    end: str
+    department: Optional[str] = None  # None = whole company
+    entries: List[LeaderboardEntry]
+
+
+class AnalyticsDay(BaseModel):
+    day: str
+    posts: int = 0
+    tags: int = 0
+    comments: int = 0
+    reactions: int = 0
+    active_users: int = 0
+    reactions_by_emoji: Dict[str, int] = Field(default_factory=dict)
+
+
+class AnalyticsSeries(BaseModel):
+    start: str
+    end: str
+    department: Optional[str] = None  # None = all departments the caller can see
+    rolled_up_at: Optional[str] = None  # last rollup run; activity since then is not included yet
+    days: List[AnalyticsDay]
+
+
+class ArchivedMonth(BaseModel):
+    month: str
+    shoutouts: int
+    comments: int
+    reactions: int
+    path: str
+
+
+class AnalyticsSummary(BaseModel):
+    start: str
+    end: str
+    department: Optional[str] = None
+    rolled_up_at: Optional[str] = None
+    posts: int
+    tags: int
+    comments: int
+    reactions: int
+    active_users: int
+    reactions_by_emoji: Dict[str, int]
+
+
 class ReactionIn(BaseModel):
-    emoji: str
+    emoji: str = Field(min_length=1, max_length=10)  # shoutout_reactions.emoji is String(10)
 
 
 class CommentIn(BaseModel):
@@ -99,10 +174,46 @@ class CommentOut(BaseModel):
     content: str
     created_at: Optional[str] = None
     user_id: int
+    user_name: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+class SearchHit(BaseModel):
+    kind: str  # "shoutout" or "comment"
+    id: int
+    shoutout_id: int
+    author_id: int
+    author_name: Optional[str] = None
+    text: str
+    created_at: Optional[str] = None
+    rank: float
+
+
 class CommentCreate(BaseModel):
-    content: str
\ No newline at end of file
+    content: str
+
+# ----- Bulk employee import -----
+class EmployeeImportRow(BaseModel):
+    username: str = Field(min_length=1, max_length=50)
+    name: str = Field(min_length=1, max_length=255)
+    email: EmailStr
+    password: str = Field(min_length=1)
+    department: Optional[str] = None
+    joining_date: Optional[str] = None
+    current_project: Optional[str] = None
+    skills: Optional[str] = None
+    experience: Optional[str] = None
+
+
+class EmployeeImportError(BaseModel):
+    row: int
+    error: str
+
+
+class EmployeeImportResult(BaseModel):
+    rows: int
+    created: int
+    skipped: int
+    errors: List[EmployeeImportError]  # first IMPORT_MAX_ERRORS only
@@ -0,0 +1,229 @@
+"""
+Full-text search over shout-out messages and comments.
+
+- Postgres: GIN expression indexes on `to_tsvector('english', ...)`; the
+  query uses `websearch_to_tsquery` and ranks with `ts_rank`.
+- SQLite (local/dev): FTS5 external-content tables kept in sync by
+  triggers; ranked with `bm25`.
+
+Either way the index is maintained by the database on every write. Results
+from both sources are merged, best match first, and paginated with a
+keyset cursor on (rank, kind, id). Ranks move slightly as documents are
+added, so a page boundary can shift between requests.
+"""
+import base64
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, exists, func, literal, literal_column, select, table, text, tuple_, union_all
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schemas
+from .models import User, ShoutOut, ShoutOutTag, ShoutOutComment
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+TS_CONFIG = "english"
+KINDS = ("shoutout", "comment")
+
+# (fts table, content table, text column)
+_SQLITE_FTS = (
+    ("shoutouts_fts", "shoutouts", "message"),
+    ("shoutout_comments_fts", "shoutout_comments", "content"),
+)
+FTS_TABLE_PREFIXES = tuple(name for name, _, _ in _SQLITE_FTS)
+
+_PG_INDEXES = (
+    ("ix_shoutouts_message_fts", "shoutouts", "message"),
+    ("ix_shoutout_comments_content_fts", "shoutout_comments", "content"),
+)
+
+
+# ---------------------------
+# Index DDL
+# ---------------------------
+def _sqlite_ddl(fts: str, source: str, col: str) -> List[str]:
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{col}, content='{source}', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); "
+        f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END",
+    ]
+
+
+def create_index(sync_conn) -> None:
+    """
+    Create the search index if it is missing (run after `create_all`; the
+    Alembic migration does the same). New SQLite FTS tables are filled from
+    existing rows.
+    """
+    if sync_conn.dialect.name == "postgresql":
+        for name, source, col in _PG_INDEXES:
+            sync_conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {source} USING gin (to_tsvector('{TS_CONFIG}', {col}))"
+            ))
+        return
+    if sync_conn.dialect.name != "sqlite":
+        return
+    for fts, source, col in _SQLITE_FTS:
+        existed = sync_conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+        ).first()
+        try:
+            for stmt in _sqlite_ddl(fts, source, col):
+                sync_conn.execute(text(stmt))
+        except OperationalError:
+            logger.warning("SQLite was built without FTS5; search is disabled")
+            return
+        if not existed:
+            sync_conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+# ---------------------------
+# Cursors
+# ---------------------------
+def encode_cursor(rank: float, kind: str, hit_id: int) -> str:
+    raw = f"{rank!r}|{kind}|{hit_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str, int]:
+    """Inverse of `encode_cursor`. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, kind, hit_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        if kind not in KINDS:
+            raise ValueError(kind)
+        return float(rank), kind, int(hit_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+# ---------------------------
+# Query
+# ---------------------------
+@dataclass
+class SearchFilters:
+    author_id: Optional[int] = None
+    tagged_user_id: Optional[int] = None
+    department: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+def _fts5_query(q: str) -> str:
+    """Quote every term so user input can't use FTS5 syntax; terms are ANDed."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def _branch(dialect: str, kind: str, q: str, filters: SearchFilters):
+    if kind == "shoutout":
+        model, text_col, author_col, shoutout_id_col = ShoutOut, ShoutOut.message, ShoutOut.author_id, ShoutOut.id
+        fts_name = "shoutouts_fts"
+    else:
+        model, text_col, author_col = ShoutOutComment, ShoutOutComment.content, ShoutOutComment.user_id
+        shoutout_id_col, fts_name = ShoutOutComment.shoutout_id, "shoutout_comments_fts"
+
+    if dialect == "postgresql":
+        config = literal_column(f"'{TS_CONFIG}'")
+        vector = func.to_tsvector(config, text_col)
+        tsquery = func.websearch_to_tsquery(config, q)
+        rank = func.ts_rank(vector, tsquery)
+        match = vector.op("@@")(tsquery)
+    else:
+        fts = table(fts_name, column("rowid"))
+        rank = -func.bm25(literal_column(fts_name))
+        match = literal_column(fts_name).op("MATCH")(_fts5_query(q))
+
+    query = select(
+        literal(kind).label("kind"),
+        model.id.label("id"),
+        shoutout_id_col.label("shoutout_id"),
+        author_col.label("author_id"),
+        User.name.label("author_name"),
+        text_col.label("text"),
+        model.created_at.label("created_at"),
+        rank.label("rank"),
+    )
+    if dialect != "postgresql":
+        query = query.select_from(fts).join(model, model.id == fts.c.rowid)
+    query = query.join(User, User.id == author_col).where(match)
+
+    if filters.author_id is not None:
+        query = query.where(author_col == filters.author_id)
+    if filters.department is not None:
+        query = query.where(User.department == filters.department)
+    if filters.tagged_user_id is not None:
+        query = query.where(exists().where(
+            ShoutOutTag.shoutout_id == shoutout_id_col, ShoutOutTag.user_id == filters.tagged_user_id
+        ))
+    if filters.since is not None:
+        query = query.where(model.created_at >= filters.since)
+    if filters.until is not None:
+        query = query.where(model.created_at < filters.until)
+    return query
+
+
+def search_query(
+    dialect: str,
+    q: str,
+    filters: SearchFilters,
+    kinds=KINDS,
+    after: Optional[Tuple[float, str, int]] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+):
+    hits = union_all(*(_branch(dialect, kind, q, filters) for kind in kinds)).subquery("hits")
+    query = select(hits)
+    if after is not None:
+        query = query.where(tuple_(hits.c.rank, hits.c.kind, hits.c.id) < tuple_(*after))
+    return query.order_by(hits.c.rank.desc(), hits.c.kind.desc(), hits.c.id.desc()).limit(limit)
+
+
+async def search(
+    db: AsyncSession,
+    q: str,
+    filters: SearchFilters,
+    kinds=KINDS,
+    cursor: Optional[str] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+) -> Tuple[List[schemas.SearchHit], Optional[str]]:
+    """
+    One page of hits, best first, plus the cursor for the next page (None
+    on the last page). Raises ValueError for a bad cursor.
+    """
+    if not q.split():
+        return [], None
+    after = decode_cursor(cursor) if cursor else None
+    dialect = db.get_bind().dialect.name
+    res = await db.execute(search_query(dialect, q, filters, kinds, after, limit + 1))
+    rows = res.mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["rank"], last["kind"], last["id"])
+    hits = [
+        schemas.SearchHit(
+            kind=row["kind"],
+            id=row["id"],
+            shoutout_id=row["shoutout_id"],
+            author_id=row["author_id"],
+            author_name=row["author_name"],
+            text=row["text"],
+            created_at=row["created_at"].isoformat() if row["created_at"] else None,
+            rank=row["rank"],
+        )
+        for row in rows
+    ]
+    return hits, next_cursor
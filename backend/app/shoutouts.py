@@ -0,0 +1,219 @@
+"""
+Creating shout-outs, one or many at a time.
+
+`create_many` is the only write path: the single-post endpoint and the
+admin bulk import both go through it. The number of statements does not
+depend on how many posts or tags there are:
+
+1. one `IN` query that checks every author and tagged user exists (the
+   single-post endpoint runs it before storing the image),
+2. one multi-row `INSERT ... RETURNING` for the shout-outs,
+3. one multi-row `INSERT ... RETURNING` for the tags, one `INSERT` each
+   for feed rows and department memberships,
+4. one upsert per counter, plus one for the leaderboard counters.
+"""
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import feed, http_cache, leaderboard, realtime, stats
+from .models import User, ShoutOut, ShoutOutTag, ShoutOutFeedItem, ShoutOutDepartment
+
+BULK_MAX_ROWS = 1000
+
+_ID_SEPARATORS = re.compile(r"[,;\s]+")
+
+
+@dataclass
+class NewShoutOut:
+    author_id: int
+    message: str
+    tagged_user_ids: List[int] = field(default_factory=list)
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+
+
+def parse_ids(raw) -> List[int]:
+    """
+    Tagged ids from a comma/semicolon/space separated string or a list,
+    de-duplicated in order. Raises ValueError on anything that isn't an int.
+    """
+    if raw is None or raw == "":
+        return []
+    if isinstance(raw, str):
+        raw = [part for part in _ID_SEPARATORS.split(raw.strip()) if part]
+    if isinstance(raw, bool) or not isinstance(raw, list):
+        raise ValueError("tagged_user_ids must be a list of user ids")
+    ids = []
+    for value in raw:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"Invalid user id: {value!r}")
+        ids.append(int(value))
+    return list(dict.fromkeys(ids))
+
+
+async def load_users(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+    """Map user id -> (display name, department) for the ids that exist, in one query."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    res = await db.execute(select(User.id, User.name, User.department).where(User.id.in_(user_ids)))
+    return {uid: (name or str(uid), department) for uid, name, department in res.all()}
+
+
+async def require_users(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+    """`load_users`, raising HTTPException 400 that names every id that doesn't exist."""
+    user_ids = set(user_ids)
+    users = await load_users(db, user_ids)
+    unknown = sorted(user_ids - users.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown user ids: {', '.join(map(str, unknown))}")
+    return users
+
+
+async def create_many(
+    db: AsyncSession,
+    posts: List[NewShoutOut],
+    author_department: Optional[str] = None,
+    users: Optional[Dict[int, Tuple[str, Optional[str]]]] = None,
+) -> Tuple[List[ShoutOutFeedItem], Dict[int, Optional[str]]]:
+    """
+    Insert shout-outs with their tags, feed rows, department memberships
+    and counters; the caller commits. With `author_department`, every author
+    must belong to it. `users` is the `require_users` map of every author
+    and tagged user, if the caller already has it. Returns the feed rows
+    (in input order) and, per shout-out id, its departments with the
+    author's first (may be None).
+    Raises HTTPException 400 for unknown user ids, 403 for foreign authors.
+    """
+    if not posts:
+        return [], {}
+    if users is None:
+        users = await require_users(
+            db, {p.author_id for p in posts} | {uid for p in posts for uid in p.tagged_user_ids}
+        )
+    if author_department is not None and any(users[p.author_id][1] != author_department for p in posts):
+        raise HTTPException(status_code=403, detail="Authors must belong to your department")
+
+    now = datetime.utcnow()
+    res = await db.execute(
+        insert(ShoutOut).returning(ShoutOut.id, sort_by_parameter_order=True),
+        [
+            {
+                "author_id": p.author_id,
+                "message": p.message,
+                "image_url": p.image_url,
+                "thumbnail_url": p.thumbnail_url,
+                "created_at": now,
+                "department": users[p.author_id][1],
+            }
+            for p in posts
+        ],
+    )
+    shoutout_ids = res.scalars().all()
+
+    tag_rows = [
+        {"shoutout_id": sid, "user_id": uid}
+        for sid, p in zip(shoutout_ids, posts)
+        for uid in p.tagged_user_ids
+    ]
+    if tag_rows:
+        # RETURNING makes SQLAlchemy batch the rows into multi-row VALUES
+        # statements ("insertmanyvalues") instead of a per-row executemany
+        await db.execute(insert(ShoutOutTag).returning(ShoutOutTag.id), tag_rows)
+
+    departments: Dict[int, List[Optional[str]]] = {}
+    for sid, p in zip(shoutout_ids, posts):
+        author_dept = users[p.author_id][1]
+        tagged_depts = {users[uid][1] for uid in p.tagged_user_ids} - {author_dept, None}
+        departments[sid] = [author_dept, *sorted(tagged_depts)]
+    dept_rows = [
+        {"shoutout_id": sid, "department": dept, "created_at": now}
+        for sid, depts in departments.items()
+        for dept in depts
+        if dept is not None
+    ]
+    if dept_rows:
+        await db.execute(insert(ShoutOutDepartment), dept_rows)
+
+    names = {uid: name for uid, (name, _) in users.items()}
+    items = [feed.add_item(db, sid, now, p, names) for sid, p in zip(shoutout_ids, posts)]
+
+    await stats.increment(db, "shoutouts_given", [p.author_id for p in posts])
+    await stats.increment(db, "shoutouts_received", [uid for p in posts for uid in p.tagged_user_ids])
+    await leaderboard.record(db, [(uid, *users[uid]) for p in posts for uid in p.tagged_user_ids], now)
+    return items, departments
+
+
+async def announce(items: List[ShoutOutFeedItem], departments: Dict[int, List[Optional[str]]]) -> None:
+    """
+    After commit: drop the cached department pages the new shout-outs
+    belong to, bump the feed and metrics response versions, and publish
+    `shoutout.created` to each of those departments.
+    """
+    feed.invalidate_departments(
+        dept for item in items for dept in departments[item.shoutout_id] if dept is not None
+    )
+    users = {item.author_id for item in items} | {uid for item in items for uid in item.tagged_user_ids or []}
+    await http_cache.bump("feed", *(f"metrics:{uid}" for uid in sorted(users)))
+    for item in items:
+        await realtime.publish(
+            departments[item.shoutout_id], "shoutout.created", shoutout=feed.to_schema(item).model_dump()
+        )
+
+
+# ---------------------------
+# Bulk import (CSV / JSON)
+# ---------------------------
+def _post_from_record(record: dict, default_author_id: int, row: int) -> NewShoutOut:
+    message = record.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError(f"Row {row}: message is required")
+    try:
+        tagged = parse_ids(record.get("tagged_user_ids"))
+        author = record.get("author_id")
+        author_id = default_author_id if author in (None, "") else int(author)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Row {row}: {exc}") from exc
+    return NewShoutOut(author_id=author_id, message=message.strip(), tagged_user_ids=tagged)
+
+
+def parse_bulk(raw: bytes, filename: str, default_author_id: int) -> List[NewShoutOut]:
+    """
+    Parse a bulk upload. `.json`: a list of objects; `.csv`: a header row.
+    Fields: `message` (required), `tagged_user_ids`, `author_id` (defaults
+    to the uploader). Raises ValueError naming the first bad row.
+    """
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded")
+
+    if (filename or "").lower().endswith(".json"):
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON: {exc}")
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise ValueError("JSON body must be a list of objects")
+        first_row = 1
+    elif (filename or "").lower().endswith(".csv"):
+        reader = csv.DictReader(io.StringIO(text))
+        if "message" not in (reader.fieldnames or []):
+            raise ValueError("CSV header must include a 'message' column")
+        records = list(reader)
+        first_row = 2  # row 1 is the header
+    else:
+        raise ValueError("Upload a .csv or .json file")
+
+    if len(records) > BULK_MAX_ROWS:
+        raise ValueError(f"At most {BULK_MAX_ROWS} shout-outs per upload")
+    return [_post_from_record(r, default_author_id, first_row + i) for i, r in enumerate(records)]
@@ -0,0 +1,141 @@
+"""
+Per-user activity counters backing /auth/metrics/me.
+
+The write endpoints bump `user_stats` in their own transaction, so the
+metrics endpoint reads one row instead of counting history. Run
+`python -m app.stats` to rebuild the counters from the raw tables.
+"""
+import asyncio
+from collections import Counter
+from typing import Dict, Iterable
+
+from sqlalchemy import select, func, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import insert_for
+from .models import User, ShoutOut, ShoutOutTag, ShoutOutReaction, ShoutOutComment, UserStats
+
+COUNTERS = ("shoutouts_given", "shoutouts_received", "comments_made", "reactions_received")
+RECENT_LIMIT = 10
+RECONCILE_BATCH_SIZE = 1000
+
+
+async def increment(db: AsyncSession, counter: str, user_ids: Iterable[int], by: int = 1) -> None:
+    """
+    Add `by` to `counter` for each occurrence of a user id (a user listed
+    twice gets 2 * by), creating missing rows. One statement for all users.
+    """
+    if counter not in COUNTERS:
+        raise ValueError(f"Unknown counter: {counter}")
+    counts = Counter(user_ids)
+    if not counts:
+        return
+    # stable order keeps concurrent upserts from deadlocking on Postgres
+    rows = [{"user_id": uid, counter: n * by} for uid, n in sorted(counts.items())]
+    stmt = insert_for(db, UserStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={counter: getattr(UserStats, counter) + getattr(stmt.excluded, counter)},
+    )
+    await db.execute(stmt)
+
+
+def recent_activity_query(user_id: int, limit: int = RECENT_LIMIT):
+    """
+    Latest shout-outs given, received and comments made by a user, merged
+    in one UNION ALL. Each branch is an index range scan capped at `limit`.
+    """
+    given = (
+        select(literal("given").label("type"), ShoutOut.message.label("message"), ShoutOut.created_at.label("created_at"))
+        .where(ShoutOut.author_id == user_id)
+        .order_by(ShoutOut.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    received = (
+        select(literal("received").label("type"), ShoutOut.message.label("message"), ShoutOut.created_at.label("created_at"))
+        .join(ShoutOutTag, ShoutOutTag.shoutout_id == ShoutOut.id)
+        .where(ShoutOutTag.user_id == user_id)
+        .order_by(ShoutOut.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    comments = (
+        select(
+            literal("comment").label("type"),
+            ShoutOutComment.content.label("message"),
+            ShoutOutComment.created_at.label("created_at"),
+        )
+        .where(ShoutOutComment.user_id == user_id)
+        .order_by(ShoutOutComment.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    merged = union_all(*(select(sq.c.type, sq.c.message, sq.c.created_at) for sq in (given, received, comments))).subquery()
+    return select(merged.c.type, merged.c.message, merged.c.created_at).order_by(merged.c.created_at.desc()).limit(limit)
+
+
+# ---------------------------
+# Backfill / reconcile
+# ---------------------------
+async def _grouped(db: AsyncSession, query) -> Dict[int, int]:
+    res = await db.execute(query)
+    return {uid: int(cnt) for uid, cnt in res.all()}
+
+
+async def reconcile(db: AsyncSession) -> int:
+    """
+    Recompute every user's counters from the raw tables and overwrite
+    `user_stats`. Returns the number of users written.
+    """
+    given = await _grouped(db, select(ShoutOut.author_id, func.count(ShoutOut.id)).group_by(ShoutOut.author_id))
+    received = await _grouped(db, select(ShoutOutTag.user_id, func.count(ShoutOutTag.id)).group_by(ShoutOutTag.user_id))
+    comments = await _grouped(
+        db, select(ShoutOutComment.user_id, func.count(ShoutOutComment.id)).group_by(ShoutOutComment.user_id)
+    )
+    reactions = await _grouped(
+        db,
+        select(ShoutOut.author_id, func.count(ShoutOutReaction.id))
+        .join(ShoutOutReaction, ShoutOutReaction.shoutout_id == ShoutOut.id)
+        .group_by(ShoutOut.author_id),
+    )
+
+    user_ids = (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+    for start in range(0, len(user_ids), RECONCILE_BATCH_SIZE):
+        rows = [
+            {
+                "user_id": uid,
+                "shoutouts_given": given.get(uid, 0),
+                "shoutouts_received": received.get(uid, 0),
+                "comments_made": comments.get(uid, 0),
+                "reactions_received": reactions.get(uid, 0),
+            }
+            for uid in user_ids[start:start + RECONCILE_BATCH_SIZE]
+        ]
+        stmt = insert_for(db, UserStats).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserStats.user_id],
+            set_={name: getattr(stmt.excluded, name) for name in COUNTERS},
+        )
+        await db.execute(stmt)
+    await db.commit()
+    return len(user_ids)
+
+
+async def backfill_if_empty(db: AsyncSession) -> None:
+    """Build counters on first start after upgrading; no-op afterwards."""
+    has_stats = (await db.execute(select(UserStats.user_id).limit(1))).first()
+    has_users = (await db.execute(select(User.id).limit(1))).first()
+    if has_users and not has_stats:
+        await reconcile(db)
+
+
+if __name__ == "__main__":
+    from .database import AsyncSessionLocal
+
+    async def _main():
+        async with AsyncSessionLocal() as db:
+            count = await reconcile(db)
+        print(f"Reconciled counters for {count} users")
+
+    asyncio.run(_main())
@@ -0,0 +1,176 @@
+"""
+Content-addressed blob storage for uploaded images.
+
+Objects are keyed by the sha256 of their content and sharded into
+two-level directories (`ab/cd/abcd...ef.png`), so an identical image is
+only ever stored once and a key's bytes never change. Backends are
+synchronous (like most object-store SDKs); call them through the
+threadpool from async code.
+
+- `LocalStorage` keeps objects on the local filesystem.
+- `InMemoryObjectStore` is an S3/MinIO-style stand-in holding objects in
+  a dict, for tests and local experiments.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import BinaryIO, Dict, Iterator, Optional
+
+from .config import settings
+
+DEFAULT_UPLOAD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
+READ_CHUNK_SIZE = 64 * 1024
+
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+def content_key(sha256: str, ext: str, prefix: str = "") -> str:
+    """Sharded key for a content hash, e.g. `ab/cd/abcd....png`."""
+    return f"{prefix}{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+    etag: str  # strong validator, without quotes
+
+
+class StorageBackend:
+    """Interface every storage backend implements."""
+
+    def staging_dir(self) -> str:
+        """Directory for partially written uploads before `put_file`."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def put_file(self, key: str, src_path: str) -> bool:
+        """
+        Move a finished local file to `key`. The source file is consumed.
+        Returns False (and discards the source) if the key already exists.
+        """
+        raise NotImplementedError
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        raise NotImplementedError
+
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes `start`..`end` (inclusive) of an object."""
+        with self.open(key) as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._staging = os.path.join(self.root, ".staging")
+        os.makedirs(self._staging, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, *key.split("/")))
+        if not path.startswith(self.root + os.sep) or path.startswith(self._staging + os.sep):
+            raise KeyError(key)
+        return path
+
+    def staging_dir(self) -> str:
+        return self._staging
+
+    def exists(self, key: str) -> bool:
+        try:
+            return os.path.isfile(self.path(key))
+        except KeyError:
+            return False
+
+    def put_file(self, key: str, src_path: str) -> bool:
+        dest = self.path(key)
+        if os.path.exists(dest):
+            os.remove(src_path)
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src_path, dest)
+        return True
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            st = os.stat(self.path(key))
+        except (KeyError, FileNotFoundError, NotADirectoryError):
+            return None
+        name = os.path.splitext(os.path.basename(key))[0]
+        if _SHA256_NAME.match(name) and not key.startswith("thumbs/"):
+            etag = name
+        else:
+            # legacy uuid names and derived files: identity + size + mtime
+            etag = hashlib.sha256(f"{key}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:32]
+        return ObjectInfo(key=key, size=st.st_size, etag=etag)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+
+class InMemoryObjectStore(StorageBackend):
+    """
+    Minimal S3-compatible stand-in: flat keys, whole-object puts, and an
+    ETag computed from the stored bytes.
+    """
+
+    def __init__(self):
+        self._objects: Dict[str, bytes] = {}
+        self._etags: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._staging = tempfile.mkdtemp(prefix="bragboard-objects-")
+
+    def staging_dir(self) -> str:
+        return self._staging
+
+    def exists(self, key: str) -> bool:
+        return key in self._objects
+
+    def put_file(self, key: str, src_path: str) -> bool:
+        with open(src_path, "rb") as f:
+            data = f.read()
+        os.remove(src_path)
+        with self._lock:
+            if key in self._objects:
+                return False
+            self._objects[key] = data
+            self._etags[key] = hashlib.sha256(data).hexdigest()
+        return True
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        data = self._objects.get(key)
+        if data is None:
+            return None
+        return ObjectInfo(key=key, size=len(data), etag=self._etags[key])
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return BytesIO(self._objects[key])
+        except KeyError:
+            raise FileNotFoundError(key)
+
+
+def build_storage(kind: str, root: Optional[str] = None) -> StorageBackend:
+    if kind == "local":
+        return LocalStorage(root or DEFAULT_UPLOAD_DIR)
+    if kind == "memory":
+        return InMemoryObjectStore()
+    raise ValueError(f"Unknown UPLOAD_STORAGE backend: {kind}")
+
+
+storage: StorageBackend = build_storage(settings.UPLOAD_STORAGE, settings.UPLOAD_DIR or None)
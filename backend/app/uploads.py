@@ -0,0 +1,298 @@
+"""
+Streaming image uploads for shout-outs, and the /uploads endpoint that
+serves them.
+
+Uploads are copied to a staging file chunk by chunk off the event loop.
+Size and type limits are checked while the data is read. The finished
+file is stored in the content-addressed `storage` backend under its
+sha256, so an image uploaded twice is stored once. Thumbnails are made
+later by a background task. Pillow is optional; without it no thumbnails
+are made.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+from . import http_cache
+from .database import AsyncSessionLocal
+from .models import ShoutOut, ShoutOutFeedItem
+from .storage import StorageBackend, content_key, storage
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # room for the other form fields and boundaries
+THUMBNAILS_ENABLED = Image is not None
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# magic bytes -> file extension
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the file extension for a supported image, or None."""
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+@dataclass
+class StoredImage:
+    key: str
+    sha256: str
+    ext: str
+    size: int
+    created: bool  # False when an identical image was already stored
+
+    @property
+    def url(self) -> str:
+        return f"/uploads/{self.key}"
+
+    @property
+    def thumbnail_key(self) -> str:
+        return content_key(self.sha256, self.ext, prefix="thumbs/")
+
+    @property
+    def thumbnail_url(self) -> str:
+        return f"/uploads/{self.thumbnail_key}"
+
+
+async def save_image(upload: UploadFile, max_bytes: int, store: StorageBackend = storage) -> StoredImage:
+    """
+    Stream `upload` into `store`, aborting with 413/415 as soon as a limit
+    is broken. The staging file is removed on any failure.
+    """
+    if upload.content_type and not upload.content_type.startswith("image/"):
+        raise HTTPException(status_code=415, detail="Only image uploads are allowed")
+
+    tmp = await run_in_threadpool(
+        tempfile.NamedTemporaryFile, dir=store.staging_dir(), prefix=".upload-", delete=False
+    )
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if ext is None:
+                ext = sniff_image_type(chunk)
+                if ext is None:
+                    raise HTTPException(status_code=415, detail="Unsupported image type")
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes // (1024 * 1024)} MB limit")
+            digest.update(chunk)
+            await run_in_threadpool(tmp.write, chunk)
+        await run_in_threadpool(tmp.close)
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty image upload")
+
+        sha = digest.hexdigest()
+        key = content_key(sha, ext)
+        created = await run_in_threadpool(store.put_file, key, tmp.name)
+    except BaseException:
+        tmp.close()
+        if os.path.exists(tmp.name):
+            os.remove(tmp.name)
+        raise
+
+    return StoredImage(key=key, sha256=sha, ext=ext, size=size, created=created)
+
+
+# ---------------------------
+# Thumbnails
+# ---------------------------
+_PIL_FORMATS = {".jpg": "JPEG", ".png": "PNG", ".gif": "GIF", ".webp": "WEBP"}
+
+
+def _make_thumbnail(store: StorageBackend, key: str, thumbnail_key: str, max_px: int) -> None:
+    ext = os.path.splitext(thumbnail_key)[1]
+    with store.open(key) as src, Image.open(src) as img:
+        img.thumbnail((max_px, max_px))
+        if ext == ".jpg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        with tempfile.NamedTemporaryFile(dir=store.staging_dir(), prefix=".thumb-", delete=False) as tmp:
+            img.save(tmp, format=_PIL_FORMATS[ext])
+    store.put_file(thumbnail_key, tmp.name)
+
+
+def existing_thumbnail_url(stored: StoredImage, store: StorageBackend = storage) -> Optional[str]:
+    return stored.thumbnail_url if store.exists(stored.thumbnail_key) else None
+
+
+async def generate_thumbnail(stored: StoredImage, max_px: int, store: StorageBackend = storage) -> None:
+    """
+    Background task: resize the image, then point every shout-out that
+    uses it at the thumbnail.
+    """
+    if not THUMBNAILS_ENABLED:
+        return
+    try:
+        await run_in_threadpool(_make_thumbnail, store, stored.key, stored.thumbnail_key, max_px)
+    except Exception:
+        logger.exception("Thumbnail generation failed for %s", stored.key)
+        return
+
+    async with AsyncSessionLocal() as db:
+        for model in (ShoutOut, ShoutOutFeedItem):
+            await db.execute(
+                update(model)
+                .where(model.image_url == stored.url, model.thumbnail_url.is_(None))
+                .values(thumbnail_url=stored.thumbnail_url)
+            )
+        await db.commit()
+    await http_cache.bump("feed")
+
+
+# ---------------------------
+# Serving
+# ---------------------------
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range. Returns (start, end) inclusive, or None
+    when the header should be ignored (multi-range, other units).
+    Raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        if not last.isdigit() or int(last) == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    if not first.isdigit() or (last and not last.isdigit()):
+        raise ValueError(header)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+async def serve_upload(key: str, request: Request):
+    """
+    Serve a stored image. Keys never change content, so responses are
+    cacheable forever and carry a strong ETag; conditional and single
+    range requests are honoured.
+    """
+    info = await run_in_threadpool(storage.stat, key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    etag = f'"{info.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    status_code = 200
+    start, end = 0, info.size - 1
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag) and info.size > 0:
+        try:
+            parsed = _parse_range(range_header, info.size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{info.size}"
+            return Response(status_code=416, headers=headers)
+        if parsed is not None:
+            start, end = parsed
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+
+    headers["Content-Length"] = str(end - start + 1 if info.size else 0)
+    if request.method == "HEAD" or info.size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        storage.iter_range(key, start, end), status_code=status_code, headers=headers, media_type=media_type
+    )
+
+
+# ---------------------------
+# Request size guard
+# ---------------------------
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized multipart bodies on `paths` before they are spooled:
+    immediately when Content-Length is too big, otherwise as soon as the
+    received byte count passes the limit.
+    """
+
+    def __init__(self, app, max_bytes: int, paths=("/auth/shoutouts",)):
+        self.app = app
+        self.limit = max_bytes + MULTIPART_OVERHEAD
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.limit:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"Upload too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
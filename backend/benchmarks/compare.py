@@ -0,0 +1,80 @@
+"""
+Compare two `benchmarks.load` result files.
+
+    cd backend
+    python -m benchmarks.compare baseline.json candidate.json --max-regression 10
+
+Prints per-scenario changes and exits with status 1 when any scenario's
+p95 latency or throughput got worse by more than `--max-regression`
+percent, or it now runs more SQL statements per request.
+"""
+import argparse
+import json
+import sys
+from typing import List, Tuple
+
+# metric, higher is better
+METRICS = (
+    ("throughput_rps", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("queries_per_request", False),
+)
+
+
+def _change(old: float, new: float) -> float:
+    if not old:
+        return 0.0 if not new else float("inf")
+    return (new - old) / old * 100
+
+
+def compare(baseline: dict, candidate: dict, max_regression: float) -> Tuple[List[str], List[str]]:
+    """Return (report lines, regressions)."""
+    lines, regressions = [], []
+    if baseline.get("dataset") != candidate.get("dataset"):
+        lines.append("warning: the two runs used different datasets")
+    if baseline.get("response_cache") != candidate.get("response_cache"):
+        lines.append("warning: the response cache was on in one run and off in the other")
+    lines.append(f"baseline {baseline.get('revision')}  candidate {candidate.get('revision')}")
+    for name, new in candidate["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            lines.append(f"{name}: new scenario")
+            continue
+        cells = []
+        for metric, higher_is_better in METRICS:
+            delta = _change(old[metric], new[metric])
+            cells.append(f"{metric} {old[metric]} -> {new[metric]} ({delta:+.1f}%)")
+            worse = -delta if higher_is_better else delta
+            if metric == "queries_per_request":
+                if new[metric] > old[metric]:
+                    regressions.append(f"{name}: {metric} {old[metric]} -> {new[metric]}")
+            elif metric in ("throughput_rps", "p95_ms") and worse > max_regression:
+                regressions.append(f"{name}: {metric} {delta:+.1f}%")
+        lines.append(f"{name}:\n  " + "\n  ".join(cells))
+    return lines, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="percent")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    lines, regressions = compare(baseline, candidate, args.max_regression)
+    print("\n".join(lines))
+    if regressions:
+        print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+API load benchmark.
+
+Seeds a synthetic dataset (see seed.py), then drives each scenario in turn
+with `--concurrency` async clients for `--duration` seconds and reports
+throughput, p50/p95/p99 latency and SQL statements per request:
+
+    cd backend
+    python -m benchmarks.load --out /tmp/before.json
+    # ... change something ...
+    python -m benchmarks.load --out /tmp/after.json
+    python -m benchmarks.compare /tmp/before.json /tmp/after.json
+
+The app runs in-process (httpx ASGI transport), so latencies include the
+client's share of the event loop but no network. The database is a
+throw-away SQLite file unless BENCH_DATABASE_URL points at an empty
+database, e.g. a local Postgres. Rate limiting and the slow-request log
+are turned off. So is the response cache unless `--cache on`: the
+scenarios repeat the same URLs, so with it on the read scenarios mostly
+measure replays of stored responses (no queries at all) rather than the
+endpoints. Use the same dataset flags, --seed and --cache for runs you
+want to compare.
+
+Requires aiosqlite (or asyncpg) and httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+
+_invocation_dir = os.getcwd()
+_workdir = tempfile.mkdtemp(prefix="bragboard-bench-")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or (
+    f"sqlite+aiosqlite:///{os.path.join(_workdir, 'bench.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("SLOW_REQUEST_SECONDS", "60")  # keep the slow-request log out of the report
+os.chdir(_workdir)
+os.makedirs("uploads", exist_ok=True)
+
+import httpx  # noqa: E402
+
+from app import leaderboard, metrics  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+from .common import git_revision, latency_summary  # noqa: E402
+from .seed import EMOJIS, PASSWORD, DatasetSpec, SeededData, seed  # noqa: E402
+
+
+@dataclass
+class Context:
+    data: SeededData
+    headers: List[Dict[str, str]]  # one logged-in user per worker
+
+
+Scenario = Callable[[httpx.AsyncClient, Context, int, random.Random], Awaitable[httpx.Response]]
+
+
+# ---------------------------
+# Scenarios (one request each)
+# ---------------------------
+async def login_user(client, ctx, worker, rng):
+    return await client.post(
+        "/auth/login", json={"email": rng.choice(ctx.data.emails), "password": PASSWORD, "role": "employee"}
+    )
+
+
+async def get_feed(client, ctx, worker, rng):
+    return await client.get("/auth/shoutouts/feed", headers=ctx.headers[worker])
+
+
+async def create_shoutout(client, ctx, worker, rng):
+    tagged = rng.sample(ctx.data.user_ids, min(2, len(ctx.data.user_ids)))
+    return await client.post(
+        "/auth/shoutouts",
+        data={"message": f"benchmark shout-out {rng.random():.6f}", "tagged_user_ids": ",".join(map(str, tagged))},
+        headers=ctx.headers[worker],
+    )
+
+
+async def react_shoutout(client, ctx, worker, rng):
+    return await client.post(
+        f"/auth/shoutouts/{rng.choice(ctx.data.shoutout_ids)}/react",
+        json={"emoji": rng.choice(EMOJIS)},
+        headers=ctx.headers[worker],
+    )
+
+
+async def list_comments(client, ctx, worker, rng):
+    return await client.get(f"/auth/shoutouts/{rng.choice(ctx.data.shoutout_ids)}/comments", headers=ctx.headers[worker])
+
+
+async def my_metrics(client, ctx, worker, rng):
+    return await client.get("/auth/metrics/me", headers=ctx.headers[worker])
+
+
+async def get_leaderboard(client, ctx, worker, rng):
+    return await client.get("/auth/leaderboard/department", params={"period": "month"}, headers=ctx.headers[worker])
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "login_user": login_user,
+    "get_feed": get_feed,
+    "create_shoutout": create_shoutout,
+    "react_shoutout": react_shoutout,
+    "list_comments": list_comments,
+    "my_metrics": my_metrics,
+    "get_leaderboard": get_leaderboard,
+}
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+async def _drive(client, ctx, scenario: Scenario, concurrency: int, seconds: float, seed_value: int):
+    latencies: List[float] = []
+    errors = 0
+    stop = time.perf_counter() + seconds
+
+    async def worker(i: int):
+        nonlocal errors
+        rng = random.Random(seed_value * 1000 + i)
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            r = await scenario(client, ctx, i, rng)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if r.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+async def run_scenario(client, ctx, name: str, concurrency: int, duration: float, warmup: float, seed_value: int) -> dict:
+    scenario = SCENARIOS[name]
+    if warmup > 0:
+        await _drive(client, ctx, scenario, concurrency, warmup, seed_value + 1)
+
+    count_before, queries_before = metrics.HTTP_REQUEST_QUERIES.totals()
+    started = time.perf_counter()
+    latencies, errors = await _drive(client, ctx, scenario, concurrency, duration, seed_value)
+    elapsed = time.perf_counter() - started
+    count_after, queries_after = metrics.HTTP_REQUEST_QUERIES.totals()
+
+    requests = count_after - count_before
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        **latency_summary(latencies),
+        "queries_per_request": round((queries_after - queries_before) / requests, 2) if requests else 0.0,
+    }
+
+
+async def login_workers(client, data: SeededData, concurrency: int) -> List[Dict[str, str]]:
+    headers = []
+    for i in range(concurrency):
+        r = await client.post(
+            "/auth/login", json={"email": data.emails[i % len(data.emails)], "password": PASSWORD, "role": "employee"}
+        )
+        r.raise_for_status()
+        headers.append({"Authorization": f"Bearer {r.json()['access_token']}"})
+    return headers
+
+
+def print_table(results: dict, out=sys.stderr) -> None:
+    print(f"{'scenario':<16}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'errors':>8}", file=out)
+    for name, r in results["scenarios"].items():
+        print(
+            f"{name:<16}{r['throughput_rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+            f"{r['queries_per_request']:>9}{r['errors']:>8}",
+            file=out,
+        )
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = DatasetSpec()
+    for name in ("users", "departments", "shoutouts", "max_tags", "reactions", "comments", "days", "seed"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=getattr(defaults, name))
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="default: all")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds per scenario")
+    parser.add_argument("--cache", choices=["on", "off"], default="off", help="response cache (default: off)")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    args = parser.parse_args(argv)
+    settings.RESPONSE_CACHE_ENABLED = args.cache == "on"
+    spec = DatasetSpec(**{name: getattr(args, name) for name in defaults.to_dict()})
+
+    engine.echo = False
+    for handler in app.router.on_startup:
+        await handler()
+    async with AsyncSessionLocal() as db:
+        data = await seed(db, spec)
+    await leaderboard.refresh()  # the startup load ran before the data existed
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        ctx = Context(data=data, headers=await login_workers(client, data, args.concurrency))
+        scenarios = {
+            name: await run_scenario(client, ctx, name, args.concurrency, args.duration, args.warmup, spec.seed)
+            for name in (args.scenario or SCENARIOS)
+        }
+    for handler in app.router.on_shutdown:
+        await handler()
+
+    results = {
+        "revision": git_revision(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "dataset": spec.to_dict(),
+        "seed_seconds": data.seconds,
+        "concurrency": args.concurrency,
+        "response_cache": args.cache,
+        "duration_s": args.duration,
+        "scenarios": scenarios,
+    }
+    if args.out:
+        with open(os.path.join(_invocation_dir, args.out), "w") as f:
+            json.dump(results, f, indent=2)
+    print_table(results)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
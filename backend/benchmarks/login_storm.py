@@ -0,0 +1,129 @@
+"""
+Feed latency during a login storm.
+
+Runs the app in-process against a throw-away SQLite database, keeps
+`--logins` clients logging in continuously and measures GET
+/auth/shoutouts/feed latency from a separate poller. Each mode is run in
+turn so the inline (event-loop) and pooled bcrypt paths can be compared:
+
+    cd backend
+    python -m benchmarks.login_storm --mode inline --mode thread
+
+Requires aiosqlite and httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from .common import percentile
+
+_workdir = tempfile.mkdtemp(prefix="bragboard-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_workdir, 'bench.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ["RATE_LIMIT_ENABLED"] = "false"  # every login comes from one client address
+os.environ.setdefault("SLOW_REQUEST_SECONDS", "60")  # keep the slow-request log out of the report
+os.chdir(_workdir)
+os.makedirs("uploads", exist_ok=True)
+
+import httpx  # noqa: E402
+
+from app import auth  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.hashing import PasswordHasher  # noqa: E402
+from app.main import app  # noqa: E402
+
+PASSWORD = "benchmark-password"
+
+
+async def seed(client, users):
+    for i in range(users):
+        r = await client.post(
+            "/auth/register",
+            json={
+                "username": f"bench{i}",
+                "name": f"Bench {i}",
+                "email": f"bench{i}@example.com",
+                "password": PASSWORD,
+                "role": "employee",
+                "department": "Bench",
+            },
+        )
+        r.raise_for_status()
+    r = await client.post("/auth/login", json={"email": "bench0@example.com", "password": PASSWORD, "role": "employee"})
+    r.raise_for_status()
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    for i in range(20):
+        await client.post("/auth/shoutouts", data={"message": f"seed {i}"}, headers=headers)
+    return headers
+
+
+async def run_mode(client, headers, mode, logins, duration, users):
+    if mode == "inline":
+        auth.password_hasher = PasswordHasher(workers=0)
+    else:
+        auth.password_hasher = PasswordHasher(workers=os.cpu_count() or 4, pool=mode)
+
+    stop = time.perf_counter() + duration
+    feed_ms = []
+    login_count = 0
+
+    async def login_loop(n):
+        nonlocal login_count
+        while time.perf_counter() < stop:
+            email = f"bench{n % users}@example.com"
+            r = await client.post("/auth/login", json={"email": email, "password": PASSWORD, "role": "employee"})
+            r.raise_for_status()
+            login_count += 1
+
+    async def feed_loop():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            r = await client.get("/auth/shoutouts/feed", headers=headers)
+            r.raise_for_status()
+            feed_ms.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(feed_loop(), *(login_loop(i) for i in range(logins)))
+    auth.password_hasher.shutdown()
+    return {
+        "mode": mode,
+        "concurrent_logins": logins,
+        "duration_s": duration,
+        "logins": login_count,
+        "feed_requests": len(feed_ms),
+        "feed_p50_ms": round(statistics.median(feed_ms), 2) if feed_ms else 0.0,
+        "feed_p99_ms": round(percentile(feed_ms, 99), 2),
+        "feed_max_ms": round(max(feed_ms), 2) if feed_ms else 0.0,
+    }
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", action="append", choices=["inline", "thread", "process"])
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login loops")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per mode")
+    parser.add_argument("--users", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    engine.echo = False
+    for handler in app.router.on_startup:
+        await handler()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = await seed(client, args.users)
+        results = [
+            await run_mode(client, headers, mode, args.logins, args.duration, args.users)
+            for mode in (args.mode or ["inline", "thread"])
+        ]
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
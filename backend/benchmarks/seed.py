@@ -0,0 +1,157 @@
+"""
+Synthetic dataset for the benchmarks.
+
+Fills an empty database with users, shout-outs, tags, reactions and
+comments drawn from a seeded RNG, so the same `DatasetSpec` always gives
+the same data. Raw rows are bulk-inserted; the derived tables (feed rows,
+reaction totals, user and leaderboard counters) are then built with the
+app's own rebuild functions, exactly as after a migration.
+
+Every user's password is `PASSWORD`; emails are bench<N>@example.com.
+"""
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import feed, leaderboard, reactions, stats
+from app.database import insert_for
+from app.hashing import get_password_hash
+from app.models import (
+    User, ShoutOut, ShoutOutTag, ShoutOutDepartment, ShoutOutReaction, ShoutOutComment,
+)
+
+PASSWORD = "benchmark-password"
+EMOJIS = ("👍", "🎉", "❤️", "🔥", "👏")
+WORDS = (
+    "great", "work", "on", "the", "release", "thanks", "for", "helping", "with", "launch",
+    "review", "team", "customer", "fix", "deploy", "design", "support", "quick", "amazing", "demo",
+)
+BATCH_SIZE = 500
+
+
+@dataclass
+class DatasetSpec:
+    users: int = 200
+    departments: int = 5
+    shoutouts: int = 2000
+    max_tags: int = 3
+    reactions: int = 5000
+    comments: int = 3000
+    days: int = 90  # shout-outs are spread over this many days
+    seed: int = 42
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class SeededData:
+    user_ids: List[int] = field(default_factory=list)
+    emails: List[str] = field(default_factory=list)
+    shoutout_ids: List[int] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def email_for(i: int) -> str:
+    return f"bench{i}@example.com"
+
+
+def _sentence(rng: random.Random, low: int = 4, high: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+async def _insert_batches(db: AsyncSession, model, rows: List[dict]) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        await db.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+async def seed(db: AsyncSession, spec: DatasetSpec) -> SeededData:
+    """Insert the dataset and build the read models. Raises RuntimeError if users already exist."""
+    if (await db.execute(select(User.id).limit(1))).first():
+        raise RuntimeError("Refusing to seed: the database already has users")
+    rng = random.Random(spec.seed)
+    started = time.perf_counter()
+    out = SeededData()
+
+    password_hash = get_password_hash(PASSWORD)  # one bcrypt call, shared by every user
+    departments = {i: f"Dept {i % spec.departments}" for i in range(spec.users)}
+    res = await db.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [
+            {
+                "username": f"bench{i}",
+                "email": email_for(i),
+                "password": password_hash,
+                "role": "employee",
+                "name": f"Bench User {i}",
+                "department": departments[i],
+            }
+            for i in range(spec.users)
+        ],
+    )
+    out.user_ids = list(res.scalars().all())
+    out.emails = [email_for(i) for i in range(spec.users)]
+    dept_of: Dict[int, str] = {uid: departments[i] for i, uid in enumerate(out.user_ids)}
+
+    # shout-outs, oldest first, evenly spread over `days`
+    now = datetime.utcnow()
+    step = timedelta(days=spec.days) / max(spec.shoutouts, 1)
+    posts = []
+    for n in range(spec.shoutouts):
+        author = rng.choice(out.user_ids)
+        others = [uid for uid in rng.sample(out.user_ids, min(spec.max_tags + 1, len(out.user_ids))) if uid != author]
+        posts.append((author, others[:rng.randint(0, spec.max_tags)], now - step * (spec.shoutouts - n)))
+    for start in range(0, len(posts), BATCH_SIZE):
+        batch = posts[start:start + BATCH_SIZE]
+        res = await db.execute(
+            insert(ShoutOut).returning(ShoutOut.id, sort_by_parameter_order=True),
+            [
+                {"author_id": author, "message": _sentence(rng), "created_at": created_at, "department": dept_of[author]}
+                for author, _, created_at in batch
+            ],
+        )
+        out.shoutout_ids.extend(res.scalars().all())
+
+    tag_rows, dept_rows = [], []
+    for sid, (author, tagged, created_at) in zip(out.shoutout_ids, posts):
+        tag_rows.extend({"shoutout_id": sid, "user_id": uid} for uid in tagged)
+        for dept in {dept_of[author], *(dept_of[uid] for uid in tagged)}:
+            dept_rows.append({"shoutout_id": sid, "department": dept, "created_at": created_at})
+    await _insert_batches(db, ShoutOutTag, tag_rows)
+    await _insert_batches(db, ShoutOutDepartment, dept_rows)
+
+    reaction_keys = {
+        (rng.choice(out.shoutout_ids), rng.choice(out.user_ids), rng.choice(EMOJIS))
+        for _ in range(spec.reactions)
+    } if out.shoutout_ids else set()
+    reaction_rows = [{"shoutout_id": s, "user_id": u, "emoji": e} for s, u, e in sorted(reaction_keys)]
+    for start in range(0, len(reaction_rows), BATCH_SIZE):
+        await db.execute(
+            insert_for(db, ShoutOutReaction).on_conflict_do_nothing(), reaction_rows[start:start + BATCH_SIZE]
+        )
+
+    created = dict(zip(out.shoutout_ids, (p[2] for p in posts)))
+    comment_rows = []
+    for _ in range(spec.comments if out.shoutout_ids else 0):
+        sid = rng.choice(out.shoutout_ids)
+        comment_rows.append({
+            "shoutout_id": sid,
+            "user_id": rng.choice(out.user_ids),
+            "content": _sentence(rng, 2, 8),
+            "created_at": created[sid] + timedelta(minutes=rng.randint(1, 600)),
+        })
+    comment_rows.sort(key=lambda row: row["created_at"])
+    await _insert_batches(db, ShoutOutComment, comment_rows)
+    await db.commit()
+
+    await reactions.rebuild_counts(db)
+    await feed.rebuild(db, missing_only=False)
+    await stats.reconcile(db)
+    await leaderboard.rebuild(db)
+    out.seconds = round(time.perf_counter() - started, 2)
+    return out
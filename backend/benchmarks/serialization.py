@@ -0,0 +1,160 @@
+"""
+Encode cost of the list endpoints: pydantic models vs `app.fastjson`.
+
+For each endpoint, `--items` synthetic rows are encoded the old way and
+the new way, and the results are checked to decode to the same JSON:
+
+- models: one response model per row (`feed.to_schema`, ...), then the
+  route's own FastAPI `serialize_response` (validate against
+  `response_model`, dump JSON), as a request without `fastjson` did;
+- fastjson: one dict per row (`feed.to_row`, ...) encoded by
+  `fastjson.dumps`, as the endpoints do now.
+
+Reports microseconds per item (best of `--repeat`) and the peak memory
+traced by tracemalloc per item:
+
+    cd backend
+    python -m benchmarks.serialization --items 100 --items 1000
+
+No database is needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from fastapi.routing import serialize_response  # noqa: E402
+
+from app import comments, directory, fastjson, feed, schemas  # noqa: E402
+from app.models import ShoutOutComment, ShoutOutFeedItem  # noqa: E402
+from app.routers import admin_router, router  # noqa: E402
+
+START = datetime(2026, 1, 5, 9, 30, 15, 123456)
+
+
+def _route(api_router, path):
+    prefixed = api_router.prefix + path
+    return next(route for route in api_router.routes if route.path == prefixed and "GET" in route.methods)
+
+
+def feed_items(n):
+    return [
+        ShoutOutFeedItem(
+            shoutout_id=i,
+            author_id=i % 50,
+            message=f"Thanks for shipping release {i}, great work on the rollout!",
+            image_url=None if i % 3 else f"/uploads/{i}.jpg",
+            thumbnail_url=None if i % 3 else f"/uploads/{i}_thumb.jpg",
+            created_at=START - timedelta(minutes=i),
+            tagged_user_ids=[i % 50 + 1, i % 50 + 2],
+            tagged_user_names=[f"User {i % 50 + 1}", f"User {i % 50 + 2}"],
+            reactions={"👍": i % 7, "🎉": i % 3},
+            comments_count=i % 11,
+        )
+        for i in range(n)
+    ]
+
+
+def comment_rows(n):
+    return [
+        (
+            ShoutOutComment(
+                id=i, shoutout_id=1, user_id=i % 50, content=f"Well deserved, comment {i}",
+                created_at=START + timedelta(seconds=i),
+            ),
+            f"User {i % 50}",
+        )
+        for i in range(n)
+    ]
+
+
+def user_rows(n):
+    return [
+        {
+            "id": i, "username": f"user{i}", "name": f"User {i}", "email": f"user{i}@example.com",
+            "role": "employee", "department": "Engineering", "is_active": True,
+            "joining_date": "2024-03-01", "current_project": "Bragboard", "group_members": None,
+        }
+        for i in range(n)
+    ]
+
+
+def cases(n):
+    """name -> (old path, new path), each returning the encoded body."""
+    feed_route = _route(router, "/shoutouts/feed")
+    comments_route = _route(router, "/shoutouts/{shoutout_id}/comments")
+    users_route = _route(admin_router, "/employees")
+    items, rows, users = feed_items(n), comment_rows(n), user_rows(n)
+
+    def serialize(route, content):
+        return asyncio.run(serialize_response(
+            field=route.response_field,
+            response_content=content,
+            exclude_unset=route.response_model_exclude_unset,
+            dump_json=True,
+        ))
+
+    return {
+        "feed": (
+            lambda: serialize(feed_route, [feed.to_schema(item) for item in items]),
+            lambda: fastjson.dumps([feed.to_row(item) for item in items]),
+        ),
+        "comments": (
+            lambda: serialize(comments_route, [comments.to_schema(c, name) for c, name in rows]),
+            lambda: fastjson.dumps([comments.to_row(c, name) for c, name in rows]),
+        ),
+        "employees": (
+            lambda: serialize(users_route, [
+                schemas.UserListItem(**{name: row[name] for name in directory.FIELDS}) for row in users
+            ]),
+            lambda: fastjson.dumps([{name: row[name] for name in directory.FIELDS} for row in users]),
+        ),
+    }
+
+
+def measure(fn, n, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"us_per_item": round(best / n * 1e6, 2), "peak_bytes_per_item": round(peak / n)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, action="append", help="rows per response (repeatable)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = []
+    for n in args.items or [100, 1000]:
+        for name, (old, new) in cases(n).items():
+            if json.loads(old()) != json.loads(new()):
+                raise SystemExit(f"{name}: the two paths encode different JSON")
+            models, fast = measure(old, n, args.repeat), measure(new, n, args.repeat)
+            results.append({
+                "endpoint": name,
+                "items": n,
+                "encoder": "orjson" if fastjson.orjson is not None else "json",
+                "models": models,
+                "fastjson": fast,
+                "speedup": round(models["us_per_item"] / fast["us_per_item"], 2) if fast["us_per_item"] else None,
+            })
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,3 +16,20 @@ api.interceptors.request.use((config) => {
   }
   return config;
 });
+
+// GET every page of a paginated list: the next page is requested with the
+// X-Next-Cursor response header in `cursorParam` until a page has none.
+// `client` is `api` or a plain axios instance with its own headers.
+export async function getAllPages(client, url, { cursorParam = "cursor", params = {}, ...config } = {}) {
+  const items = [];
+  let cursor;
+  do {
+    const res = await client.get(url, {
+      ...config,
+      params: cursor ? { ...params, [cursorParam]: cursor } : params,
+    });
+    items.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+}
@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import Navbar from "../../components/Navbar";
 import "../../styles/Employeelist.scss";
 import axios from "axios";
+import { getAllPages } from "../../api";
 
 export default function EmployeeList() {
   const [employees, setEmployees] = useState([]);
@@ -13,10 +14,11 @@ export default function EmployeeList() {
     setLoading(true);
     setError("");
     try {
-      const res = await axios.get("http://127.0.0.1:8000/admin/employees", {
+      const list = await getAllPages(axios, "http://127.0.0.1:8000/admin/employees", {
+        params: { limit: 200 },
         headers: { Authorization: `Bearer ${accessToken}` },
       });
-      setEmployees(res.data);
+      setEmployees(list);
     } catch (err) {
       console.error(err);
       setError("Failed to fetch employees");
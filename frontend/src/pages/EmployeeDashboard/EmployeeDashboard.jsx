@@ -2,7 +2,7 @@ import { useEffect, useState } from "react";
 import Navbar from "../../components/Navbar";
 import "../EmployeeDashboard/EmployeeDashboard.scss";
 import "../../styles/Navbar.scss";
-import { api } from "../../api";
+import { api, getAllPages } from "../../api";
 
 export default function EmployeeDashboard() {
   const [feed, setFeed] = useState([]);
@@ -48,7 +48,10 @@ export default function EmployeeDashboard() {
     setCommentsOpen((prev) => ({ ...prev, [id]: !prev[id] }));
     if (!commentsMap[id]) {
       try {
-        const { data } = await api.get(`/auth/shoutouts/${id}/comments`);
+        const data = await getAllPages(api, `/auth/shoutouts/${id}/comments`, {
+          cursorParam: "after_id",
+          params: { limit: 100 },
+        });
         setCommentsMap((m) => ({ ...m, [id]: data }));
       } catch (_) {}
     }
@@ -1,7 +1,7 @@
 import Navbar from "../components/Navbar";
 import "../styles/Home.scss";
 import { useEffect, useState } from "react";
-import { api } from "../api";
+import { api, getAllPages } from "../api";
 
 export default function Home() {
   const [active, setActive] = useState("createPost");
@@ -84,7 +84,10 @@ export default function Home() {
     setCommentsOpen((prev) => ({ ...prev, [id]: !prev[id] }));
     if (!commentsMap[id]) {
       try {
-        const { data } = await api.get(`/auth/shoutouts/${id}/comments`);
+        const data = await getAllPages(api, `/auth/shoutouts/${id}/comments`, {
+          cursorParam: "after_id",
+          params: { limit: 100 },
+        });
         setCommentsMap((m) => ({ ...m, [id]: data }));
       } catch (_) {}
     }
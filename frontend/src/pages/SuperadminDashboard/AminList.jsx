@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import Navbar from "../../components/Navbar";
 import axios from "axios";
+import { getAllPages } from "../../api";
 import "../../styles/Employeelist.scss";
 
 export default function AdminList() {
@@ -13,10 +14,11 @@ export default function AdminList() {
     setLoading(true);
     setError("");
     try {
-      const res = await axios.get("http://127.0.0.1:8000/admin/admins", {
+      const list = await getAllPages(axios, "http://127.0.0.1:8000/admin/admins", {
+        params: { limit: 200 },
         headers: { Authorization: `Bearer ${accessToken}` },
       });
-      setAdmins(res.data);
+      setAdmins(list);
     } catch (err) {
       console.error(err);
       setError("Failed to fetch admins");
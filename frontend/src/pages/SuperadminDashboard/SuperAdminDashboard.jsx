@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import Navbar from "../../components/Navbar";
 import "../AdminDashboard/AdminDashboard.scss";
 import axios from "axios";
+import { getAllPages } from "../../api";
 
 export default function SuperAdminDashboard({ accessToken: propToken }) {
   const [employees, setEmployees] = useState([]);
@@ -23,11 +24,13 @@ export default function SuperAdminDashboard({ accessToken: propToken }) {
     setError("");
 
     try {
-      const [empRes, adminRes, keyRes] = await Promise.all([
-        axios.get("http://127.0.0.1:8000/admin/employees", {
+      const [employeeList, adminList, keyRes] = await Promise.all([
+        getAllPages(axios, "http://127.0.0.1:8000/admin/employees", {
+          params: { limit: 200 },
           headers: { Authorization: `Bearer ${accessToken}` },
         }),
-        axios.get("http://127.0.0.1:8000/admin/admins", {
+        getAllPages(axios, "http://127.0.0.1:8000/admin/admins", {
+          params: { limit: 200 },
           headers: { Authorization: `Bearer ${accessToken}` },
         }),
         axios.get("http://127.0.0.1:8000/auth/security-keys", {
@@ -35,8 +38,8 @@ export default function SuperAdminDashboard({ accessToken: propToken }) {
         }),
       ]);
 
-      setEmployees(empRes.data);
-      setAdmins(adminRes.data);
+      setEmployees(employeeList);
+      setAdmins(adminList);
       setSecurityKeys(keyRes.data);
     } catch (err) {
       console.error(err);